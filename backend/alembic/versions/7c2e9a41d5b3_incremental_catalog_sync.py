@@ -0,0 +1,58 @@
+"""Incremental catalog sync: meal content hashes, unique meal names, catalog version
+
+Revision ID: 7c2e9a41d5b3
+Revises: f435f14ac584
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2e9a41d5b3'
+down_revision: Union[str, Sequence[str], None] = 'f435f14ac584'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _dedupe_meal_names(tables) -> None:
+    """Points references at the lowest id of each duplicated meal name and deletes the rest."""
+    referencing = [table for table in ("meal_plans", "feedback") if table in tables]
+    keep = "SELECT MIN(k.id) FROM meals k WHERE k.name = meals.name"
+    for table in referencing:
+        op.execute(
+            f"UPDATE {table} SET meal_id = (SELECT ({keep}) FROM meals WHERE meals.id = {table}.meal_id) "
+            f"WHERE meal_id IN (SELECT id FROM meals WHERE id <> ({keep}))"
+        )
+    op.execute(f"DELETE FROM meals WHERE id <> ({keep})")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    op.add_column('meals', sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+    _dedupe_meal_names(tables)
+    op.drop_index(op.f('ix_meals_name'), table_name='meals')
+    op.create_index(op.f('ix_meals_name'), 'meals', ['name'], unique=True)
+
+    if 'catalog_state' not in tables:
+        op.create_table('catalog_state',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('catalog_state')
+    op.drop_index(op.f('ix_meals_name'), table_name='meals')
+    op.create_index(op.f('ix_meals_name'), 'meals', ['name'], unique=False)
+    with op.batch_alter_table('meals') as batch_op:
+        batch_op.drop_column('content_hash')
@@ -0,0 +1,44 @@
+"""Composite indexes for the feedback and meal_plans hot paths, and meals.type
+
+Revision ID: b91f3c6e2a07
+Revises: 7c2e9a41d5b3
+Create Date: 2026-10-16 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b91f3c6e2a07'
+down_revision: Union[str, Sequence[str], None] = '7c2e9a41d5b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index name, table, columns). `feedback` is created by the application's create_all rather
+# than by a migration, so every index is only added where its table already exists.
+INDEXES = (
+    ('ix_feedback_user_id_rating', 'feedback', ['user_id', 'rating']),
+    ('ix_meal_plans_user_id_plan_date', 'meal_plans', ['user_id', 'plan_date']),
+    ('ix_meals_type', 'meals', ['type']),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    for name, table, columns in INDEXES:
+        if table in tables and name not in {ix['name'] for ix in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    for name, table, _ in reversed(INDEXES):
+        if table in tables and name in {ix['name'] for ix in inspector.get_indexes(table)}:
+            op.drop_index(name, table_name=table)
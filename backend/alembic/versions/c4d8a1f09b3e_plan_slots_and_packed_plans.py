@@ -0,0 +1,49 @@
+"""Plan slots on meal_plans and packed meal ids on plans
+
+Revision ID: c4d8a1f09b3e
+Revises: b91f3c6e2a07
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d8a1f09b3e'
+down_revision: Union[str, Sequence[str], None] = 'b91f3c6e2a07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    op.add_column('meal_plans', sa.Column('slot', sa.String(length=16), nullable=True))
+
+    # `plans` is created by the application's create_all rather than by a migration.
+    if 'plans' in tables:
+        if 'meal_ids' not in {column['name'] for column in inspector.get_columns('plans')}:
+            op.add_column('plans', sa.Column('meal_ids', sa.LargeBinary(), nullable=True))
+        if 'ix_plans_user_id_start_date' not in {ix['name'] for ix in inspector.get_indexes('plans')}:
+            op.create_index('ix_plans_user_id_start_date', 'plans', ['user_id', 'start_date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    if 'plans' in tables:
+        if 'ix_plans_user_id_start_date' in {ix['name'] for ix in inspector.get_indexes('plans')}:
+            op.drop_index('ix_plans_user_id_start_date', table_name='plans')
+        if 'meal_ids' in {column['name'] for column in inspector.get_columns('plans')}:
+            with op.batch_alter_table('plans') as batch_op:
+                batch_op.drop_column('meal_ids')
+
+    with op.batch_alter_table('meal_plans') as batch_op:
+        batch_op.drop_column('slot')
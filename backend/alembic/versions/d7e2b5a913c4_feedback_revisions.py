@@ -0,0 +1,36 @@
+"""Per-user feedback revision counter
+
+Revision ID: d7e2b5a913c4
+Revises: c4d8a1f09b3e
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7e2b5a913c4'
+down_revision: Union[str, Sequence[str], None] = 'c4d8a1f09b3e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'feedback_revisions' not in tables:
+        op.create_table('feedback_revisions',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('revision', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id')
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('feedback_revisions')
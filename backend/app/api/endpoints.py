@@ -1,19 +1,31 @@
+import asyncio
 import traceback
-from fastapi import APIRouter, HTTPException, Depends, status, Query, Request
+from datetime import date, timedelta
+from fastapi import APIRouter, HTTPException, Depends, status, Query, Request, Response
+from fastapi.responses import PlainTextResponse
 from sqlalchemy.orm import Session
 from typing import List, Dict, Optional
 from pydantic import BaseModel, Field, ConfigDict
 from app.db.models.feedback import Feedback
 from typing import List
-from sqlalchemy import delete
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
-from app.db.db import get_db
+from app.db.db import SessionLocal, get_async_db, write_queue
 from app.db.models.user import User
 from app.db.models.meal import Meal
 from app.db.models.feedback import Feedback as FeedbackModel
 
-from app.core.classifier import GoalClassifier
+from app.config import settings
+from app.core.executors import run_in_executor
+from app.core.model_loader import ModelNotReady
+from app.core.profiling import profile_call, profile_request_id, profile_store, to_collapsed, to_speedscope
+from app.core.feedback import bump_feedback_revision, get_feedback_version
+from app.db.core.optimizer import PlanReport
 from app.db.core.planner import create_and_save_weekly_plan, WeeklyPlan
+from app.db.core.plan_history import PlanHistory, load_plan_history_response, plan_cache
+from app.db.plan_batch import generate_plans_batch
 
 router = APIRouter()
 
@@ -49,6 +61,30 @@ class PlanRequest(BaseModel):
     allergies: List[str] = []
     calorie_target: int = 2200 
     goal_text: str 
+    # 'greedy' or 'beam'; defaults to settings.PLAN_OPTIMIZER.
+    optimizer: Optional[str] = None
+
+class OptimizedPlanResponse(BaseModel):
+    plan: WeeklyPlan
+    report: PlanReport
+
+class BatchPlanRequest(BaseModel):
+    user_ids: List[int] = Field(..., min_length=1, max_length=settings.PLAN_BATCH_MAX_USERS)
+    workers: Optional[int] = Field(None, ge=1, le=settings.PLAN_BATCH_WORKERS)
+    chunk_size: int = Field(200, ge=1)
+    seed: Optional[int] = None
+    # Consecutive weeks planned and saved per user.
+    weeks: int = Field(1, ge=1, le=settings.PLAN_MAX_WEEKS)
+
+class BatchPlanResponse(BaseModel):
+    requested: int
+    planned: int
+    skipped: List[int]
+    failed: List[int]
+    plans: int
+    rows_written: int
+    elapsed_seconds: float
+    plans_per_second: float
 
 class FeedbackCreate(BaseModel):
     user_id: int
@@ -73,44 +109,90 @@ class ClassifyResponse(BaseModel):
     label: str
     confidence: float
 
+class ClassifyBatchRequest(BaseModel):
+    goal_texts: List[str] = Field(..., min_length=1, max_length=settings.CLASSIFY_MAX_REQUEST_TEXTS)
+
+class ClassifyBatchResponse(BaseModel):
+    results: List[ClassifyResponse]
+
+class ClassifyCacheStats(BaseModel):
+    hits: int
+    disk_hits: int
+    misses: int
+    hit_rate: float
+    entries: int
+    max_entries: int
+    ttl_seconds: float
+    disk_enabled: bool
+
 class DemoPlanResponse(BaseModel):
     before_plan: WeeklyPlan
     after_plan: WeeklyPlan
 
 
+async def _run_planning(request: Request, fn, *args, profile_id: Optional[str] = None, **kwargs):
+    """
+    Runs blocking planning work on the plan executor with a session of its own, so
+    the event loop and the cheap endpoints never wait on the planner. With a
+    `profile_id` the work is sampled and its profile stored under that id.
+    """
+    def job():
+        with SessionLocal() as db_session:
+            if profile_id is None:
+                return fn(db_session, *args, **kwargs)
+            return profile_call(profile_id, fn.__name__, fn, db_session, *args, **kwargs)
+    return await run_in_executor(request.app.state.plan_executor, job)
+
+def _requested_profile_id(request: Request, profile: bool) -> Optional[str]:
+    """A profile id when this request asked to be profiled and profiling is enabled, else None."""
+    if not settings.PROFILING_ENABLED:
+        return None
+    if not profile and request.headers.get("x-profile", "").lower() not in ("1", "true", "yes"):
+        return None
+    return profile_request_id(request.headers.get("x-request-id"))
+
 @router.post("/users", response_model=UserOut, status_code=status.HTTP_201_CREATED)
-def register_user(payload: UserCreate, db: Session = Depends(get_db)):
-    if db.query(User).filter(User.username == payload.username).first():
+async def register_user(payload: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    if (await db.execute(select(User.id).where(User.username == payload.username))).first():
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already registered"
         )
-    new_user = User(**payload.dict())
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    return new_user
+    def add_user(session: Session) -> User:
+        new_user = User(**payload.dict())
+        session.add(new_user)
+        return new_user
+
+    return await asyncio.wrap_future(write_queue.submit(add_user))
 
 @router.get("/users/by-username/{username}", response_model=UserOut)
-def read_user_by_username(username: str, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == username).first()
+async def read_user_by_username(username: str, db: AsyncSession = Depends(get_async_db)):
+    user = (await db.execute(select(User).where(User.username == username))).scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 @router.post("/plan/demo", response_model=DemoPlanResponse, tags=["plan"])
-def generate_demo_plan(db: Session = Depends(get_db)):
+async def generate_demo_plan(http_request: Request):
     """
     Runs the full feedback loop demonstration and returns before/after plans.
     """
+    return await _run_planning(http_request, _run_demo, http_request.app.state.feedback_engine)
+
+def _run_demo(db: Session, feedback_engine) -> DemoPlanResponse:
     TEST_USER_ID = 1  
 
     demo_user = db.query(User).filter(User.id == TEST_USER_ID).first()
     if not demo_user:
         raise HTTPException(status_code=404, detail=f"Demo user with ID {TEST_USER_ID} not found. Please run seed_meals.py first to create it.")
 
-    db.execute(delete(Feedback).where(Feedback.user_id == TEST_USER_ID))
-    db.commit()
+    def clear_feedback(session: Session):
+        session.execute(delete(Feedback).where(Feedback.user_id == TEST_USER_ID))
+        bump_feedback_revision(session, TEST_USER_ID)
+
+    write_queue.run(clear_feedback)
+    # Ends the read snapshot, so the planner sees the committed write.
+    db.rollback()
 
     plan_before = create_and_save_weekly_plan(
         db, 
@@ -121,16 +203,21 @@ def generate_demo_plan(db: Session = Depends(get_db)):
         demo_user.sex, 
         demo_user.weight_kg, 
         demo_user.height_cm, 
-        demo_user.activity_level 
+        demo_user.activity_level,
+        feedback_engine=feedback_engine,
+        write_queue=write_queue
     )
 
     liked = db.query(Meal).filter(Meal.name.ilike('%chicken%')).limit(5).all()
     disliked = db.query(Meal).filter(Meal.name.ilike('%salmon%')).limit(5).all()
-    for meal in liked:
-        db.add(Feedback(user_id=TEST_USER_ID, meal_id=meal.id, rating=5))
-    for meal in disliked:
-        db.add(Feedback(user_id=TEST_USER_ID, meal_id=meal.id, rating=1))
-    db.commit()
+    ratings = [(meal.id, 5) for meal in liked] + [(meal.id, 1) for meal in disliked]
+
+    def add_ratings(session: Session):
+        session.add_all([Feedback(user_id=TEST_USER_ID, meal_id=meal_id, rating=rating) for meal_id, rating in ratings])
+        bump_feedback_revision(session, TEST_USER_ID)
+
+    write_queue.run(add_ratings)
+    db.rollback()
 
     plan_after = create_and_save_weekly_plan(
         db, 
@@ -141,41 +228,80 @@ def generate_demo_plan(db: Session = Depends(get_db)):
         demo_user.sex, 
         demo_user.weight_kg,
         demo_user.height_cm,
-        demo_user.activity_level 
+        demo_user.activity_level,
+        feedback_engine=feedback_engine,
+        write_queue=write_queue
     )
 
     return DemoPlanResponse(before_plan=plan_before, after_plan=plan_after)
 
+@router.get("/health")
+async def health(request: Request):
+    """
+    Liveness plus the loading state of the goal classifier.
+    """
+    loader = request.app.state.classifier_loader
+    return {"status": "ok", "classifier": loader.state}
+
 @router.post("/classify", response_model=ClassifyResponse)
 async def classify_goal(payload: ClassifyRequest, request: Request):
     """
     Accepts a user's freeform goal text and returns a classification.
     """
-    classifier = request.app.state.classifier
+    batcher = request.app.state.classify_batcher
     
     if not payload.goal_text:
         raise HTTPException(status_code=400, detail="goal_text cannot be empty.")
     try:
-        result = classifier.classify(payload.goal_text)
+        result = await batcher.submit(payload.goal_text)
         return ClassifyResponse(label=result["label"], confidence=result["confidence"])
+    except ModelNotReady as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred during classification: {e}")
 
-@router.post("/plan", response_model=WeeklyPlan)
-def generate_meal_plan(request: PlanRequest, db_session: Session = Depends(get_db)):
+@router.get("/classify/cache/stats", response_model=ClassifyCacheStats)
+async def classify_cache_stats(request: Request):
     """
-    Generates a personalized 7-day meal plan based on user's profile and goals.
+    Returns hit/miss counters of the goal classification cache.
     """
-    user = db_session.query(User).filter(User.id == request.user_id).first()
+    return ClassifyCacheStats(**request.app.state.classify_cache.stats())
+
+@router.post("/classify/batch", response_model=ClassifyBatchResponse)
+async def classify_goals_batch(payload: ClassifyBatchRequest, request: Request):
+    """
+    Classifies several goal texts at once. They share forward passes with any
+    concurrent /classify requests.
+    """
+    batcher = request.app.state.classify_batcher
+
+    if any(not text for text in payload.goal_texts):
+        raise HTTPException(status_code=400, detail="goal_texts cannot contain empty strings.")
+    try:
+        results = await batcher.submit_many(payload.goal_texts)
+        return ClassifyBatchResponse(results=[ClassifyResponse(label=r["label"], confidence=r["confidence"]) for r in results])
+    except ModelNotReady as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred during classification: {e}")
+
+async def _plan_for_user(request: PlanRequest, http_request: Request, response: Response, profile: bool,
+                         db: AsyncSession, optimizer: Optional[str], with_report: bool = False):
+    user = await db.get(User, request.user_id)
     if not user:
         raise HTTPException(status_code=404, detail=f"User with ID {request.user_id} not found.")
 
     if not user.sex or not user.weight_kg or not user.height_cm or not user.activity_level:
         raise HTTPException(status_code=400, detail="User profile is incomplete. 'sex', 'weight_kg', 'height_cm', and 'activity_level' are required for meal planning.")
     
+    profile_id = _requested_profile_id(http_request, profile)
+    if profile_id is not None:
+        response.headers["X-Profile-Id"] = profile_id
     try:
-        return create_and_save_weekly_plan(
-            db_session=db_session,
+        return await _run_planning(
+            http_request,
+            create_and_save_weekly_plan,
+            profile_id=profile_id,
             user_id=request.user_id,
             restrictions=request.dietary_preferences,
             calorie_target=request.calorie_target, 
@@ -183,7 +309,11 @@ def generate_meal_plan(request: PlanRequest, db_session: Session = Depends(get_d
             sex=user.sex,
             weight_kg=user.weight_kg,
             height_cm=user.height_cm,
-            activity_level=user.activity_level
+            activity_level=user.activity_level,
+            feedback_engine=http_request.app.state.feedback_engine,
+            write_queue=write_queue,
+            optimizer=optimizer,
+            with_report=with_report
         )
     except ValueError as ve:
         traceback.print_exc()
@@ -192,35 +322,100 @@ def generate_meal_plan(request: PlanRequest, db_session: Session = Depends(get_d
         traceback.print_exc()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"An unexpected error occurred: {e}")
 
+@router.post("/plan", response_model=WeeklyPlan)
+async def generate_meal_plan(request: PlanRequest, http_request: Request, response: Response,
+                             profile: bool = Query(False, description="Store a sampling profile of this request (needs PROFILING_ENABLED)."),
+                             db: AsyncSession = Depends(get_async_db)):
+    """
+    Generates a personalized 7-day meal plan based on user's profile and goals.
+    With ?profile=1 or an `X-Profile: 1` header, where profiling is enabled, the
+    planning is profiled and the profile id returned in the X-Profile-Id header.
+    """
+    return await _plan_for_user(request, http_request, response, profile, db, request.optimizer)
+
+@router.post("/plan/optimize", response_model=OptimizedPlanResponse, tags=["plan"])
+async def generate_optimized_meal_plan(request: PlanRequest, http_request: Request, response: Response,
+                                       profile: bool = Query(False, description="Store a sampling profile of this request (needs PROFILING_ENABLED)."),
+                                       db: AsyncSession = Depends(get_async_db)):
+    """
+    Like /plan, but plans with the beam-search optimizer unless `optimizer` says
+    otherwise, and also returns how far each day lands from the calorie and macro
+    targets and whether it is within OPTIMIZER_CALORIE_TOLERANCE / OPTIMIZER_MACRO_TOLERANCE.
+    """
+    plan, report = await _plan_for_user(request, http_request, response, profile, db,
+                                        request.optimizer or "beam", with_report=True)
+    return OptimizedPlanResponse(plan=plan, report=report)
+
+@router.post("/plan/batch", response_model=BatchPlanResponse, tags=["plan"])
+async def generate_meal_plans_batch(request: BatchPlanRequest, http_request: Request):
+    """
+    Generates and saves weekly plans for many users in one run, spreading the
+    planning over a process pool and bulk-inserting the resulting plan rows.
+    """
+    try:
+        return BatchPlanResponse(**await _run_planning(
+            http_request,
+            generate_plans_batch,
+            request.user_ids,
+            workers=request.workers,
+            chunk_size=request.chunk_size,
+            seed=request.seed,
+            weeks=request.weeks
+        ))
+    except ValueError as ve:
+        traceback.print_exc()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"An unexpected error occurred: {e}")
+
 @router.post("/feedback", response_model=FeedbackOut, status_code=status.HTTP_201_CREATED)
-def submit_feedback(payload: FeedbackCreate, db: Session = Depends(get_db)):
-    if not db.query(User).filter(User.id == payload.user_id).first():
+async def submit_feedback(payload: FeedbackCreate, request: Request, db: AsyncSession = Depends(get_async_db)):
+    if not await db.get(User, payload.user_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    if not db.query(Meal).filter(Meal.id == payload.meal_id).first():
+    meal = await db.get(Meal, payload.meal_id)
+    if not meal:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Meal not found")
-    new_feedback = FeedbackModel(**payload.dict())
-    db.add(new_feedback)
-    db.commit()
-    db.refresh(new_feedback)
+
+    def add_feedback(session: Session):
+        # Read the version on the writer so no other feedback write lands in between.
+        previous_version = get_feedback_version(session, payload.user_id)
+        new_feedback = FeedbackModel(**payload.dict())
+        session.add(new_feedback)
+        revision = bump_feedback_revision(session, payload.user_id)
+        return previous_version, new_feedback, revision
+
+    previous_version, new_feedback, revision = await asyncio.wrap_future(write_queue.submit(add_feedback))
+
+    # Updating the user's model loads and saves it on disk.
+    await run_in_threadpool(
+        request.app.state.feedback_engine.record_feedback,
+        payload.user_id,
+        meal.name,
+        meal.tags,
+        new_feedback.rating,
+        previous_version=previous_version,
+        new_version=(previous_version[0] + 1, new_feedback.id, revision)
+    )
     return new_feedback
 
 @router.get("/users/{user_id}/liked-meals", response_model=List[LikedMealOut])
-def get_liked_meals(
+async def get_liked_meals(
     user_id: int, 
     min_rating: float = Query(4.0, ge=1, le=5, description="Minimum rating to be considered 'liked'"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    if not db.query(User).filter(User.id == user_id).first():
+    if not await db.get(User, user_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
     liked_meals_query = (
-        db.query(
+        select(
             Meal.id,
             Meal.name.label("title"),
             FeedbackModel.rating
         )
         .join(FeedbackModel, Meal.id == FeedbackModel.meal_id)
-        .filter(
+        .where(
             FeedbackModel.user_id == user_id,
             FeedbackModel.rating >= min_rating
         )
@@ -228,6 +423,66 @@ def get_liked_meals(
         .limit(20)
     )
     
-    results = liked_meals_query.all()
+    results = (await db.execute(liked_meals_query)).all()
     
-    return [LikedMealOut(id=r.id, title=r.title, rating=r.rating) for r in results]
\ No newline at end of file
+    return [LikedMealOut(id=r.id, title=r.title, rating=r.rating) for r in results]
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+def _plan_history_response(user_id: int, from_date: date, to_date: date):
+    with SessionLocal() as db:
+        if not db.get(User, user_id):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        return load_plan_history_response(db, user_id, from_date, to_date)
+
+@router.get("/users/{user_id}/plans", response_model=PlanHistory, tags=["plan"])
+async def get_user_plans(
+    user_id: int,
+    request: Request,
+    from_date: Optional[date] = Query(None, alias="from", description="First day, inclusive (default: today)"),
+    to_date: Optional[date] = Query(None, alias="to", description="Last day, inclusive (default: six days after 'from')")
+):
+    """
+    Returns the user's saved weekly plans overlapping the date range, without
+    regenerating them. Responses are cached per user until a new plan is saved
+    and carry an ETag; a matching If-None-Match is answered with 304.
+    """
+    from_date = from_date or date.today()
+    to_date = to_date or from_date + timedelta(days=6)
+    if to_date < from_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'to' must not be before 'from'.")
+
+    cached = plan_cache.get(user_id, from_date, to_date)
+    etag, body = cached or await run_in_threadpool(_plan_history_response, user_id, from_date, to_date)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _require_profiling() -> None:
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is not enabled.")
+
+@router.get("/profiles", tags=["profiling"])
+async def list_profiles():
+    """Lists the stored request profiles, newest first, without their stacks."""
+    _require_profiling()
+    return await run_in_threadpool(profile_store.summaries)
+
+@router.get("/profiles/{request_id}", tags=["profiling"])
+async def get_profile(request_id: str, format: str = Query("speedscope", pattern="^(speedscope|collapsed)$")):
+    """
+    Returns one stored profile, as a speedscope JSON file (open it at speedscope.app)
+    or as collapsed stacks for flamegraph.pl.
+    """
+    _require_profiling()
+    profile = await run_in_threadpool(profile_store.load, request_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"No profile stored for request '{request_id}'.")
+    if format == "collapsed":
+        return PlainTextResponse(to_collapsed(profile))
+    return to_speedscope(profile)
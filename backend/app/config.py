@@ -21,4 +21,80 @@ class Settings:
     TOKENIZER_DIR = BASE_DIR / "models" / "tokenizer"
     MODEL_DIR     = BASE_DIR / "models" / "goal_classifier_model"
 
+    ELIGIBILITY_CACHE_SIZE = int(os.getenv("ELIGIBILITY_CACHE_SIZE", "1024"))
+    # Caps the planner processes of a batch run and the users one POST /plans/batch may name.
+    PLAN_BATCH_WORKERS     = int(os.getenv("PLAN_BATCH_WORKERS", str(os.cpu_count() or 1)))
+    PLAN_BATCH_MAX_USERS   = int(os.getenv("PLAN_BATCH_MAX_USERS", "10000"))
+
+    # Planning and classification run on their own executors, off the threads serving cheap requests.
+    PLAN_EXECUTOR_WORKERS     = int(os.getenv("PLAN_EXECUTOR_WORKERS", str(os.cpu_count() or 1)))
+    CLASSIFY_EXECUTOR_WORKERS = int(os.getenv("CLASSIFY_EXECUTOR_WORKERS", "1"))
+
+    CLASSIFY_MAX_BATCH_SIZE = int(os.getenv("CLASSIFY_MAX_BATCH_SIZE", "32"))
+    CLASSIFY_MAX_WAIT_MS    = float(os.getenv("CLASSIFY_MAX_WAIT_MS", "5"))
+    # Caps the goal texts of one POST /classify/batch.
+    CLASSIFY_MAX_REQUEST_TEXTS = int(os.getenv("CLASSIFY_MAX_REQUEST_TEXTS", "256"))
+
+    # Goal classifier backend: tensorflow, onnx, tflite or linear (see app/core/classifier_tools.py).
+    CLASSIFIER_BACKEND    = os.getenv("CLASSIFIER_BACKEND", "tensorflow")
+    # Overrides the backend's default artifact under models/.
+    CLASSIFIER_MODEL_PATH = os.getenv("CLASSIFIER_MODEL_PATH") or None
+    GOAL_DATA_PATH        = Path(os.getenv("GOAL_DATA_PATH", BASE_DIR / "data" / "goal_data.csv"))
+
+    # How long /classify waits for a still-loading model before answering 503 (0 = don't wait).
+    CLASSIFIER_READY_TIMEOUT_SECONDS = float(os.getenv("CLASSIFIER_READY_TIMEOUT_SECONDS", "10"))
+
+    CLASSIFY_CACHE_SIZE        = int(os.getenv("CLASSIFY_CACHE_SIZE", "4096"))
+    CLASSIFY_CACHE_TTL_SECONDS = float(os.getenv("CLASSIFY_CACHE_TTL_SECONDS", "86400"))
+    # Optional SQLite file for a cache tier that survives restarts; unset keeps the cache in memory only.
+    CLASSIFY_CACHE_PATH        = os.getenv("CLASSIFY_CACHE_PATH") or None
+
+    # Connection tuning; the SQLITE_* settings are ignored for other databases.
+    DB_READ_POOL_SIZE       = int(os.getenv("DB_READ_POOL_SIZE", "8"))
+    DB_READ_POOL_OVERFLOW   = int(os.getenv("DB_READ_POOL_OVERFLOW", "8"))
+    WRITE_QUEUE_MAX_BATCH   = int(os.getenv("WRITE_QUEUE_MAX_BATCH", "64"))
+    SQLITE_BUSY_TIMEOUT_MS  = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_CACHE_SIZE_MB    = int(os.getenv("SQLITE_CACHE_SIZE_MB", "32"))
+    SQLITE_MMAP_SIZE_MB     = int(os.getenv("SQLITE_MMAP_SIZE_MB", "256"))
+    SQLITE_SYNCHRONOUS      = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+
+    # How plans are saved: rows (one meal_plans row per slot), packed (one plans row per plan) or both.
+    PLAN_STORAGE = os.getenv("PLAN_STORAGE", "rows")
+    # GET /users/{id}/plans response cache; the TTL bounds staleness from plans saved by other processes.
+    PLAN_CACHE_USERS       = int(os.getenv("PLAN_CACHE_USERS", "10000"))
+    PLAN_CACHE_TTL_SECONDS = float(os.getenv("PLAN_CACHE_TTL_SECONDS", "300"))
+    PLAN_CACHE_RANGES_PER_USER = int(os.getenv("PLAN_CACHE_RANGES_PER_USER", "8"))
+
+    # How weekly plans are built: greedy (a weighted draw per slot) or beam (see app/db/core/optimizer.py).
+    PLAN_OPTIMIZER                = os.getenv("PLAN_OPTIMIZER", "greedy")
+    OPTIMIZER_TIME_BUDGET_MS      = float(os.getenv("OPTIMIZER_TIME_BUDGET_MS", "200"))
+    OPTIMIZER_BEAM_WIDTH          = int(os.getenv("OPTIMIZER_BEAM_WIDTH", "64"))
+    OPTIMIZER_CANDIDATES_PER_SLOT = int(os.getenv("OPTIMIZER_CANDIDATES_PER_SLOT", "128"))
+    # Caps the re-searches of the worst day, so a seeded plan is reproducible when the time budget is not hit.
+    OPTIMIZER_MAX_REFINEMENTS     = int(os.getenv("OPTIMIZER_MAX_REFINEMENTS", "32"))
+    # Allowed relative deviation of a day's calories, and of each macro, from the daily targets.
+    OPTIMIZER_CALORIE_TOLERANCE   = float(os.getenv("OPTIMIZER_CALORIE_TOLERANCE", "0.05"))
+    OPTIMIZER_MACRO_TOLERANCE     = float(os.getenv("OPTIMIZER_MACRO_TOLERANCE", "0.15"))
+    # Upper bound of weeks one batch request may plan per user.
+    PLAN_MAX_WEEKS = int(os.getenv("PLAN_MAX_WEEKS", "12"))
+
+    SEED_BATCH_SIZE = int(os.getenv("SEED_BATCH_SIZE", "2000"))
+    # How often a process compares its in-memory catalog with the database's catalog version.
+    CATALOG_VERSION_CHECK_SECONDS = float(os.getenv("CATALOG_VERSION_CHECK_SECONDS", "5"))
+
+    # Planner, rule and save messages are logged at DEBUG, so they cost nothing at the default level.
+    LOG_LEVEL       = os.getenv("LOG_LEVEL", "INFO").upper()
+    # Stage timing histograms served on /metrics.
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+    # Opt-in sampling profiles of single /plan requests (X-Profile: 1 or ?profile=1). Only enable
+    # where clients are trusted: profiles expose code paths and cost CPU while they run.
+    PROFILING_ENABLED          = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+    PROFILE_DIR                = Path(os.getenv("PROFILE_DIR", BASE_DIR / "profiles"))
+    PROFILE_MAX_FILES          = int(os.getenv("PROFILE_MAX_FILES", "100"))
+    PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "2"))
+
+    FEEDBACK_MODEL_DIR          = Path(os.getenv("FEEDBACK_MODEL_DIR", BASE_DIR / "models" / "feedback"))
+    FEEDBACK_MODELS_IN_MEMORY   = int(os.getenv("FEEDBACK_MODELS_IN_MEMORY", "1024"))
+
 settings = Settings()
@@ -0,0 +1,146 @@
+# backend/app/core/batching.py
+
+import asyncio
+import logging
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from app.core.classification_cache import ClassificationCache
+
+logger = logging.getLogger(__name__)
+
+class MicroBatcher:
+    """
+    Collects concurrent single-item requests into batches for a batch function.
+
+    Items submitted from the event loop are queued; a single consumer task waits up to
+    `max_wait_ms` (or until `max_batch_size` items are queued), runs the batch function
+    once in a worker thread, and resolves every caller's future with its own result.
+    The event loop itself never blocks on the model.
+
+    With a `cache`, memory hits are answered immediately without queueing, and every
+    computed result is stored for later callers. The cache's disk tier is read and
+    written on a dedicated thread, each batch's results in one transaction, so the
+    event loop never waits on SQLite.
+
+    `ready`, when given, is awaited before a cache miss is queued (e.g. waiting for a
+    model that is still loading), so cache hits are served even before it is ready.
+    """
+    def __init__(self, batch_fn: Callable[[List[str]], List[dict]], max_batch_size: int = 32,
+                 max_wait_ms: float = 5.0, executor: Optional[Executor] = None,
+                 cache: Optional["ClassificationCache"] = None,
+                 ready: Optional[Callable[[], Awaitable[Any]]] = None):
+        self.batch_fn = batch_fn
+        self.cache = cache
+        self.ready = ready
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # The batch taken off the queue, from its first item until its results are set.
+        self._in_flight: List[Tuple[str, asyncio.Future]] = []
+        self._cache_executor: Optional[ThreadPoolExecutor] = None
+
+    async def start(self):
+        """Starts the consumer task on the running event loop."""
+        if self._owns_executor:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="classifier")
+        if self.cache is not None and self.cache.has_disk:
+            self._cache_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="classify-cache")
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancels the consumer and fails anything still queued or in flight."""
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        pending, self._in_flight = self._in_flight, []
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(RuntimeError("Classifier is shutting down."))
+        if self._owns_executor and self._executor:
+            self._executor.shutdown(wait=False)
+        if self._cache_executor is not None:
+            # Lets queued disk writes finish before the cache is closed.
+            self._cache_executor.shutdown(wait=True)
+            self._cache_executor = None
+
+    async def submit(self, text: str) -> dict:
+        """Queues one text and waits for its result from the next batch."""
+        if self._worker is None:
+            raise RuntimeError("MicroBatcher has not been started.")
+        if self.cache is not None:
+            cached = self.cache.get_memory(text)
+            if cached is None and self._cache_executor is not None:
+                cached = await asyncio.get_running_loop().run_in_executor(
+                    self._cache_executor, self.cache.get_disk, text
+                )
+            if cached is not None:
+                return cached
+        if self.ready is not None:
+            await self.ready()
+            if self._worker is None:
+                raise RuntimeError("Classifier is shutting down.")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def submit_many(self, texts: List[str]) -> List[dict]:
+        """Queues several texts at once; they are batched with any concurrent requests."""
+        return list(await asyncio.gather(*(self.submit(text) for text in texts)))
+
+    async def _collect(self) -> List[Tuple[str, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = self._in_flight = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _persist(self, items: List[Tuple[str, dict]]) -> None:
+        """Writes a batch's results to the cache's disk tier without waiting for it."""
+        def log_failure(future: Future):
+            if future.exception() is not None:
+                logger.warning("Could not persist %s classification results: %s", len(items), future.exception())
+
+        self._cache_executor.submit(self.cache.persist_many, items).add_done_callback(log_failure)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            # Callers that gave up (e.g. client disconnects) don't need a forward pass.
+            batch = [(text, future) for text, future in batch if not future.done()]
+            if not batch:
+                continue
+            try:
+                results = await loop.run_in_executor(self._executor, self.batch_fn, [text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            if self.cache is not None:
+                computed = [(text, result) for (text, _), result in zip(batch, results)]
+                self.cache.remember_many(computed)
+                if self._cache_executor is not None:
+                    self._persist(computed)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
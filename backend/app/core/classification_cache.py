@@ -0,0 +1,168 @@
+# backend/app/core/classification_cache.py
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+
+def normalize_goal_text(text: str) -> str:
+    """Case- and whitespace-folds goal text so trivially different inputs share a cache entry."""
+    return " ".join(text.casefold().split())
+
+
+class ClassificationCache:
+    """
+    An LRU + TTL cache of goal classification results, keyed on normalized text.
+
+    The in-memory tier holds up to `max_entries` results. When `disk_path` is given,
+    results are also written to a small SQLite table so they survive restarts; a
+    memory miss falls through to disk and promotes the entry back into memory.
+    Entries are tagged with a `namespace` (e.g. the model's fingerprint) so results
+    from a different model are never served.
+
+    The memory tier (`get_memory`, `remember_many`) never blocks on disk and can be
+    used from the event loop; the disk tier (`get_disk`, `persist_many`) runs SQLite
+    I/O and belongs on a worker thread. `get` and `put` cover both tiers at once.
+    """
+    def __init__(self, max_entries: int = 4096, ttl_seconds: float = 86400.0,
+                 disk_path: Optional[Path] = None, namespace: str = ""):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.namespace = namespace
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Guards the SQLite connection, so disk I/O never holds up memory lookups.
+        self._disk_lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._disk: Optional[sqlite3.Connection] = None
+        if disk_path:
+            Path(disk_path).parent.mkdir(parents=True, exist_ok=True)
+            self._disk = sqlite3.connect(str(disk_path), check_same_thread=False)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS classification_cache ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, result TEXT NOT NULL, created_at REAL NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            self._disk.commit()
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - created_at > self.ttl_seconds
+
+    def _remember(self, key: str, result: dict, created_at: float) -> None:
+        self._entries[key] = (result, created_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    @property
+    def has_disk(self) -> bool:
+        return self._disk is not None
+
+    def get_memory(self, text: str) -> Optional[dict]:
+        """
+        Returns a copy of the in-memory result for `text`, or None. A miss is only
+        counted here when there is no disk tier to fall through to.
+        """
+        key = normalize_goal_text(text)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry[1], now):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(entry[0])
+            if entry is not None:
+                del self._entries[key]
+            if self._disk is None:
+                self.misses += 1
+            return None
+
+    def get_disk(self, text: str) -> Optional[dict]:
+        """Looks `text` up in the disk tier and promotes a hit into memory. Blocks on SQLite."""
+        key = normalize_goal_text(text)
+        now = time.time()
+        row = None
+        with self._disk_lock:
+            if self._disk is not None:
+                row = self._disk.execute(
+                    "SELECT result, created_at FROM classification_cache WHERE namespace = ? AND key = ?",
+                    (self.namespace, key)
+                ).fetchone()
+        with self._lock:
+            if row is not None and not self._expired(row[1], now):
+                result = json.loads(row[0])
+                self._remember(key, result, row[1])
+                self.hits += 1
+                self.disk_hits += 1
+                return dict(result)
+            self.misses += 1
+            return None
+
+    def get(self, text: str) -> Optional[dict]:
+        """Returns a copy of the cached result for `text` from either tier, or None on a miss."""
+        cached = self.get_memory(text)
+        if cached is None and self._disk is not None:
+            cached = self.get_disk(text)
+        return cached
+
+    def remember_many(self, items: List[Tuple[str, dict]]) -> None:
+        """Stores (text, result) pairs in the memory tier only."""
+        now = time.time()
+        with self._lock:
+            for text, result in items:
+                self._remember(normalize_goal_text(text), dict(result), now)
+
+    def persist_many(self, items: List[Tuple[str, dict]]) -> None:
+        """Writes (text, result) pairs to the disk tier in one transaction. Blocks on SQLite."""
+        now = time.time()
+        rows = [(self.namespace, normalize_goal_text(text), json.dumps(result), now) for text, result in items]
+        with self._disk_lock:
+            if self._disk is not None and rows:
+                with self._disk:
+                    self._disk.executemany(
+                        "INSERT OR REPLACE INTO classification_cache (namespace, key, result, created_at) VALUES (?, ?, ?, ?)",
+                        rows
+                    )
+
+    def put(self, text: str, result: dict) -> None:
+        """Stores a classification result for `text` in every tier."""
+        self.remember_many([(text, result)])
+        self.persist_many([(text, result)])
+
+    def clear(self) -> None:
+        """Drops every entry of this namespace from memory and disk and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+        with self._disk_lock:
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM classification_cache WHERE namespace = ?", (self.namespace,))
+                self._disk.commit()
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size, for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "disk_enabled": self._disk is not None,
+            }
+
+    def close(self) -> None:
+        with self._disk_lock:
+            if self._disk is not None:
+                self._disk.close()
+                self._disk = None
@@ -1,39 +1,201 @@
 import os
-import tensorflow as tf
-from transformers import TFDistilBertForSequenceClassification, DistilBertTokenizerFast
+from typing import List, Optional
+
+import numpy as np
+
+from app.core.metrics import CLASSIFY_SECONDS, span
+
+GOAL_LABELS = [
+    "weight_loss",      # 0
+    "muscle_gain",      # 1
+    "maintenance",      # 2
+    "general_health",   # 3
+    "weight_gain"       # 4
+]
+
+# Default artifact of each backend, relative to the models directory.
+BACKEND_ARTIFACTS = {
+    "tensorflow": "goal_classifier_model",
+    "onnx": "goal_classifier.onnx",
+    "tflite": "goal_classifier.tflite",
+    "linear": "goal_classifier_linear.joblib",
+}
+
+# Sequence length of the exported graphs. Goal texts are short, and TFLite needs a fixed shape.
+EXPORT_MAX_LENGTH = 64
+
+
+def model_fingerprint(model_path: str) -> str:
+    """Identifies a model on disk without loading it, so caches can tell models apart."""
+    path = os.path.abspath(model_path)
+    return f"{path}@{os.path.getmtime(path):.0f}" if os.path.exists(path) else path
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    logits = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+def _require(*paths: Optional[str]) -> None:
+    missing = [os.path.abspath(p) for p in paths if p is not None and not os.path.exists(p)]
+    if missing:
+        raise FileNotFoundError("Classifier artifacts not found. Searched paths:\n" + "\n".join(missing))
+
+
+class _WordPieceTokenizer:
+    """
+    Tokenizes with the `tokenizers` library straight from tokenizer.json, so the
+    exported backends need neither transformers nor TensorFlow.
+    """
+    def __init__(self, tokenizer_path: str, max_length: int):
+        from tokenizers import Tokenizer
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(tokenizer_path, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.max_length = max_length
+
+    def __call__(self, texts: List[str], fixed_length: bool = False):
+        if fixed_length:
+            self.tokenizer.enable_padding(length=self.max_length)
+        else:
+            self.tokenizer.enable_padding()
+        encodings = self.tokenizer.encode_batch(list(texts))
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        return input_ids, attention_mask
+
+
+class TensorFlowBackend:
+    """The fine-tuned DistilBERT served through full TensorFlow and transformers."""
+    def __init__(self, model_path: str, tokenizer_path: str):
+        # Imported here rather than at module level, since importing them alone takes seconds.
+        import tensorflow as tf
+        from transformers import TFDistilBertForSequenceClassification, DistilBertTokenizerFast
+
+        _require(model_path, tokenizer_path)
+        self._tf = tf
+        self.model = TFDistilBertForSequenceClassification.from_pretrained(model_path)
+        self.tokenizer = DistilBertTokenizerFast.from_pretrained(tokenizer_path)
+
+    def predict_proba(self, texts: List[str]) -> np.ndarray:
+        inputs = self.tokenizer(list(texts), return_tensors="tf", truncation=True, padding=True)
+        outputs = self.model(inputs).logits
+        return self._tf.nn.softmax(outputs, axis=-1).numpy()
+
+
+class OnnxBackend:
+    """The same DistilBERT exported to ONNX and run with ONNX Runtime on CPU."""
+    def __init__(self, model_path: str, tokenizer_path: str):
+        import onnxruntime as ort
+
+        _require(model_path, tokenizer_path)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.inputs = {i.name: (np.int32 if i.type == "tensor(int32)" else np.int64) for i in self.session.get_inputs()}
+        self.tokenizer = _WordPieceTokenizer(tokenizer_path, EXPORT_MAX_LENGTH)
+
+    def predict_proba(self, texts: List[str]) -> np.ndarray:
+        input_ids, attention_mask = self.tokenizer(texts)
+        feeds = {}
+        for name, dtype in self.inputs.items():
+            feeds[name] = (attention_mask if "mask" in name else input_ids).astype(dtype)
+        logits = self.session.run(None, feeds)[0]
+        return _softmax(logits)
+
+
+class TFLiteBackend:
+    """
+    The same DistilBERT converted to TFLite (optionally dynamic-range quantized).
+    Uses the standalone `tflite_runtime` interpreter when installed.
+    """
+    def __init__(self, model_path: str, tokenizer_path: str):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+
+        _require(model_path, tokenizer_path)
+        self.interpreter = Interpreter(model_path=model_path)
+        self.input_details = self.interpreter.get_input_details()
+        self.output_index = self.interpreter.get_output_details()[0]["index"]
+        self.tokenizer = _WordPieceTokenizer(tokenizer_path, EXPORT_MAX_LENGTH)
+        self._batch_size = None
+
+    def predict_proba(self, texts: List[str]) -> np.ndarray:
+        input_ids, attention_mask = self.tokenizer(texts, fixed_length=True)
+        if self._batch_size != len(texts):
+            for detail in self.input_details:
+                self.interpreter.resize_tensor_input(detail["index"], [len(texts), EXPORT_MAX_LENGTH])
+            self.interpreter.allocate_tensors()
+            self._batch_size = len(texts)
+        for detail in self.input_details:
+            values = attention_mask if "mask" in detail["name"] else input_ids
+            self.interpreter.set_tensor(detail["index"], values.astype(detail["dtype"]))
+        self.interpreter.invoke()
+        return _softmax(self.interpreter.get_tensor(self.output_index))
+
+
+class LinearBackend:
+    """
+    A TF-IDF + logistic regression pipeline trained on goal_data.csv (optionally on
+    the DistilBERT model's own predictions). A few megabytes of RSS instead of a
+    full TensorFlow runtime.
+    """
+    def __init__(self, model_path: str, tokenizer_path: Optional[str] = None):
+        import joblib
+
+        _require(model_path)
+        self.pipeline = joblib.load(model_path)
+
+    def predict_proba(self, texts: List[str]) -> np.ndarray:
+        probabilities = self.pipeline.predict_proba(list(texts))
+        # The pipeline may have seen only a subset of labels; spread its columns into label order.
+        full = np.zeros((len(texts), len(GOAL_LABELS)))
+        full[:, self.pipeline.classes_.astype(int)] = probabilities
+        return full
+
+
+BACKENDS = {
+    "tensorflow": TensorFlowBackend,
+    "onnx": OnnxBackend,
+    "tflite": TFLiteBackend,
+    "linear": LinearBackend,
+}
+
 
 class GoalClassifier:
     """
     A classifier to determine a user's primary health goal from freeform text.
-    It uses a pre-trained DistilBERT model fine-tuned for sequence classification.
+    By default it uses a pre-trained DistilBERT model fine-tuned for sequence
+    classification; `backend` selects an exported ONNX/TFLite graph of the same
+    model or a distilled linear model instead, behind the same interface.
     """
-    def __init__(self, model_path: str, tokenizer_path: str):
+    def __init__(self, model_path: str, tokenizer_path: Optional[str] = None, backend: str = "tensorflow"):
         """
-        Initializes the GoalClassifier by loading the model, tokenizer,
-        and dynamically setting the labels from the model's configuration.
+        Initializes the GoalClassifier by loading the chosen backend's model and tokenizer.
+
+        Args:
+            model_path (str): The backend's artifact (see BACKEND_ARTIFACTS).
+            tokenizer_path (str, optional): The DistilBERT tokenizer directory; unused by the linear backend.
+            backend (str): One of 'tensorflow', 'onnx', 'tflite' or 'linear'.
         """
-        print("-> Loading classifier model and tokenizer...")
-        if not os.path.exists(model_path) or not os.path.exists(tokenizer_path):
-            raise FileNotFoundError(
-                f"Model or tokenizer not found. Searched paths:"
-                f"\nModel: {os.path.abspath(model_path)}"
-                f"\nTokenizer: {os.path.abspath(tokenizer_path)}"
-            )
-        
-        self.model = TFDistilBertForSequenceClassification.from_pretrained(model_path)
-        self.tokenizer = DistilBertTokenizerFast.from_pretrained(tokenizer_path)
-        
-        self.labels = [
-            "weight_loss",      # 0
-            "muscle_gain",      # 1
-            "maintenance",      # 2
-            "general_health",   # 3
-            "weight_gain"       # 4
-        ]
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown classifier backend '{backend}'. Choose one of: {', '.join(BACKENDS)}.")
+
+        print(f"-> Loading classifier model and tokenizer ({backend} backend)...")
+        self.backend_name = backend
+        self.backend = BACKENDS[backend](model_path, tokenizer_path)
+        self.fingerprint = model_fingerprint(model_path)
+        self.labels = list(GOAL_LABELS)
 
-        
         print(f"-> Classifier loaded successfully with labels: {self.labels}")
 
+    def predict_proba(self, texts: List[str]) -> np.ndarray:
+        """Class probabilities, one row per text, columns in `labels` order."""
+        return self.backend.predict_proba(list(texts))
+
     def classify(self, text: str) -> dict:
         """
         Classifies the given text into one of the predefined goal categories.
@@ -44,12 +206,25 @@ class GoalClassifier:
         Returns:
             dict: A dictionary containing the predicted 'label' and its 'confidence' score.
         """
-        inputs = self.tokenizer(text, return_tensors="tf", truncation=True, padding=True)
-        outputs = self.model(inputs).logits
-        probabilities = tf.nn.softmax(outputs, axis=-1)[0]
-        predicted_index = tf.argmax(probabilities).numpy()
-        
-        label = self.labels[predicted_index]
-        confidence = probabilities[predicted_index].numpy()
-        
-        return {"label": label, "confidence": float(confidence)}
\ No newline at end of file
+        return self.classify_batch([text])[0]
+
+    def classify_batch(self, texts: List[str]) -> List[dict]:
+        """
+        Classifies several texts with a single padded forward pass.
+
+        Args:
+            texts (List[str]): The users' goal descriptions.
+
+        Returns:
+            List[dict]: One {'label', 'confidence'} dictionary per input text, in order.
+        """
+        if not texts:
+            return []
+        with span(CLASSIFY_SECONDS, backend=self.backend_name):
+            probabilities = self.predict_proba(texts)
+        predicted_indices = probabilities.argmax(axis=-1)
+
+        return [
+            {"label": self.labels[index], "confidence": float(row[index])}
+            for row, index in zip(probabilities, predicted_indices)
+        ]
@@ -0,0 +1,214 @@
+# backend/app/core/classifier_tools.py
+"""
+Builds the lightweight goal classifier backends and compares them.
+
+    python -m app.core.classifier_tools train-linear [--distill]
+    python -m app.core.classifier_tools export-onnx
+    python -m app.core.classifier_tools export-tflite [--quantize]
+    python -m app.core.classifier_tools compare
+
+Run from the backend directory; artifacts are written to ./models by default,
+where the API looks for them (see CLASSIFIER_BACKEND).
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.config import settings
+from app.core.resources import peak_rss_mb
+from app.core.classifier import BACKEND_ARTIFACTS, EXPORT_MAX_LENGTH, GoalClassifier
+
+
+def _artifact(models_dir: str, backend: str) -> str:
+    return os.path.join(models_dir, BACKEND_ARTIFACTS[backend])
+
+
+def _tokenizer(models_dir: str) -> str:
+    return os.path.join(models_dir, "tokenizer")
+
+
+def load_goal_data(path: str) -> Tuple[List[str], np.ndarray]:
+    df = pd.read_csv(path)
+    return df["text"].astype(str).tolist(), df["label"].to_numpy(dtype=int)
+
+
+def train_linear(args) -> None:
+    """Trains the TF-IDF + logistic regression backend, optionally distilled from DistilBERT."""
+    import joblib
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import cross_val_score
+    from sklearn.pipeline import Pipeline
+
+    texts, labels = load_goal_data(args.data)
+    if args.distill:
+        teacher = GoalClassifier(_artifact(args.models_dir, "tensorflow"), _tokenizer(args.models_dir))
+        teacher_labels = np.concatenate([
+            teacher.predict_proba(texts[i:i + 64]).argmax(axis=-1) for i in range(0, len(texts), 64)
+        ])
+        print(f"-> Teacher agrees with the gold labels on {np.mean(teacher_labels == labels):.1%} of rows.")
+        labels = teacher_labels
+
+    pipeline = Pipeline([
+        ("tfidf", TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, min_df=1)),
+        ("clf", LogisticRegression(C=args.c, max_iter=2000)),
+    ])
+    scores = cross_val_score(pipeline, texts, labels, cv=5)
+    print(f"-> 5-fold accuracy: {scores.mean():.3f} ± {scores.std():.3f}")
+
+    pipeline.fit(texts, labels)
+    output = args.output or _artifact(args.models_dir, "linear")
+    joblib.dump(pipeline, output)
+    print(f"-> ✅ Linear classifier written to {output} ({os.path.getsize(output) / 1024:.0f} KiB).")
+
+
+def _teacher_signature(tf):
+    return [
+        tf.TensorSpec((None, None), tf.int32, name="input_ids"),
+        tf.TensorSpec((None, None), tf.int32, name="attention_mask"),
+    ]
+
+
+def export_onnx(args) -> None:
+    """Exports the TensorFlow DistilBERT to an ONNX graph with dynamic batch and sequence axes."""
+    import tensorflow as tf
+    import tf2onnx
+    from transformers import TFDistilBertForSequenceClassification
+
+    model = TFDistilBertForSequenceClassification.from_pretrained(_artifact(args.models_dir, "tensorflow"))
+
+    @tf.function(input_signature=_teacher_signature(tf))
+    def logits(input_ids, attention_mask):
+        return model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+    output = args.output or _artifact(args.models_dir, "onnx")
+    tf2onnx.convert.from_function(logits, input_signature=_teacher_signature(tf), opset=args.opset, output_path=output)
+    print(f"-> ✅ ONNX classifier written to {output} ({os.path.getsize(output) / 2**20:.1f} MiB).")
+
+
+def export_tflite(args) -> None:
+    """Converts the TensorFlow DistilBERT to TFLite with a fixed sequence length."""
+    import tensorflow as tf
+    from transformers import TFDistilBertForSequenceClassification
+
+    model = TFDistilBertForSequenceClassification.from_pretrained(_artifact(args.models_dir, "tensorflow"))
+    signature = [
+        tf.TensorSpec((None, EXPORT_MAX_LENGTH), tf.int32, name="input_ids"),
+        tf.TensorSpec((None, EXPORT_MAX_LENGTH), tf.int32, name="attention_mask"),
+    ]
+
+    @tf.function(input_signature=signature)
+    def logits(input_ids, attention_mask):
+        return model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([logits.get_concrete_function()], model)
+    if args.quantize:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    output = args.output or _artifact(args.models_dir, "tflite")
+    with open(output, "wb") as f:
+        f.write(converter.convert())
+    print(f"-> ✅ TFLite classifier written to {output} ({os.path.getsize(output) / 2**20:.1f} MiB).")
+
+
+def _benchmark_backend(backend: str, models_dir: str, data_path: str, repeats: int) -> Dict:
+    """Runs in a fresh process so import cost and peak RSS are attributed to one backend only."""
+    texts, labels = load_goal_data(data_path)
+    rss_before = peak_rss_mb()
+    started = time.perf_counter()
+    classifier = GoalClassifier(_artifact(models_dir, backend), _tokenizer(models_dir), backend=backend)
+    load_seconds = time.perf_counter() - started
+
+    predictions = np.concatenate([
+        classifier.predict_proba(texts[i:i + 32]).argmax(axis=-1) for i in range(0, len(texts), 32)
+    ])
+
+    single = []
+    for i in range(repeats):
+        t = time.perf_counter()
+        classifier.classify(texts[i % len(texts)])
+        single.append((time.perf_counter() - t) * 1000)
+    t = time.perf_counter()
+    for i in range(0, len(texts), 32):
+        classifier.classify_batch(texts[i:i + 32])
+    batch_seconds = time.perf_counter() - t
+
+    return {
+        "backend": backend,
+        "accuracy": float(np.mean(predictions == labels)),
+        "predictions": predictions.tolist(),
+        "load_seconds": load_seconds,
+        "p50_ms": statistics.median(single),
+        "p95_ms": float(np.percentile(single, 95)),
+        "batch_texts_per_second": len(texts) / batch_seconds,
+        "rss_baseline_mb": rss_before,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def compare(args) -> None:
+    """Compares every backend whose artifact exists on accuracy, agreement, latency and memory."""
+    backends = [b for b in args.backends if os.path.exists(_artifact(args.models_dir, b))]
+    for missing in sorted(set(args.backends) - set(backends)):
+        print(f"-> Skipping {missing}: {_artifact(args.models_dir, missing)} not found.")
+
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for backend in backends:
+        with context.Pool(1) as pool:
+            try:
+                results.append(pool.apply(_benchmark_backend, (backend, args.models_dir, args.data, args.repeats)))
+            except Exception as e:
+                print(f"-> ❗ {backend} failed: {e}")
+
+    reference = next((r for r in results if r["backend"] == "tensorflow"), None)
+    print("\n" + "="*96)
+    print(f"{'backend':<11}{'accuracy':>9}{'agree/tf':>10}{'load s':>8}{'p50 ms':>8}{'p95 ms':>8}"
+          f"{'batch txt/s':>13}{'peak RSS MB':>13}")
+    for r in results:
+        agreement = (np.mean(np.array(r["predictions"]) == np.array(reference["predictions"]))
+                     if reference else float("nan"))
+        print(f"{r['backend']:<11}{r['accuracy']:>9.3f}{agreement:>10.3f}{r['load_seconds']:>8.2f}"
+              f"{r['p50_ms']:>8.2f}{r['p95_ms']:>8.2f}{r['batch_texts_per_second']:>13.1f}{r['peak_rss_mb']:>13.1f}")
+    print("="*96)
+    print("Accuracy is measured on goal_data.csv, which the linear model was trained on; see its cross-validated score.\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build and compare goal classifier backends.")
+    parser.add_argument("--models-dir", default="models", help="Directory holding the classifier artifacts.")
+    parser.add_argument("--data", default=str(settings.GOAL_DATA_PATH), help="Labelled goal texts (text,label CSV).")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    linear = commands.add_parser("train-linear", help="Train the TF-IDF + logistic regression backend.")
+    linear.add_argument("--distill", action="store_true", help="Train on the DistilBERT model's predictions instead of the gold labels.")
+    linear.add_argument("--c", type=float, default=10.0, help="Inverse regularization strength.")
+    linear.add_argument("--output", default=None)
+    linear.set_defaults(func=train_linear)
+
+    onnx = commands.add_parser("export-onnx", help="Export DistilBERT to ONNX (needs tf2onnx).")
+    onnx.add_argument("--opset", type=int, default=17)
+    onnx.add_argument("--output", default=None)
+    onnx.set_defaults(func=export_onnx)
+
+    tflite = commands.add_parser("export-tflite", help="Convert DistilBERT to TFLite.")
+    tflite.add_argument("--quantize", action="store_true", help="Apply dynamic-range int8 weight quantization.")
+    tflite.add_argument("--output", default=None)
+    tflite.set_defaults(func=export_tflite)
+
+    cmp = commands.add_parser("compare", help="Compare backends on accuracy, latency and memory.")
+    cmp.add_argument("--backends", nargs="+", default=list(BACKEND_ARTIFACTS), choices=list(BACKEND_ARTIFACTS))
+    cmp.add_argument("--repeats", type=int, default=200, help="Single-text classifications timed per backend.")
+    cmp.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
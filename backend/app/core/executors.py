@@ -0,0 +1,27 @@
+# backend/app/core/executors.py
+
+import asyncio
+import functools
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable
+
+from app.config import settings
+
+
+def create_plan_executor() -> ThreadPoolExecutor:
+    """
+    Threads for the CPU-bound planner. Kept apart from Starlette's threadpool so a
+    burst of plan requests cannot starve user, feedback or health requests.
+    """
+    return ThreadPoolExecutor(max_workers=settings.PLAN_EXECUTOR_WORKERS, thread_name_prefix="planner")
+
+
+def create_classify_executor() -> ThreadPoolExecutor:
+    """Threads running the goal classifier's micro-batches."""
+    return ThreadPoolExecutor(max_workers=settings.CLASSIFY_EXECUTOR_WORKERS, thread_name_prefix="classifier")
+
+
+async def run_in_executor(executor: Executor, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Awaits `fn(*args, **kwargs)` on the given executor without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
@@ -1,35 +1,130 @@
 # C:\Users\jrochau\projects\NutriPlan AI\backend\core\feedback.py
 
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, List, Optional, Tuple
+
+import joblib
 import pandas as pd
+from sqlalchemy import func, insert, update
 from sqlalchemy.orm import Session
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import HashingVectorizer
 from sklearn.naive_bayes import MultinomialNB
-from sklearn.pipeline import make_pipeline
 import numpy as np
 
 from app.db.models.feedback import Feedback as FeedbackModel
+from app.db.models.feedback_revision import FeedbackRevision
 from app.db.models.meal import Meal
 
+if TYPE_CHECKING:
+    from app.db.core.catalog import MealCatalog
+
+logger = logging.getLogger(__name__)
+
+FeedbackVersion = Tuple[int, int, int]
+
+def get_feedback_version(db: Session, user_id: int) -> FeedbackVersion:
+    """
+    Returns a cheap version stamp of a user's feedback: (row count, highest feedback id,
+    feedback revision). Every write that changes feedback bumps the revision (see
+    bump_feedback_revision), so the stamp can key caches derived from that feedback
+    even when deleted ids are reused by new rows.
+    """
+    revision = db.query(FeedbackRevision.revision).filter(FeedbackRevision.user_id == user_id).scalar_subquery()
+    count, max_id, revision = db.query(func.count(FeedbackModel.id), func.max(FeedbackModel.id), revision).filter(
+        FeedbackModel.user_id == user_id
+    ).one()
+    return (count or 0, max_id or 0, revision or 0)
+
+def bump_feedback_revision(db: Session, user_id: int) -> int:
+    """
+    Increments the user's feedback revision within the caller's transaction; call it in
+    the same write that inserts or deletes the user's feedback. Returns the new revision.
+    """
+    updated = db.execute(
+        update(FeedbackRevision).where(FeedbackRevision.user_id == user_id)
+        .values(revision=FeedbackRevision.revision + 1)
+    )
+    if updated.rowcount == 0:
+        db.execute(insert(FeedbackRevision).values(user_id=user_id, revision=1))
+    return db.query(FeedbackRevision.revision).filter(FeedbackRevision.user_id == user_id).scalar()
+
+def meal_text_features(name: str, tags: Optional[Iterable[str]]) -> str:
+    """The text a meal is represented by for feedback learning: its name plus its tags."""
+    return name + ' ' + ' '.join(tags or [])
+
 class FeedbackEngine:
     """
     Manages user-specific adaptive learning models using Naive Bayes.
     This engine learns from user-provided text feedback (likes/dislikes on meal names and tags)
     to predict the probability of a user liking other meals.
+
+    Text is featurized with a stateless HashingVectorizer shared by every user, so a user's
+    model can be updated one rating at a time with `partial_fit` instead of refitting a
+    vocabulary. When `model_dir` is given, fitted models are persisted there with joblib and
+    tagged with the feedback version they were trained on, so they survive restarts.
     """
-    def __init__(self):
-        self.user_models = {}
+    CLASSES = np.array([0, 1])
+
+    def __init__(self, model_dir: Optional[Path] = None, max_models_in_memory: int = 1024):
+        self.user_models: "OrderedDict[int, dict]" = OrderedDict()
+        self.model_dir = Path(model_dir) if model_dir else None
+        self.max_models_in_memory = max_models_in_memory
+        self.vectorizer = HashingVectorizer(stop_words='english', alternate_sign=False, n_features=2 ** 18)
+        self._lock = threading.RLock()
+        if self.model_dir:
+            self.model_dir.mkdir(parents=True, exist_ok=True)
 
     def _get_model_for_user(self, user_id: int):
         """
-        Retrieves or creates a model pipeline for a given user.
-        A pipeline simplifies the process by chaining the vectorizer and classifier.
+        Retrieves or creates the model record for a given user, evicting the least
+        recently used in-memory models beyond `max_models_in_memory`.
         """
-        if user_id not in self.user_models:
-            self.user_models[user_id] = {
-                "model": make_pipeline(TfidfVectorizer(stop_words='english'), MultinomialNB()),
-                "is_fitted": False
-            }
-        return self.user_models[user_id]
+        with self._lock:
+            if user_id not in self.user_models:
+                self.user_models[user_id] = {
+                    "model": MultinomialNB(),
+                    "is_fitted": False,
+                    "version": None,
+                    "tokens": set()
+                }
+                while len(self.user_models) > self.max_models_in_memory:
+                    self.user_models.popitem(last=False)
+            self.user_models.move_to_end(user_id)
+            return self.user_models[user_id]
+
+    def _model_path(self, user_id: int) -> Optional[Path]:
+        return self.model_dir / f"user_{user_id}.joblib" if self.model_dir else None
+
+    def _save(self, user_id: int, user_model_data: dict):
+        """Atomically persists a fitted model together with its feedback version."""
+        path = self._model_path(user_id)
+        if path is None or not user_model_data["is_fitted"]:
+            return
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        joblib.dump({key: user_model_data[key] for key in ("model", "version", "tokens")}, tmp_path)
+        os.replace(tmp_path, path)
+
+    def _load(self, user_id: int, version: FeedbackVersion) -> bool:
+        """Loads a persisted model if one exists for exactly this feedback version."""
+        path = self._model_path(user_id)
+        if path is None or not path.exists():
+            return False
+        try:
+            stored = joblib.load(path)
+        except Exception as e:
+            logger.warning("Could not load feedback model for user %s: %s", user_id, e)
+            return False
+        if tuple(stored.get("version") or ()) != tuple(version):
+            return False
+        with self._lock:
+            user_model_data = self._get_model_for_user(user_id)
+            user_model_data.update(model=stored["model"], version=tuple(version),
+                                   tokens=stored.get("tokens", set()), is_fitted=True)
+        return True
 
     def _get_feedback_data_for_user(self, db: Session, user_id: int) -> pd.DataFrame:
         """
@@ -40,76 +135,156 @@ class FeedbackEngine:
             Meal.name,
             Meal.tags
         ).join(Meal, FeedbackModel.meal_id == Meal.id).filter(FeedbackModel.user_id == user_id)
-        
+
         df = pd.read_sql(query.statement, db.bind)
-        
+        return self._prepare_feedback_frame(df)
+
+    def _prepare_feedback_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Turns raw (rating, name, tags) feedback rows into text features and binary targets."""
         if df.empty:
             return pd.DataFrame()
 
-        df['text_features'] = df['name'] + ' ' + df['tags'].apply(lambda x: ' '.join(x or []))
+        df['text_features'] = [meal_text_features(name, tags) for name, tags in zip(df['name'], df['tags'])]
 
         df['target'] = (df['rating'] > 3).astype(int)
-        
+
         return df[['text_features', 'target']]
 
-    def train(self, db: Session, user_id: int):
+    def ensure_trained(self, db: Session, user_id: int):
         """
-        Trains or retrains a specific user's feedback model.
+        Makes sure the user's model reflects their current feedback, preferring the
+        in-memory model, then the persisted one, and only then a full retrain.
         """
+        version = get_feedback_version(db, user_id)
         user_model_data = self._get_model_for_user(user_id)
-        model_pipeline = user_model_data["model"]
-        
-        feedback_df = self._get_feedback_data_for_user(db, user_id)
+        if user_model_data["version"] == version or self._load(user_id, version):
+            return
+        self.train(db, user_id, version=version)
 
-        if feedback_df.empty or feedback_df['target'].nunique() < 2:
-            print(f"Insufficient or non-varied feedback data for user {user_id}. Cannot train model.")
+    def ensure_trained_from_records(self, user_id: int, records: List[Tuple[float, str, Optional[List[str]]]],
+                                    version: FeedbackVersion):
+        """`ensure_trained` for callers that already loaded the user's feedback rows."""
+        user_model_data = self._get_model_for_user(user_id)
+        if user_model_data["version"] == tuple(version) or self._load(user_id, version):
             return
+        self.train_from_records(user_id, records, version=version)
 
-        X = feedback_df['text_features']
-        y = feedback_df['target']
+    def train(self, db: Session, user_id: int, version: Optional[FeedbackVersion] = None):
+        """
+        Trains or retrains a specific user's feedback model from scratch.
+        """
+        if version is None:
+            version = get_feedback_version(db, user_id)
+        feedback_df = self._get_feedback_data_for_user(db, user_id)
+        self._fit(user_id, feedback_df, version)
+
+    def train_from_records(self, user_id: int, records: List[Tuple[float, str, Optional[List[str]]]],
+                           version: Optional[FeedbackVersion] = None):
+        """
+        Trains a user's model from already-loaded (rating, meal name, meal tags) rows,
+        for callers that fetch feedback for many users at once.
+        """
+        feedback_df = self._prepare_feedback_frame(pd.DataFrame(records, columns=['rating', 'name', 'tags']))
+        self._fit(user_id, feedback_df, version)
 
-        model_pipeline.fit(X, y)
-        user_model_data["is_fitted"] = True
-        print(f"Feedback model for user {user_id} has been successfully trained.")
+    def _fit(self, user_id: int, feedback_df: pd.DataFrame, version: Optional[FeedbackVersion]):
+        with self._lock:
+            user_model_data = self._get_model_for_user(user_id)
+            user_model_data["version"] = tuple(version) if version is not None else None
+
+            if feedback_df.empty or feedback_df['target'].nunique() < 2:
+                user_model_data.update(model=MultinomialNB(), is_fitted=False, tokens=set())
+                logger.debug("Insufficient or non-varied feedback data for user %s. Cannot train model.", user_id)
+                return
+
+            texts = feedback_df['text_features'].tolist()
+            model = MultinomialNB()
+            model.fit(self.vectorizer.transform(texts), feedback_df['target'].to_numpy())
+            analyzer = self.vectorizer.build_analyzer()
+            user_model_data.update(model=model, is_fitted=True,
+                                   tokens={token for text in texts for token in analyzer(text)})
+            self._save(user_id, user_model_data)
+        logger.debug("Feedback model for user %s has been successfully trained.", user_id)
+
+    def record_feedback(self, user_id: int, meal_name: str, meal_tags: Optional[List[str]], rating: float,
+                        previous_version: FeedbackVersion, new_version: FeedbackVersion):
+        """
+        Folds a single new rating into the user's model with `partial_fit` in O(1).
+
+        The update is only applied on top of a model trained on exactly `previous_version`;
+        otherwise the model is left stale and the next `ensure_trained` retrains it fully.
+        """
+        with self._lock:
+            user_model_data = self._get_model_for_user(user_id)
+            if user_model_data["version"] != tuple(previous_version):
+                self._load(user_id, previous_version)
+            if user_model_data["version"] != tuple(previous_version) or not user_model_data["is_fitted"]:
+                return
+
+            text = meal_text_features(meal_name, meal_tags)
+            user_model_data["model"].partial_fit(
+                self.vectorizer.transform([text]), np.array([int(rating > 3)]), classes=self.CLASSES
+            )
+            user_model_data["tokens"].update(self.vectorizer.build_analyzer()(text))
+            user_model_data["version"] = tuple(new_version)
+            self._save(user_id, user_model_data)
 
     def predict_score(self, meals: list[Meal], user_id: int) -> list[float]:
         """
         Predicts a "like" probability score for a list of meals for a specific user.
         """
         user_model_data = self._get_model_for_user(user_id)
-        model_pipeline = user_model_data["model"]
 
         if not user_model_data["is_fitted"]:
             return [0.5] * len(meals)
-        
-        text_features = [m.name + ' ' + ' '.join(m.tags or []) for m in meals]
 
-        probabilities = model_pipeline.predict_proba(text_features)
+        text_features = [meal_text_features(m.name, m.tags) for m in meals]
+
+        probabilities = user_model_data["model"].predict_proba(self.vectorizer.transform(text_features))
         like_probabilities = probabilities[:, 1]
-        
+
         return like_probabilities.tolist()
 
+    def catalog_features(self, catalog: "MealCatalog"):
+        """
+        The sparse hashed term-frequency matrix of every catalog meal's name and tags.
+        It is built once per catalog version and shared by every user's model, since
+        the hashing feature space does not depend on the user.
+        """
+        return catalog.derived("feedback_features", lambda c: self.vectorizer.transform(
+            [meal_text_features(name, tags) for name, tags in zip(c.names, c.tags)]
+        ))
+
+    def predict_catalog_scores(self, catalog: "MealCatalog", user_id: int, candidate_indices: np.ndarray) -> np.ndarray:
+        """
+        Batch version of `predict_score` over catalog rows: one `predict_proba` call on
+        the pre-transformed catalog matrix. Returns 0.5 everywhere for untrained users.
+        """
+        user_model_data = self._get_model_for_user(user_id)
+        if not user_model_data["is_fitted"] or len(candidate_indices) == 0:
+            return np.full(len(candidate_indices), 0.5)
+        features = self.catalog_features(catalog)[candidate_indices]
+        return user_model_data["model"].predict_proba(features)[:, 1]
+
     def get_top_features(self, user_id: int, n_features: int = 20) -> dict:
         """
         Extracts the most important words (features) the user's model has learned.
         This provides insight into the AI's decision-making process.
+        Hashed features are mapped back to the words seen in the user's feedback.
         """
         user_model_data = self._get_model_for_user(user_id)
-        model_pipeline = user_model_data["model"]
 
         if not user_model_data["is_fitted"]:
             return {"message": "Model is not trained yet."}
-        
-        vectorizer = model_pipeline.named_steps['tfidfvectorizer']
-        classifier = model_pipeline.named_steps['multinomialnb']
 
-        feature_names = np.array(vectorizer.get_feature_names_out())
+        classifier = user_model_data["model"]
+        feature_names = sorted(user_model_data["tokens"])
+        if not feature_names:
+            return {}
+
+        feature_indices = np.asarray(self.vectorizer.transform(feature_names).argmax(axis=1)).ravel()
+        liked_class_coef = classifier.feature_log_prob_[1][feature_indices]
 
-        liked_class_coef = classifier.feature_log_prob_[1]
-        
         top_indices = liked_class_coef.argsort()[-n_features:][::-1]
-        
-        top_features = feature_names[top_indices]
-        top_scores = liked_class_coef[top_indices]
 
-        return dict(zip(top_features, top_scores))
\ No newline at end of file
+        return {feature_names[i]: liked_class_coef[i] for i in top_indices}
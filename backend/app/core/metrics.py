@@ -0,0 +1,127 @@
+# backend/app/core/metrics.py
+
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds, from a single slot draw (tens of microseconds) up to a cold plan on a large catalog.
+DEFAULT_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Histogram:
+    """
+    A Prometheus histogram with a fixed label set. Observations only bump one
+    bucket counter under a lock; the cumulative buckets are built when scraped.
+    """
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts with a trailing +Inf bucket, sum)
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][bucket] += 1
+            series[1][0] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            snapshot = [(key, list(counts), total[0]) for key, (counts, total) in sorted(self._series.items())]
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, counts, total in snapshot:
+            cumulative = 0
+            for upper, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if upper == float("inf") else repr(upper)
+                bucket_labels = _label_text(self.labelnames, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            labels = _label_text(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """The process's histograms, rendered together in the Prometheus text format."""
+    def __init__(self):
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Returns the histogram called `name`, creating it on first use."""
+        with self._lock:
+            if name not in self._histograms:
+                self._histograms[name] = Histogram(name, documentation, labelnames, buckets)
+            return self._histograms[name]
+
+    def render(self) -> str:
+        with self._lock:
+            histograms = list(self._histograms.values())
+        return "\n".join(line for histogram in histograms for line in histogram.render()) + "\n"
+
+
+registry = MetricsRegistry()
+
+PLAN_STAGE_SECONDS = registry.histogram(
+    "nutriplan_plan_stage_seconds",
+    "Wall time of one stage of building and saving a weekly plan.",
+    ("stage",)
+)
+PLAN_SLOT_STAGE_SECONDS = registry.histogram(
+    "nutriplan_plan_slot_stage_seconds",
+    "Wall time of filtering, scoring or sampling the candidates of one meal slot.",
+    ("stage", "slot")
+)
+CLASSIFY_SECONDS = registry.histogram(
+    "nutriplan_classify_batch_seconds",
+    "Wall time of one goal classifier forward pass over a batch of texts.",
+    ("backend",)
+)
+
+
+@contextmanager
+def span(histogram: Histogram, **labels: str) -> Iterator[None]:
+    """
+    Times the enclosed block into `histogram` under `labels`, and logs it at DEBUG.
+    A no-op when METRICS_ENABLED is off.
+    """
+    if not settings.METRICS_ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        histogram.observe(elapsed, **labels)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("span %s %s %.3fms", histogram.name, labels, elapsed * 1000)
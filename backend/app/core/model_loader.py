@@ -0,0 +1,79 @@
+# backend/app/core/model_loader.py
+
+import asyncio
+import threading
+import time
+from typing import Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class ModelNotReady(RuntimeError):
+    """Raised when a background-loaded model is still loading or failed to load."""
+
+
+class BackgroundLoader(Generic[T]):
+    """
+    Builds an expensive object (e.g. a TensorFlow model) on a daemon thread so
+    application startup does not wait for it.
+
+    Callers either check `ready`, block with `wait(timeout)` or, from async code,
+    `await wait_async(timeout)`. A failed load is kept in `error` and re-raised as
+    `ModelNotReady` on every access.
+    """
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self.name = name
+        self.factory = factory
+        self.value: Optional[T] = None
+        self.error: Optional[BaseException] = None
+        self.elapsed: Optional[float] = None
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "BackgroundLoader[T]":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._load, name=f"load-{self.name}", daemon=True)
+            self._thread.start()
+        return self
+
+    def _load(self) -> None:
+        started = time.perf_counter()
+        try:
+            self.value = self.factory()
+        except BaseException as e:
+            self.error = e
+            print(f"-> ❗ Loading {self.name} failed: {e}")
+        finally:
+            self.elapsed = time.perf_counter() - started
+            self._done.set()
+        if self.error is None:
+            print(f"[startup] {self.name} ready in {self.elapsed:.2f}s (background)")
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set() and self.error is None
+
+    @property
+    def state(self) -> str:
+        if not self._done.is_set():
+            return "loading" if self._thread is not None else "not_started"
+        return "failed" if self.error is not None else "ready"
+
+    def get(self) -> T:
+        """Returns the loaded object without waiting, or raises ModelNotReady."""
+        if not self._done.is_set():
+            raise ModelNotReady(f"{self.name} is still loading.")
+        if self.error is not None:
+            raise ModelNotReady(f"{self.name} failed to load: {self.error}")
+        return self.value
+
+    def wait(self, timeout: Optional[float] = None) -> T:
+        """Blocks for up to `timeout` seconds until loading finishes, then behaves like `get`."""
+        self._done.wait(timeout)
+        return self.get()
+
+    async def wait_async(self, timeout: Optional[float] = None) -> T:
+        """`wait` for async callers: blocks a worker thread, never the event loop."""
+        if not self._done.is_set() and (timeout is None or timeout > 0):
+            await asyncio.get_running_loop().run_in_executor(None, self._done.wait, timeout)
+        return self.get()
@@ -0,0 +1,235 @@
+# backend/app/core/profiling.py
+
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Client-supplied request ids become file names, so only these are accepted.
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+MAX_STACK_DEPTH = 256
+# Shared threads that run part of a planning request: the write queue saving the plan.
+HELPER_THREAD_PREFIXES = ("db-writer",)
+# Frames of these files are skipped when telling whether a thread is waiting for work.
+_WAIT_FILES = ("threading.py", "queue.py")
+
+
+def profile_request_id(candidate: Optional[str]) -> str:
+    """The client's X-Request-ID when it is a safe file name, otherwise a new random id."""
+    if candidate and REQUEST_ID_PATTERN.match(candidate):
+        return candidate
+    return uuid.uuid4().hex
+
+
+def _frame_name(code) -> str:
+    # ';' separates frames in collapsed stacks.
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _is_idle(frame) -> bool:
+    """True when a thread is only waiting in its run target, e.g. a pool worker waiting for a task."""
+    while frame is not None and os.path.basename(frame.f_code.co_filename) in _WAIT_FILES:
+        frame = frame.f_back
+    caller = frame.f_back if frame is not None else None
+    return caller is None or (caller.f_code.co_name == "run"
+                              and os.path.basename(caller.f_code.co_filename) == "threading.py")
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack every `interval_seconds` from a background
+    thread and counts identical stacks, root first, in the collapsed-stack format
+    flame graph tools read. Unlike cProfile it keeps whole call paths and adds no
+    per-call overhead to the profiled thread.
+
+    Threads whose names start with one of `helper_prefixes` are sampled too, while
+    they are busy. Each stack starts with its thread's name so work that ran off the
+    profiled thread shows up as its own root. Helper threads are shared, so their
+    samples can include work done for concurrent requests.
+    """
+    def __init__(self, thread_id: int, interval_seconds: float, helper_prefixes: Tuple[str, ...] = ()):
+        self.thread_id = thread_id
+        self.interval_seconds = interval_seconds
+        self.helper_prefixes = helper_prefixes
+        self.stacks: Counter = Counter()
+        self.thread_samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sampled_threads(self) -> Dict[int, str]:
+        threads = {}
+        for thread in threading.enumerate():
+            if thread.ident == self.thread_id or (self.helper_prefixes and thread.name.startswith(self.helper_prefixes)):
+                threads[thread.ident] = thread.name
+        return threads
+
+    def _sample(self) -> None:
+        frames = sys._current_frames()
+        for thread_id, thread_name in self._sampled_threads().items():
+            frame = frames.get(thread_id)
+            if frame is None or (thread_id != self.thread_id and _is_idle(frame)):
+                continue
+            names = []
+            while frame is not None and len(names) < MAX_STACK_DEPTH:
+                names.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            names.append(thread_name.replace(";", ":"))
+            self.stacks[";".join(reversed(names))] += 1
+            self.thread_samples[thread_name] += 1
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            self._sample()
+
+    def __enter__(self) -> "StackSampler":
+        self._thread = threading.Thread(target=self._loop, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+class ProfileStore:
+    """
+    A bounded on-disk ring buffer of profiles, one JSON file per request id.
+    Saving a profile beyond `max_profiles` deletes the oldest ones.
+    """
+    def __init__(self, directory: Path, max_profiles: int):
+        self.directory = Path(directory)
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+
+    def _path(self, request_id: str) -> Path:
+        return self.directory / f"{request_id}.json"
+
+    def _files(self) -> List[Path]:
+        if not self.directory.exists():
+            return []
+        return sorted(self.directory.glob("*.json"), key=lambda p: p.stat().st_mtime)
+
+    def save(self, profile: Dict[str, Any]) -> None:
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self._path(profile["request_id"])
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(profile))
+            os.replace(tmp_path, path)
+            files = self._files()
+            for stale in files[:max(0, len(files) - self.max_profiles)]:
+                stale.unlink(missing_ok=True)
+
+    def load(self, request_id: str) -> Optional[Dict[str, Any]]:
+        if not REQUEST_ID_PATTERN.match(request_id):
+            return None
+        path = self._path(request_id)
+        try:
+            return json.loads(path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        """Every stored profile without its stacks, newest first."""
+        summaries = []
+        for path in reversed(self._files()):
+            try:
+                profile = json.loads(path.read_text())
+            except (FileNotFoundError, json.JSONDecodeError):
+                continue
+            profile.pop("stacks", None)
+            summaries.append(profile)
+        return summaries
+
+
+profile_store = ProfileStore(settings.PROFILE_DIR, settings.PROFILE_MAX_FILES)
+
+
+def profile_call(request_id: str, name: str, fn: Callable[..., Any], *args,
+                 store: Optional[ProfileStore] = None, **kwargs) -> Any:
+    """
+    Calls `fn(*args, **kwargs)` on the current thread under a StackSampler, which
+    also samples the busy HELPER_THREAD_PREFIXES threads, and saves the profile
+    under `request_id`, also when `fn` raises. The profile's `threads` records how
+    many samples each thread contributed.
+
+    Args:
+        request_id (str): Key of the stored profile (see profile_request_id).
+        name (str): What was profiled, e.g. the endpoint.
+        fn (Callable): The work to profile.
+        store (ProfileStore, optional): Defaults to the shared `profile_store`.
+
+    Returns:
+        Any: Whatever `fn` returns.
+    """
+    interval_seconds = settings.PROFILE_SAMPLE_INTERVAL_MS / 1000
+    started_at = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    error: Optional[str] = None
+    sampler = StackSampler(threading.get_ident(), interval_seconds, HELPER_THREAD_PREFIXES)
+    try:
+        with sampler:
+            return fn(*args, **kwargs)
+    except Exception as e:
+        error = repr(e)
+        raise
+    finally:
+        profile = {
+            "request_id": request_id,
+            "name": name,
+            "created_at": started_at.isoformat(),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+            "interval_ms": settings.PROFILE_SAMPLE_INTERVAL_MS,
+            "sample_count": sum(sampler.stacks.values()),
+            "threads": dict(sampler.thread_samples),
+            "error": error,
+            "stacks": dict(sampler.stacks),
+        }
+        try:
+            (store or profile_store).save(profile)
+        except OSError as e:
+            logger.warning("Could not save profile %s: %s", request_id, e)
+
+
+def to_collapsed(profile: Dict[str, Any]) -> str:
+    """The profile as collapsed stacks ('root;...;leaf count' per line), as flamegraph.pl and speedscope read."""
+    return "".join(f"{stack} {count}\n" for stack, count in
+                   sorted(profile["stacks"].items(), key=lambda item: -item[1]))
+
+
+def to_speedscope(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """The profile in speedscope's file format, one sampled profile weighted in milliseconds."""
+    frame_index: Dict[str, int] = {}
+    samples: List[List[int]] = []
+    weights: List[float] = []
+    for stack, count in profile["stacks"].items():
+        samples.append([frame_index.setdefault(name, len(frame_index)) for name in stack.split(";")])
+        weights.append(count * profile["interval_ms"])
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": [{"name": name} for name in frame_index]},
+        "profiles": [{
+            "type": "sampled",
+            "name": f"{profile['name']} {profile['request_id']}",
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": samples,
+            "weights": weights,
+        }],
+        "name": f"{profile['name']} {profile['request_id']}",
+        "exporter": "nutriplan",
+    }
+
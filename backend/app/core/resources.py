@@ -0,0 +1,28 @@
+# backend/app/core/resources.py
+
+import os
+import sys
+
+
+def peak_rss_mb() -> float:
+    """
+    Peak resident set size of this process in MiB, or NaN where the platform
+    does not report it (the `resource` module is unavailable on Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return float("nan")
+    # ru_maxrss is KiB on Linux, bytes on macOS.
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def current_rss_mb() -> float:
+    """Current resident set size in MiB where /proc is available, else the peak."""
+    try:
+        with open(f"/proc/{os.getpid()}/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return peak_rss_mb()
@@ -0,0 +1,263 @@
+# backend/app/db/core/catalog.py
+
+import threading
+import time
+from datetime import datetime, timezone
+from itertools import chain
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import event, insert, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db.models.meal import Meal
+from app.db.models.catalog_state import CatalogState
+
+
+class CatalogMeal:
+    """
+    A lightweight, detached view of one catalog row. It exposes the same
+    attribute names as the `Meal` ORM model so rule and planner code can
+    treat both interchangeably.
+    """
+    def __init__(self, id, name, calories, protein, fat, carbs, tags, type, ingredients, recipe):
+        self.id = id
+        self.name = name
+        self.calories = calories
+        self.protein = protein
+        self.fat = fat
+        self.carbs = carbs
+        self.tags = tags
+        self.type = type
+        self.ingredients = ingredients
+        self.recipe = recipe
+
+
+class MealCatalog:
+    """
+    A read-only, columnar snapshot of the `meals` table.
+
+    Numeric fields are stored as NumPy columns indexed by row, tags as a packed
+    bitset per meal and meal types as small integer codes. Strings (titles, tags,
+    types) live in interned tables so every planning request can share one copy.
+    """
+    def __init__(self, rows: Sequence[tuple], version: int = 0, db_version: int = 0):
+        self.version = version
+        self.db_version = db_version
+        n = len(rows)
+
+        self.ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=n)
+        self.calories = np.fromiter((r[2] or 0.0 for r in rows), dtype=np.float64, count=n)
+        self.protein = np.fromiter((r[3] or 0.0 for r in rows), dtype=np.float64, count=n)
+        self.fat = np.fromiter((r[4] or 0.0 for r in rows), dtype=np.float64, count=n)
+        self.carbs = np.fromiter((r[5] or 0.0 for r in rows), dtype=np.float64, count=n)
+
+        # Interned string tables. Code 0 of `type_names` is reserved for meals without a type.
+        self.names: List[str] = [r[1] for r in rows]
+        self.title_codes = np.empty(n, dtype=np.int64)
+        self.title_index: Dict[str, int] = {}
+        self.type_names: List[Optional[str]] = [None]
+        self.type_index: Dict[Optional[str], int] = {None: 0}
+        self.tag_names: List[str] = []
+        self.tag_index: Dict[str, int] = {}
+
+        meal_tags = []
+        type_codes = np.zeros(n, dtype=np.int16)
+        for row_idx, row in enumerate(rows):
+            title = row[1]
+            self.title_codes[row_idx] = self.title_index.setdefault(title, len(self.title_index))
+
+            meal_type = row[7]
+            if meal_type not in self.type_index:
+                self.type_index[meal_type] = len(self.type_names)
+                self.type_names.append(meal_type)
+            type_codes[row_idx] = self.type_index[meal_type]
+
+            tags = list(row[6] or [])
+            for tag in tags:
+                if tag not in self.tag_index:
+                    self.tag_index[tag] = len(self.tag_names)
+                    self.tag_names.append(tag)
+            meal_tags.append(tags)
+        self.type_codes = type_codes
+
+        self.tag_words = max(1, (len(self.tag_names) + 63) // 64)
+        self.tag_bits = np.zeros((n, self.tag_words), dtype=np.uint64)
+        for row_idx, tags in enumerate(meal_tags):
+            for tag in tags:
+                bit = self.tag_index[tag]
+                self.tag_bits[row_idx, bit // 64] |= np.uint64(1 << (bit % 64))
+
+        self.tags = meal_tags
+        self.ingredients = [r[8] or [] for r in rows]
+        self.recipes = [r[9] for r in rows]
+        self.row_by_id: Dict[int, int] = {int(meal_id): i for i, meal_id in enumerate(self.ids)}
+
+        self._derived: Dict[str, object] = {}
+        self._derived_lock = threading.Lock()
+
+        self.meals = [
+            CatalogMeal(int(self.ids[i]), self.names[i], float(self.calories[i]), float(self.protein[i]),
+                        float(self.fat[i]), float(self.carbs[i]), self.tags[i], self.type_names[type_codes[i]],
+                        self.ingredients[i], self.recipes[i])
+            for i in range(n)
+        ]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def derived(self, name: str, builder: Callable[["MealCatalog"], object]) -> object:
+        """
+        Returns a value computed from this catalog snapshot (e.g. a feature matrix),
+        building it on first use. A reloaded catalog starts with an empty set, so
+        derived data is rebuilt exactly once per catalog version.
+        """
+        value = self._derived.get(name)
+        if value is None:
+            with self._derived_lock:
+                value = self._derived.get(name)
+                if value is None:
+                    value = builder(self)
+                    self._derived[name] = value
+        return value
+
+    def __getstate__(self):
+        # Derived values can be large and are cheap to rebuild; never ship them to worker processes.
+        state = self.__dict__.copy()
+        state["_derived"] = {}
+        del state["_derived_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._derived_lock = threading.Lock()
+
+    def tag_mask(self, tags: Sequence[str]) -> Optional[np.ndarray]:
+        """
+        Packs the given tags into a bitset with the catalog's word layout.
+        Returns None if any tag is unknown to the catalog.
+        """
+        mask = np.zeros(self.tag_words, dtype=np.uint64)
+        for tag in tags:
+            bit = self.tag_index.get(tag)
+            if bit is None:
+                return None
+            mask[bit // 64] |= np.uint64(1 << (bit % 64))
+        return mask
+
+    @classmethod
+    def from_db(cls, db: Session, version: int = 0) -> "MealCatalog":
+        """Loads the catalog with a single column-only query, skipping ORM hydration."""
+        db_version = get_catalog_version(db)
+        rows = db.query(
+            Meal.id, Meal.name, Meal.calories, Meal.protein, Meal.fat, Meal.carbs,
+            Meal.tags, Meal.type, Meal.ingredients, Meal.recipe
+        ).order_by(Meal.id).all()
+        return cls(rows, version=version, db_version=db_version)
+
+
+def get_catalog_version(db: Session) -> int:
+    """The catalog version stored in the database (0 before the first seed or sync)."""
+    version = db.query(CatalogState.version).filter(CatalogState.id == 1).scalar()
+    return version or 0
+
+
+def bump_catalog_version(db: Session) -> int:
+    """
+    Increments the stored catalog version within the caller's transaction, so other
+    processes reload their catalog once it commits. Returns the new version.
+    """
+    now = datetime.now(timezone.utc)
+    updated = db.execute(
+        update(CatalogState).where(CatalogState.id == 1)
+        .values(version=CatalogState.version + 1, updated_at=now)
+    )
+    if updated.rowcount == 0:
+        db.execute(insert(CatalogState).values(id=1, version=1, updated_at=now))
+    return get_catalog_version(db)
+
+
+_catalog: Optional[MealCatalog] = None
+_catalog_generation = 0
+_catalog_lock = threading.Lock()
+_load_lock = threading.Lock()
+_last_version_check = 0.0
+
+
+def _load_locked(db: Session) -> MealCatalog:
+    global _catalog, _last_version_check
+    generation = _catalog_generation
+    _last_version_check = time.monotonic()
+    catalog = MealCatalog.from_db(db, version=generation)
+    with _catalog_lock:
+        # Only publish if nobody invalidated the table while we were reading it.
+        if generation == _catalog_generation:
+            _catalog = catalog
+    print(f"-> Meal catalog loaded: {len(catalog)} meals, {len(catalog.tag_names)} tags.")
+    return catalog
+
+
+def load_catalog(db: Session) -> MealCatalog:
+    """(Re)loads the process-wide catalog from the database and returns it."""
+    with _load_lock:
+        return _load_locked(db)
+
+
+def _stale(db: Session, catalog: Optional[MealCatalog]) -> bool:
+    """
+    Whether the shared catalog must be (re)loaded. Besides in-process invalidation, the
+    database's catalog version is compared at most every CATALOG_VERSION_CHECK_SECONDS,
+    which picks up seeds and syncs run by other processes.
+    """
+    global _last_version_check
+    if catalog is None or len(catalog) == 0:
+        return True
+    now = time.monotonic()
+    if now - _last_version_check < settings.CATALOG_VERSION_CHECK_SECONDS:
+        return False
+    _last_version_check = now
+    if get_catalog_version(db) != catalog.db_version:
+        invalidate_catalog()
+        return True
+    return False
+
+
+def get_catalog(db: Session) -> MealCatalog:
+    """
+    Returns the shared catalog, loading it on first use, after invalidation or when
+    the database's catalog version moved. An empty catalog is never trusted, so
+    seeding a fresh database is picked up.
+    """
+    catalog = _catalog
+    if _stale(db, catalog):
+        with _load_lock:
+            catalog = _catalog
+            if catalog is None or len(catalog) == 0:
+                catalog = _load_locked(db)
+    return catalog
+
+
+def invalidate_catalog() -> None:
+    """Drops the shared catalog so the next request reloads it."""
+    global _catalog, _catalog_generation
+    with _catalog_lock:
+        _catalog = None
+        _catalog_generation += 1
+
+
+@event.listens_for(Session, "after_flush")
+def _track_meal_writes(session: Session, flush_context) -> None:
+    if any(isinstance(obj, Meal) for obj in chain(session.new, session.dirty, session.deleted)):
+        session.info["meal_catalog_dirty"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_meal_commit(session: Session) -> None:
+    if session.info.pop("meal_catalog_dirty", False):
+        invalidate_catalog()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_meal_writes(session: Session, previous_transaction) -> None:
+    session.info.pop("meal_catalog_dirty", None)
@@ -0,0 +1,247 @@
+# backend/app/db/core/optimizer.py
+
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from app.config import settings
+from app.db.core.catalog import MealCatalog
+
+if TYPE_CHECKING:
+    from app.db.core.planner import WeeklyPlan
+
+NUTRIENTS = ("calories", "protein", "fat", "carbs")
+# Share of the daily targets each slot should cover, in planning order; they sum to 1.
+SLOT_SHARES = {"breakfast": 0.20, "lunch": 0.35, "dinner": 0.35, "side": 0.10}
+# Weights of the squared relative deviations; calories matter most.
+DEVIATION_WEIGHTS = np.array([2.0, 1.0, 0.5, 0.5])
+# Objective cost per unit of relative deviation beyond the tolerance, so tolerances act as soft constraints.
+TOLERANCE_PENALTY = 10.0
+# How much a day's mean like probability lowers its objective; 0.02 trades a
+# 0.5 better predicted like against about 10% of missed calories.
+LIKE_WEIGHT = 0.02
+# Refinement stops after this many re-searches of the worst day without an improvement.
+MAX_FUTILE_REFINEMENTS = 14
+NO_MEAL = -1
+
+
+class DayDeviation(BaseModel):
+    totals: Dict[str, float]
+    # (actual - target) / target, in percent, per nutrient.
+    deviation_pct: Dict[str, float]
+    within_tolerance: bool
+
+
+class PlanReport(BaseModel):
+    optimizer: str
+    targets: Dict[str, float]
+    tolerance_pct: Dict[str, float]
+    days: Dict[str, DayDeviation]
+    elapsed_ms: float
+    objective: Optional[float] = None
+    refinements: int = 0
+    timed_out: bool = False
+
+
+def tolerances() -> np.ndarray:
+    macro = settings.OPTIMIZER_MACRO_TOLERANCE
+    return np.array([settings.OPTIMIZER_CALORIE_TOLERANCE, macro, macro, macro])
+
+
+def plan_report(plan: "WeeklyPlan", daily_targets: Dict[str, float], optimizer: str, elapsed_ms: float,
+                **details) -> PlanReport:
+    """
+    Measures how far each day of a finished plan lands from the daily targets.
+    Works for plans from any optimizer; dinners already include their side.
+    """
+    targets = np.array([float(daily_targets[n]) for n in NUTRIENTS])
+    limits = tolerances()
+    days = {}
+    for day_name, daily in plan:
+        totals = np.zeros(len(NUTRIENTS))
+        for meal in (daily.breakfast, daily.lunch, daily.dinner):
+            if meal is not None:
+                totals += [meal.calories] + [meal.macros.get(n, 0.0) for n in NUTRIENTS[1:]]
+        relative = np.divide(totals - targets, targets, out=np.zeros_like(totals), where=targets > 0)
+        days[day_name] = DayDeviation(
+            totals={n: round(float(v), 1) for n, v in zip(NUTRIENTS, totals)},
+            deviation_pct={n: round(float(v) * 100, 1) for n, v in zip(NUTRIENTS, relative)},
+            within_tolerance=bool((np.abs(relative) <= limits).all()),
+        )
+    return PlanReport(
+        optimizer=optimizer,
+        targets={n: float(v) for n, v in zip(NUTRIENTS, targets)},
+        tolerance_pct={n: float(v) * 100 for n, v in zip(NUTRIENTS, limits)},
+        days=days,
+        elapsed_ms=round(elapsed_ms, 3),
+        **details
+    )
+
+
+class BeamSearchOptimizer:
+    """
+    Builds a week of meals as a search over catalog row arrays instead of one
+    weighted draw per slot.
+
+    Each day is a beam search over the slots in order (breakfast, lunch, dinner,
+    side). Every beam state is expanded with every candidate of the next slot at
+    once, as a (beam x candidates) array of running nutrient totals, scored by
+    the weighted squared deviation from the targets pro rata to the slots filled
+    so far, and pruned back to the beam width. The last step adds a penalty for
+    any deviation beyond the calorie and macro tolerances and may leave the side
+    empty. No meal title repeats within the week while unused eligible ones remain.
+
+    Days are searched one after another. While the time budget lasts, the worst
+    day is then searched again with a fresh candidate sample, and replaced when
+    that improves it, so the best plan found is returned when the budget runs out.
+    Refinement also stops after `max_refinements`, so with a seeded `rng` the plan
+    only depends on timing when the budget is exhausted (`timed_out`).
+    """
+    def __init__(self, catalog: MealCatalog, eligibility: Dict[str, np.ndarray], like_scores: np.ndarray,
+                 daily_targets: Dict[str, float], rng: np.random.Generator, days: int,
+                 beam_width: Optional[int] = None, candidates_per_slot: Optional[int] = None,
+                 time_budget_ms: Optional[float] = None, max_refinements: Optional[int] = None):
+        """
+        Args:
+            catalog (MealCatalog): The catalog the row indices refer to.
+            eligibility (Dict[str, np.ndarray]): Eligible catalog rows per slot (see RuleEngine.eligibility_index).
+            like_scores (np.ndarray): Predicted like probability of every catalog row.
+            daily_targets (Dict[str, float]): Calorie and macro targets of one day.
+            rng (np.random.Generator): Draws the candidate samples, so a seeded generator gives a reproducible plan.
+            days (int): Number of days to plan.
+            beam_width, candidates_per_slot, time_budget_ms, max_refinements (optional): Default to
+                the OPTIMIZER_* settings.
+        """
+        self.catalog = catalog
+        self.eligibility = eligibility
+        self.like_scores = like_scores
+        self.rng = rng
+        self.days = days
+        self.beam_width = beam_width or settings.OPTIMIZER_BEAM_WIDTH
+        self.candidates_per_slot = candidates_per_slot or settings.OPTIMIZER_CANDIDATES_PER_SLOT
+        self.time_budget_ms = time_budget_ms if time_budget_ms is not None else settings.OPTIMIZER_TIME_BUDGET_MS
+        self.max_refinements = max_refinements if max_refinements is not None else settings.OPTIMIZER_MAX_REFINEMENTS
+        self.targets = np.array([float(daily_targets[n]) for n in NUTRIENTS])
+        self.targets[self.targets <= 0] = 1.0
+        self.tolerances = tolerances()
+        self.nutrients = np.column_stack([catalog.calories, catalog.protein, catalog.fat, catalog.carbs])
+        self.refinements = 0
+        self.timed_out = False
+
+    def _candidates(self, slot: str, excluded_titles: np.ndarray) -> np.ndarray:
+        """
+        Up to `candidates_per_slot` eligible rows for the slot: half the best fits
+        for the slot's share of the targets, half a random sample of the rest.
+        """
+        pool = self.eligibility.get(slot, np.empty(0, dtype=np.int64))
+        if len(excluded_titles):
+            unused = pool[~np.isin(self.catalog.title_codes[pool], excluded_titles)]
+            # Like the greedy planner, titles may repeat once every eligible one has been used.
+            pool = unused if len(unused) else pool
+        if len(pool) <= self.candidates_per_slot:
+            return pool
+
+        slot_target = self.targets * SLOT_SHARES[slot]
+        misfit = (np.abs(self.nutrients[pool] - slot_target) / self.targets * DEVIATION_WEIGHTS).sum(axis=1)
+        prior = misfit - LIKE_WEIGHT * self.like_scores[pool]
+        best_count = self.candidates_per_slot // 2
+        best = np.argpartition(prior, best_count)[:best_count]
+        rest = np.setdiff1d(np.arange(len(pool)), best, assume_unique=True)
+        sampled = self.rng.choice(rest, self.candidates_per_slot - best_count, replace=False)
+        return pool[np.concatenate([best, sampled])]
+
+    def search_day(self, excluded_titles: np.ndarray, beam_width: int) -> Tuple[np.ndarray, float]:
+        """
+        Beam-searches one day. Returns the chosen row per slot (NO_MEAL for an empty
+        slot) and the day's objective, lower being better.
+        """
+        sums = np.zeros((1, len(NUTRIENTS)))
+        likes = np.zeros(1)
+        picks = np.empty((1, 0), dtype=np.int64)
+        titles = np.empty((1, 0), dtype=np.int64)
+        objective = np.zeros(1)
+        share = 0.0
+
+        for step, slot in enumerate(SLOT_SHARES):
+            share += SLOT_SHARES[slot]
+            last = step == len(SLOT_SHARES) - 1
+            candidates = self._candidates(slot, excluded_titles)
+            if slot == "side" or len(candidates) == 0:
+                candidates = np.append(candidates, NO_MEAL)
+            real = candidates != NO_MEAL
+            rows = np.where(real, candidates, 0)
+            candidate_nutrients = np.where(real[:, None], self.nutrients[rows], 0.0)
+            candidate_likes = np.where(real, self.like_scores[rows], 0.5)
+            candidate_titles = np.where(real, self.catalog.title_codes[rows], NO_MEAL)
+
+            new_sums = sums[:, None, :] + candidate_nutrients[None, :, :]
+            relative = (new_sums - share * self.targets) / self.targets
+            new_likes = likes[:, None] + candidate_likes[None, :]
+            new_objective = (relative ** 2 * DEVIATION_WEIGHTS).sum(axis=-1) - LIKE_WEIGHT * new_likes / (step + 1)
+            if last:
+                new_objective += TOLERANCE_PENALTY * np.maximum(np.abs(relative) - self.tolerances, 0.0).sum(axis=-1)
+            # No title twice in a day.
+            repeated = (titles[:, :, None] == candidate_titles[None, None, :]).any(axis=1) & real[None, :]
+            new_objective[repeated] = np.inf
+
+            flat = new_objective.ravel()
+            keep = min(beam_width, int(np.isfinite(flat).sum()) or 1)
+            chosen = np.argpartition(flat, keep - 1)[:keep]
+            beam, candidate = np.divmod(chosen, len(candidates))
+            sums = new_sums[beam, candidate]
+            likes = new_likes[beam, candidate]
+            objective = flat[chosen]
+            picks = np.column_stack([picks[beam], candidates[candidate]])
+            titles = np.column_stack([titles[beam], candidate_titles[candidate]])
+
+        best = int(np.argmin(objective))
+        return picks[best], float(objective[best])
+
+    def _titles(self, rows: np.ndarray) -> np.ndarray:
+        rows = rows[rows != NO_MEAL]
+        return self.catalog.title_codes[rows]
+
+    def optimize(self) -> Tuple[List[np.ndarray], List[float]]:
+        """
+        Plans every day within the time budget.
+
+        Returns:
+            Tuple[List[np.ndarray], List[float]]: Per day, the chosen row of each slot in
+            SLOT_SHARES order (NO_MEAL when empty), and the day's objective.
+        """
+        deadline = time.perf_counter() + self.time_budget_ms / 1000
+        day_rows: List[np.ndarray] = []
+        day_objectives: List[float] = []
+        for _ in range(self.days):
+            # Past the budget, the remaining days still get a (greedy) plan.
+            beam_width = self.beam_width
+            if time.perf_counter() > deadline:
+                beam_width, self.timed_out = 1, True
+            used = np.concatenate([self._titles(rows) for rows in day_rows]) if day_rows else np.empty(0, dtype=np.int64)
+            rows, objective = self.search_day(used, beam_width)
+            day_rows.append(rows)
+            day_objectives.append(objective)
+
+        futile = 0
+        while futile < MAX_FUTILE_REFINEMENTS and self.refinements < self.max_refinements:
+            if time.perf_counter() >= deadline:
+                self.timed_out = True
+                break
+            worst = int(np.argmax(day_objectives))
+            others = [self._titles(rows) for i, rows in enumerate(day_rows) if i != worst]
+            used = np.concatenate(others) if others else np.empty(0, dtype=np.int64)
+            rows, objective = self.search_day(used, self.beam_width)
+            self.refinements += 1
+            if objective < day_objectives[worst]:
+                day_rows[worst], day_objectives[worst] = rows, objective
+                futile = 0
+            else:
+                futile += 1
+        return day_rows, day_objectives
+
+
+def slot_rows(rows: Sequence[int]) -> Dict[str, Optional[int]]:
+    """A day's optimizer result as slot -> catalog row, None for empty slots."""
+    return {slot: (int(row) if row != NO_MEAL else None) for slot, row in zip(SLOT_SHARES, rows)}
@@ -0,0 +1,247 @@
+# backend/app/db/core/plan_history.py
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db.models.meal import Meal
+from app.db.models.meal_plan import MealPlan as MealPlanModel
+from app.db.models.plan import Plan as PlanModel
+from app.db.core.catalog import get_catalog
+from app.db.core.planner import (
+    PLAN_USERS_DIRTY, PLANNED_SLOTS, WEEK_DAYS, DailyPlan, PlannedMeal, WeeklyPlan,
+    daily_plan_from_slots, planned_meal, planned_meal_from_catalog, unpack_meal_ids
+)
+
+# Slots assumed, in id order, for meal_plans rows saved before slots were recorded.
+LEGACY_SLOTS = ("breakfast", "lunch", "dinner")
+
+
+class StoredPlan(BaseModel):
+    start_date: date
+    end_date: date
+    plan: WeeklyPlan
+
+
+class PlanHistory(BaseModel):
+    user_id: int
+    from_date: date
+    to_date: date
+    plans: List[StoredPlan]
+
+
+def _stored_plans(days: Dict[date, Dict[str, PlannedMeal]], week_starts: Dict[date, date]) -> List[StoredPlan]:
+    """Groups dated slot meals into the weekly plans they were saved as, days outside the range left empty."""
+    weeks: Dict[date, Dict[str, DailyPlan]] = defaultdict(dict)
+    for day, meals in days.items():
+        start = week_starts[day]
+        weeks[start][WEEK_DAYS[(day - start).days]] = daily_plan_from_slots(meals)
+    return [
+        StoredPlan(
+            start_date=start,
+            end_date=start + timedelta(days=len(WEEK_DAYS) - 1),
+            plan=WeeklyPlan(**{day_name: daily.get(day_name, DailyPlan()) for day_name in WEEK_DAYS})
+        )
+        for start, daily in sorted(weeks.items())
+    ]
+
+
+def _load_from_rows(db: Session, user_id: int, from_date: date, to_date: date) -> List[StoredPlan]:
+    """
+    One statement: the user's meal_plans rows in range joined with their meals, plus
+    the user's first plan date, which anchors the 7-day plans the rows belong to.
+    """
+    first_plan_date = (
+        select(func.min(MealPlanModel.plan_date))
+        .where(MealPlanModel.user_id == user_id)
+        .scalar_subquery()
+    )
+    rows = db.execute(
+        select(
+            MealPlanModel.plan_date, MealPlanModel.slot, first_plan_date.label("first_plan_date"),
+            Meal.id, Meal.name, Meal.calories, Meal.protein, Meal.fat, Meal.carbs, Meal.ingredients, Meal.recipe
+        )
+        .join(Meal, Meal.id == MealPlanModel.meal_id)
+        .where(MealPlanModel.user_id == user_id, MealPlanModel.plan_date.between(from_date, to_date))
+        .order_by(MealPlanModel.plan_date, MealPlanModel.id)
+    ).all()
+
+    days: Dict[date, Dict[str, PlannedMeal]] = defaultdict(dict)
+    week_starts: Dict[date, date] = {}
+    for row in rows:
+        meals = days[row.plan_date]
+        slot = row.slot or next((s for s in LEGACY_SLOTS if s not in meals), None)
+        if slot is None or slot in meals:
+            continue
+        meals[slot] = planned_meal(row.id, row.name, row.calories, row.protein, row.fat, row.carbs,
+                                   row.ingredients, row.recipe)
+        offset = (row.plan_date - row.first_plan_date).days
+        week_starts[row.plan_date] = row.first_plan_date + timedelta(days=offset - offset % len(WEEK_DAYS))
+    return _stored_plans(days, week_starts)
+
+
+def _load_from_packed(db: Session, user_id: int, from_date: date, to_date: date) -> List[StoredPlan]:
+    """One row per overlapping plan; meal details come from the in-memory catalog."""
+    plans = db.execute(
+        select(PlanModel.start_date, PlanModel.meal_ids)
+        .where(PlanModel.user_id == user_id, PlanModel.meal_ids.isnot(None),
+               PlanModel.start_date <= to_date, PlanModel.end_date >= from_date)
+        .order_by(PlanModel.start_date)
+    ).all()
+    catalog = get_catalog(db)
+
+    days: Dict[date, Dict[str, PlannedMeal]] = defaultdict(dict)
+    week_starts: Dict[date, date] = {}
+    for start_date, packed in plans:
+        for day_offset, slot_ids in enumerate(unpack_meal_ids(packed)):
+            day = start_date + timedelta(days=day_offset)
+            if not from_date <= day <= to_date:
+                continue
+            week_starts[day] = start_date
+            for slot, meal_id in zip(PLANNED_SLOTS, slot_ids):
+                row = catalog.row_by_id.get(int(meal_id)) if meal_id else None
+                if row is not None:
+                    days[day][slot] = planned_meal_from_catalog(catalog, row)
+            days.setdefault(day, {})
+    return _stored_plans(days, week_starts)
+
+
+def load_plan_history(db: Session, user_id: int, from_date: date, to_date: date,
+                      storage: Optional[str] = None) -> PlanHistory:
+    """
+    Rebuilds the user's saved weekly plans that overlap [from_date, to_date].
+
+    Args:
+        db (Session): A database session.
+        user_id (int): The user whose plans to read.
+        from_date (date): First day of the range, inclusive.
+        to_date (date): Last day of the range, inclusive.
+        storage (str, optional): Which plan storage to read; defaults to settings.PLAN_STORAGE,
+            with 'both' read from the packed plans.
+
+    Returns:
+        PlanHistory: The plans in date order. Days of a plan outside the range are empty.
+    """
+    storage = storage or settings.PLAN_STORAGE
+    loader = _load_from_rows if storage == "rows" else _load_from_packed
+    return PlanHistory(user_id=user_id, from_date=from_date, to_date=to_date,
+                       plans=loader(db, user_id, from_date, to_date))
+
+
+class PlanResponseCache:
+    """
+    Serialized plan-history responses with their ETags, per user and date range.
+
+    Users are evicted least recently used past `max_users` and each user's date
+    ranges least recently used past `max_ranges_per_user`. Entries expire after
+    `ttl_seconds` (which bounds staleness from plans saved by other processes) and
+    are dropped when found expired; a user's entries are also dropped whenever this
+    process commits a plan for them.
+
+    Each commit stamps its users with the next value of one counter. The stamps are
+    kept for at most `max_users` users, least recently invalidated first out; users
+    without a stamp share the highest evicted one. A response read before its user's
+    stamp changed, or was evicted, is never stored.
+    """
+    def __init__(self, max_users: int, ttl_seconds: float, max_ranges_per_user: int = 8):
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self.max_ranges_per_user = max(1, max_ranges_per_user)
+        self._entries: "OrderedDict[int, OrderedDict[Tuple[date, date], Tuple[float, str, bytes]]]" = OrderedDict()
+        self._generations: "OrderedDict[int, int]" = OrderedDict()
+        self._generation_counter = 0
+        self._evicted_generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int, from_date: date, to_date: date) -> Optional[Tuple[str, bytes]]:
+        key = (from_date, to_date)
+        with self._lock:
+            ranges = self._entries.get(user_id)
+            entry = ranges.get(key) if ranges is not None else None
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    del ranges[key]
+                self.misses += 1
+                return None
+            ranges.move_to_end(key)
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def _generation(self, user_id: int) -> int:
+        return self._generations.get(user_id, self._evicted_generation)
+
+    def generation(self, user_id: int) -> int:
+        with self._lock:
+            return self._generation(user_id)
+
+    def put(self, user_id: int, from_date: date, to_date: date, body: bytes, generation: int) -> Tuple[str, bytes]:
+        """Stores a response unless the user's plans changed since `generation` was read."""
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        with self._lock:
+            if self._generation(user_id) == generation:
+                now = time.monotonic()
+                ranges = self._entries.setdefault(user_id, OrderedDict())
+                for key in [key for key, entry in ranges.items() if now - entry[0] > self.ttl_seconds]:
+                    del ranges[key]
+                ranges[(from_date, to_date)] = (now, etag, body)
+                ranges.move_to_end((from_date, to_date))
+                while len(ranges) > self.max_ranges_per_user:
+                    ranges.popitem(last=False)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_users:
+                    self._entries.popitem(last=False)
+        return etag, body
+
+    def invalidate(self, user_ids: Sequence[int]) -> None:
+        with self._lock:
+            self._generation_counter += 1
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+                self._generations[user_id] = self._generation_counter
+                self._generations.move_to_end(user_id)
+            while len(self._generations) > self.max_users:
+                _, evicted = self._generations.popitem(last=False)
+                self._evicted_generation = max(self._evicted_generation, evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation_counter += 1
+            self._evicted_generation = self._generation_counter
+            self._generations.clear()
+            self._entries.clear()
+
+
+plan_cache = PlanResponseCache(settings.PLAN_CACHE_USERS, settings.PLAN_CACHE_TTL_SECONDS,
+                               settings.PLAN_CACHE_RANGES_PER_USER)
+
+
+def load_plan_history_response(db: Session, user_id: int, from_date: date, to_date: date) -> Tuple[str, bytes]:
+    """Loads a plan-history response, caches it in `plan_cache` and returns its (ETag, JSON body)."""
+    generation = plan_cache.generation(user_id)
+    body = load_plan_history(db, user_id, from_date, to_date).model_dump_json().encode()
+    return plan_cache.put(user_id, from_date, to_date, body, generation)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_plan_commit(session: Session) -> None:
+    user_ids = session.info.pop(PLAN_USERS_DIRTY, None)
+    if user_ids:
+        plan_cache.invalidate(user_ids)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_plan_writes(session: Session, previous_transaction) -> None:
+    # A savepoint rolled back by the write queue must not forget the other jobs' plans.
+    if not previous_transaction.nested:
+        session.info.pop(PLAN_USERS_DIRTY, None)
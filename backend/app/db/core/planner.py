@@ -1,18 +1,40 @@
 # backend/app/db/core/planner.py
 
-import random
-import pandas as pd
-from typing import List, Dict, Optional, Set
+import logging
+import time
+from typing import List, Dict, Optional, Set, Tuple
+import numpy as np
 from pydantic import BaseModel, ConfigDict
 import json
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, insert
 from datetime import date, timedelta
 
 from app.db.models.meal import Meal
+from app.config import settings
 from app.db.models.meal_plan import MealPlan as MealPlanModel
+from app.db.models.plan import Plan as PlanModel
 from app.db.core.rules import UserProfile, RuleEngine
-from app.core.feedback import FeedbackEngine
+from app.db.core.catalog import MealCatalog, get_catalog
+from app.db.db import WriteQueue
+from app.db.core.sampling import WeightedSampler
+from app.core.feedback import FeedbackEngine, FeedbackVersion
+from app.core.metrics import PLAN_SLOT_STAGE_SECONDS, PLAN_STAGE_SECONDS, span
+from app.db.core.optimizer import BeamSearchOptimizer, PlanReport, plan_report, slot_rows
+
+logger = logging.getLogger(__name__)
+
+WEEK_DAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+PLANNED_SLOTS = ("breakfast", "lunch", "dinner", "side")
+# rows: one meal_plans row per slot; packed: one plans row per plan (see pack_meal_ids); both: either reader works.
+PLAN_STORAGE_MODES = ("rows", "packed", "both")
+# Session.info key collecting the users whose plans a transaction wrote (see plan_history).
+PLAN_USERS_DIRTY = "plan_users_dirty"
+# greedy: one weighted random draw per slot; beam: BeamSearchOptimizer against the daily targets.
+PLAN_OPTIMIZERS = ("greedy", "beam")
+
+# How strongly the feedback model's like probability reweights the macro score (0 disables it).
+FEEDBACK_BLEND_WEIGHT = 0.5
 
 class PlannedMeal(BaseModel):
     id: int
@@ -39,241 +61,450 @@ class WeeklyPlan(BaseModel):
     saturday: DailyPlan
     sunday: DailyPlan
 
+def planned_meal(id: int, title: str, calories: Optional[float], protein: Optional[float], fat: Optional[float],
+                 carbs: Optional[float], ingredients: Optional[List[str]], recipe: Optional[str]) -> PlannedMeal:
+    """Builds the API model for one meal from its column values."""
+    return PlannedMeal(
+        id=int(id),
+        title=title,
+        calories=float(calories or 0.0),
+        macros={
+            "protein": float(protein or 0.0),
+            "fat": float(fat or 0.0),
+            "carbs": float(carbs or 0.0),
+        },
+        ingredients=list(ingredients or []),
+        recipe=recipe
+    )
+
+def planned_meal_from_catalog(catalog: MealCatalog, row: int) -> PlannedMeal:
+    """Builds the API model for one catalog row."""
+    return planned_meal(catalog.ids[row], catalog.names[row], catalog.calories[row], catalog.protein[row],
+                        catalog.fat[row], catalog.carbs[row], catalog.ingredients[row], catalog.recipes[row])
+
+def pair_side_meal(main_meal: PlannedMeal, side_meal: PlannedMeal) -> PlannedMeal:
+    """Folds a side dish into a dinner main: summed calories and macros, joined title, ingredients and recipe."""
+    main_title = main_meal.title
+    main_recipe = main_meal.recipe
+
+    main_meal.calories += side_meal.calories
+    for macro_key in main_meal.macros:
+        main_meal.macros[macro_key] = round(
+            main_meal.macros.get(macro_key, 0.0) + side_meal.macros.get(macro_key, 0.0), 2
+        )
+
+    main_meal.title = f"{main_title} with {side_meal.title}"
+    main_meal.ingredients.extend(side_meal.ingredients)
+    main_meal.recipe = f"{main_recipe}\n\n[Side Dish: {side_meal.title}]\n{side_meal.recipe}"
+
+    main_meal.paired_side_meal = side_meal
+    return main_meal
+
+def daily_plan_from_slots(meals: Dict[str, PlannedMeal]) -> DailyPlan:
+    """A day's plan from its slot meals, with the side (if any) folded into dinner."""
+    dinner, side = meals.get("dinner"), meals.get("side")
+    if dinner is not None and side is not None:
+        dinner = pair_side_meal(dinner, side)
+    return DailyPlan(breakfast=meals.get("breakfast"), lunch=meals.get("lunch"), dinner=dinner)
+
 class MealPlanner:
-    def __init__(self, feedback_engine: FeedbackEngine, user_id: int, user_profile: UserProfile, db_session: Session):
+    def __init__(self, feedback_engine: FeedbackEngine, user_id: int, user_profile: UserProfile, db_session: Optional[Session],
+                 seed: Optional[int] = None, catalog: Optional[MealCatalog] = None,
+                 disliked_meal_ids: Optional[Set[int]] = None, feedback_version: Optional[FeedbackVersion] = None,
+                 optimizer: Optional[str] = None):
+        """
+        Args:
+            seed (int, optional): Seeds every random choice made for the plan, so the same
+                seed, profile, feedback and catalog always produce the same plan.
+            catalog (MealCatalog, optional): The catalog to plan from. Defaults to the shared one.
+            disliked_meal_ids, feedback_version (optional): Preloaded feedback, which together
+                with `catalog` lets a plan be generated without a database session.
+            optimizer (str, optional): 'greedy' or 'beam'. Defaults to settings.PLAN_OPTIMIZER.
+        """
+        self.optimizer = optimizer or settings.PLAN_OPTIMIZER
+        if self.optimizer not in PLAN_OPTIMIZERS:
+            raise ValueError(f"Unknown plan optimizer '{self.optimizer}'. Choose one of: {', '.join(PLAN_OPTIMIZERS)}.")
         self.feedback_engine = feedback_engine
         self.user_id = user_id
         self.user_profile = user_profile
         self.db_session = db_session
-        self.rule_engine = RuleEngine(user_profile=self.user_profile, db_session=self.db_session, user_id=self.user_id)
+        self.catalog = catalog
+        # The root of every random stream of the plan; default_rng(seed_sequence) is default_rng(seed).
+        # Weeks and days draw from streams spawned from it (see _week_rng), so a seeded
+        # week or day does not depend on how many draws the ones before it made.
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.rng = np.random.default_rng(self.seed_sequence)
+        self._day_rng = self.rng
+        self.rule_engine = RuleEngine(
+            user_profile=self.user_profile,
+            db_session=self.db_session,
+            user_id=self.user_id,
+            rng=self.rng,
+            disliked_meal_ids=disliked_meal_ids,
+            feedback_version=feedback_version
+        )
         self.daily_targets = self.rule_engine.daily_targets
+        self._samplers: Dict[str, Tuple[tuple, WeightedSampler]] = {}
+        self._used_title_codes = set()
+        # How far each generated week's days are from the daily targets, in week order.
+        self.reports: List[PlanReport] = []
+
+    @property
+    def last_report(self) -> Optional[PlanReport]:
+        """The report of the last generated week."""
+        return self.reports[-1] if self.reports else None
+
+    def _week_rng(self, *spawn_key: int) -> np.random.Generator:
+        """An independent, reproducible stream for one week (or one day of it) of the plan."""
+        return np.random.default_rng(np.random.SeedSequence(self.seed_sequence.entropy, spawn_key=spawn_key))
+
+    def _planned_meal(self, catalog: MealCatalog, row: int) -> PlannedMeal:
+        """Builds the API model for one catalog row."""
+        return planned_meal_from_catalog(catalog, row)
 
-    def _select_and_score_meal(self, meal_candidates: List[Meal], used_titles: Set[str], 
-                               current_daily_calories: float, current_daily_macros: Dict[str, float], slot_calorie_budget: float) -> Optional[PlannedMeal]:
+    def _predict_like_scores(self, catalog: MealCatalog) -> np.ndarray:
         """
-        Selects a random meal from the candidates, avoiding duplicates within the week
-        and applying combined predicted scores (feedback + macro suitability).
+        Scores every meal eligible for any slot with the user's feedback model in one
+        batched prediction. Rows that are never eligible keep the neutral 0.5.
         """
-        if not meal_candidates:
-            return None
+        like_scores = np.full(len(catalog), 0.5)
+        eligible = np.unique(np.concatenate([
+            self.rule_engine.apply_all_rules_vectorized(catalog, slot) for slot in PLANNED_SLOTS
+        ]))
+        with span(PLAN_STAGE_SECONDS, stage="feedback_predict"):
+            like_scores[eligible] = self.feedback_engine.predict_catalog_scores(catalog, self.user_id, eligible)
+        return like_scores
 
-        processed_candidates = []
-        for meal in meal_candidates:
-            macros_data = {"protein": meal.protein or 0, "fat": meal.fat or 0, "carbs": meal.carbs or 0}
-            
-            processed_candidates.append({
-                'id': meal.id,
-                'title': meal.name,
-                'calories': meal.calories or 0,
-                'macros': macros_data,
-                'tags': meal.tags or [],
-                'ingredients': meal.ingredients or [],
-                'recipe': meal.recipe,
-                'type': meal.type,
-                'combined_score': getattr(meal, 'macro_suitability_score', 1.0) * 1.0
-            })
-        
-        candidates_df = pd.DataFrame(processed_candidates)
-        
-        if candidates_df.empty:
+    def _combined_scores(self, catalog: MealCatalog, candidate_indices: np.ndarray, current_day_calories: float,
+                         current_day_macros: Dict[str, float], slot_calorie_budget: float) -> np.ndarray:
+        """
+        Blends the macro suitability score with the predicted like probability. A neutral
+        prediction (0.5) leaves the macro score unchanged; a confident like up to doubles
+        it at FEEDBACK_BLEND_WEIGHT = 1.
+        """
+        macro_scores = self.rule_engine.score_candidates(
+            catalog, candidate_indices, current_day_calories, current_day_macros, slot_calorie_budget
+        )
+        like_scores = self._like_scores[candidate_indices]
+        return macro_scores * (1.0 + FEEDBACK_BLEND_WEIGHT * (2.0 * like_scores - 1.0))
+
+    def _slot_sampler(self, catalog: MealCatalog, requested_meal_slot_type: str, current_day_calories: float,
+                      current_day_macros: Dict[str, float], slot_calorie_budget: float) -> Optional[WeightedSampler]:
+        """
+        Returns a weighted sampler over the slot's eligible meals, weighted by their combined
+        score. Samplers are reused while their score inputs are unchanged (e.g. breakfast on
+        every day of the week), with titles already used this week removed from them.
+        """
+        score_key = (
+            requested_meal_slot_type,
+            round(current_day_calories, 6),
+            tuple(round(current_day_macros[k], 6) for k in sorted(current_day_macros)),
+            round(slot_calorie_budget, 6),
+        )
+        cached = self._samplers.get(requested_meal_slot_type)
+        if cached is not None and cached[0] == score_key:
+            return cached[1]
+
+        with span(PLAN_SLOT_STAGE_SECONDS, stage="filter", slot=requested_meal_slot_type):
+            candidate_indices = self.rule_engine.apply_all_rules_vectorized(catalog, requested_meal_slot_type)
+        if len(candidate_indices) == 0:
             return None
+        with span(PLAN_SLOT_STAGE_SECONDS, stage="score", slot=requested_meal_slot_type):
+            candidate_scores = self._combined_scores(
+                catalog, candidate_indices, current_day_calories, current_day_macros, slot_calorie_budget
+            )
+            sampler = WeightedSampler(candidate_indices, candidate_scores, keys=catalog.title_codes[candidate_indices])
+            for title_code in self._used_title_codes:
+                sampler.remove_key(title_code)
+        self._samplers[requested_meal_slot_type] = (score_key, sampler)
+        return sampler
 
-        available_meals_df = candidates_df[~candidates_df['title'].isin(used_titles)]
-        
-        if available_meals_df.empty and not candidates_df.empty:
-            available_meals_df = candidates_df
-            
-        if available_meals_df.empty:
+    def _mark_used(self, catalog: MealCatalog, row: int) -> None:
+        """Removes a chosen meal's title from every live sampler for the rest of the week."""
+        title_code = int(catalog.title_codes[row])
+        self._used_title_codes.add(title_code)
+        for _, sampler in self._samplers.values():
+            sampler.remove_key(title_code)
+
+    def _select_and_score_meal(self, catalog: MealCatalog, requested_meal_slot_type: str, current_day_calories: float,
+                               current_day_macros: Dict[str, float], slot_calorie_budget: float) -> Optional[PlannedMeal]:
+        """
+        Selects a random meal for the slot, avoiding duplicates within the week
+        and applying combined predicted scores (feedback + macro suitability).
+        Once every eligible title has been used, titles may repeat.
+        """
+        sampler = self._slot_sampler(catalog, requested_meal_slot_type, current_day_calories, current_day_macros, slot_calorie_budget)
+        if sampler is None:
             return None
 
-        weights = available_meals_df['combined_score'].tolist()
-        sanitized_weights = [w if w > 0 else 0.001 for w in weights]
-        
-        selected_meal_data = random.choices(available_meals_df.to_dict('records'), weights=sanitized_weights, k=1)[0]
-        
-        return PlannedMeal(
-            id=selected_meal_data['id'],
-            title=selected_meal_data['title'],
-            calories=selected_meal_data['calories'],
-            macros=selected_meal_data['macros'],
-            ingredients=selected_meal_data.get('ingredients', []),
-            recipe=selected_meal_data.get('recipe')
+        with span(PLAN_SLOT_STAGE_SECONDS, stage="sample", slot=requested_meal_slot_type):
+            row = sampler.draw(self._day_rng)
+            if row is None:
+                fallback = WeightedSampler(
+                    sampler.items,
+                    self._combined_scores(catalog, sampler.items, current_day_calories, current_day_macros, slot_calorie_budget)
+                )
+                row = fallback.draw(self._day_rng)
+            if row is None:
+                return None
+            self._mark_used(catalog, int(row))
+        return self._planned_meal(catalog, int(row))
+
+    def _generate_optimized_plan(self, catalog: MealCatalog, week: int, started: float) -> WeeklyPlan:
+        """Plans the week with BeamSearchOptimizer instead of per-slot draws."""
+        optimizer = BeamSearchOptimizer(
+            catalog, self.rule_engine.eligibility_index(catalog), self._like_scores, self.daily_targets,
+            self._week_rng(week), days=len(WEEK_DAYS)
         )
+        with span(PLAN_STAGE_SECONDS, stage="optimize"):
+            day_rows, day_objectives = optimizer.optimize()
 
+        plan = WeeklyPlan(**{
+            day: daily_plan_from_slots({slot: self._planned_meal(catalog, row)
+                                        for slot, row in slot_rows(rows).items() if row is not None})
+            for day, rows in zip(WEEK_DAYS, day_rows)
+        })
+        report = plan_report(
+            plan, self.daily_targets, "beam", (time.perf_counter() - started) * 1000,
+            objective=round(float(sum(day_objectives)), 6), refinements=optimizer.refinements,
+            timed_out=optimizer.timed_out
+        )
+        self.reports.append(report)
+        logger.debug("Optimized plan for User ID: %s after %s refinements: %s", self.user_id,
+                     optimizer.refinements, {day: d.deviation_pct for day, d in report.days.items()})
+        return plan
 
-    def generate_weekly_plan(self) -> WeeklyPlan:
-        days = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
-        plan_dict = {}
-        used_titles_this_week = set()
-        
-        all_meals_from_db = self.db_session.query(Meal).all()
-        if not all_meals_from_db:
-            raise ValueError("The 'meal' table is empty. Please run the seeder first.")
+    def _plan_day(self, catalog: MealCatalog, day: str) -> DailyPlan:
+        """Plans one day slot by slot: breakfast, lunch, then dinner with an optional side."""
         daily_target_calories = self.daily_targets["calories"]
-        daily_target_protein = self.daily_targets["protein"]
-        daily_target_fat = self.daily_targets["fat"]
-        daily_target_carbs = self.daily_targets["carbs"]
+        daily_meals = {}
+        current_day_calories = 0.0
+        current_day_macros = {"protein": 0.0, "fat": 0.0, "carbs": 0.0}
+        
+        slot_calorie_percentages = {
+            "breakfast": 0.20, 
+            "lunch": 0.35,     
+            "dinner": 0.45     
+        }
+        
+        slot_budgets = {
+            slot: daily_target_calories * percent for slot, percent in slot_calorie_percentages.items()
+        }
 
-        print(f"Generating plan for User ID: {self.user_id} with Goal: {self.user_profile.goal} ({self.user_profile.sex})")
-        print(f"Daily Calorie Target: {daily_target_calories}, Macros: P:{daily_target_protein}g, F:{daily_target_fat}g, C:{daily_target_carbs}g")
+        logger.debug("Planning for %s...", day)
 
-        for day in days:
-            daily_meals = {}
-            current_day_calories = 0.0
-            current_day_macros = {"protein": 0.0, "fat": 0.0, "carbs": 0.0}
-            
-            slot_calorie_percentages = {
-                "breakfast": 0.20, 
-                "lunch": 0.35,     
-                "dinner": 0.45     
-            }
-            
-            slot_budgets = {
-                slot: daily_target_calories * percent for slot, percent in slot_calorie_percentages.items()
-            }
-
-            print(f"\nPlanning for {day}...")
-
-            print(f"  Planning breakfast for {day} (Target: {slot_budgets['breakfast']:.0f} cal)...")
-            breakfast_candidates = self.rule_engine.apply_all_rules(
-                all_meals_from_db, 
-                requested_meal_slot_type="breakfast",
-                current_day_calories=current_day_calories,
-                current_day_macros=current_day_macros,
-                slot_calorie_budget=slot_budgets['breakfast']
-            )
-            breakfast_meal = self._select_and_score_meal(
-                breakfast_candidates, 
-                used_titles_this_week,
+        for slot in ("breakfast", "lunch"):
+            logger.debug("  Planning %s for %s (Target: %.0f cal)...", slot, day, slot_budgets[slot])
+            meal = self._select_and_score_meal(
+                catalog,
+                slot,
                 current_day_calories,
                 current_day_macros,
-                slot_budgets['breakfast']
+                slot_budgets[slot]
             )
-            if breakfast_meal:
-                daily_meals["breakfast"] = breakfast_meal
-                used_titles_this_week.add(breakfast_meal.title)
-                current_day_calories += breakfast_meal.calories
+            if meal:
+                daily_meals[slot] = meal
+                current_day_calories += meal.calories
                 for macro_key in current_day_macros:
-                    current_day_macros[macro_key] += breakfast_meal.macros.get(macro_key, 0.0)
+                    current_day_macros[macro_key] += meal.macros.get(macro_key, 0.0)
             else:
-                print(f"    No suitable breakfast meal found for {day}.")
-                daily_meals["breakfast"] = None
-
-            print(f"  Planning lunch for {day} (Target: {slot_budgets['lunch']:.0f} cal)...")
-            lunch_candidates = self.rule_engine.apply_all_rules(
-                all_meals_from_db, 
-                requested_meal_slot_type="lunch",
-                current_day_calories=current_day_calories,
-                current_day_macros=current_day_macros,
-                slot_calorie_budget=slot_budgets['lunch']
-            )
-            lunch_meal = self._select_and_score_meal(
-                lunch_candidates, 
-                used_titles_this_week,
-                current_day_calories,
-                current_day_macros,
-                slot_budgets['lunch']
-            )
-            if lunch_meal:
-                daily_meals["lunch"] = lunch_meal
-                used_titles_this_week.add(lunch_meal.title)
-                current_day_calories += lunch_meal.calories
-                for macro_key in current_day_macros:
-                    current_day_macros[macro_key] += lunch_meal.macros.get(macro_key, 0.0)
+                logger.debug("    No suitable %s meal found for %s.", slot, day)
+                daily_meals[slot] = None
+
+        logger.debug("  Planning dinner for %s (main + optional side - Target: %.0f cal)...", day, slot_budgets['dinner'])
+        
+        main_meal = self._select_and_score_meal(catalog, "dinner", current_day_calories, current_day_macros, slot_budgets['dinner'])
+        
+        combined_dinner_meal: Optional[PlannedMeal] = None
+
+        if main_meal:
+            temp_day_calories = current_day_calories + main_meal.calories
+            temp_day_macros = {k: current_day_macros[k] + main_meal.macros.get(k, 0.0) for k in current_day_macros}
+
+            side_meal = self._select_and_score_meal(catalog, "side", temp_day_calories, temp_day_macros, max(0, slot_budgets['dinner'] - main_meal.calories))
+
+            combined_dinner_meal = main_meal
+            if side_meal:
+                main_title = main_meal.title
+                combined_dinner_meal = pair_side_meal(main_meal, side_meal)
+                logger.debug("    Paired '%s' with '%s' for dinner.", side_meal.title, main_title)
             else:
-                print(f"    No suitable lunch meal found for {day}.")
-                daily_meals["lunch"] = None
+                logger.debug("    No suitable side meal found for dinner on %s. Using '%s' alone.", day, main_meal.title)
 
-            print(f"  Planning dinner for {day} (main + optional side - Target: {slot_budgets['dinner']:.0f} cal)...")
-            
-            dinner_main_candidates = self.rule_engine.apply_all_rules(
-                all_meals_from_db, 
-                requested_meal_slot_type="dinner",
-                current_day_calories=current_day_calories,
-                current_day_macros=current_day_macros,
-                slot_calorie_budget=slot_budgets['dinner'] 
-            )
-            main_meal = self._select_and_score_meal(dinner_main_candidates, used_titles_this_week, current_day_calories, current_day_macros, slot_budgets['dinner'])
+            daily_meals["dinner"] = combined_dinner_meal
             
-            combined_dinner_meal: Optional[PlannedMeal] = None
+            current_day_calories += combined_dinner_meal.calories
+            for macro_key in current_day_macros:
+                current_day_macros[macro_key] += combined_dinner_meal.macros.get(macro_key, 0.0)
+        else:
+            logger.debug("    No suitable main dinner meal found for %s. Skipping dinner slot.", day)
+            daily_meals["dinner"] = None
 
-            if main_meal:
-                used_titles_this_week.add(main_meal.title)
+        logger.debug("  %s Daily Totals: Calories=%.0f/%.0f, Protein=%.0fg, Fat=%.0fg, Carbs=%.0fg", day,
+                     current_day_calories, daily_target_calories, current_day_macros['protein'],
+                     current_day_macros['fat'], current_day_macros['carbs'])
+        return DailyPlan(**daily_meals)
 
-                temp_day_calories = current_day_calories + main_meal.calories
-                temp_day_macros = {k: current_day_macros[k] + main_meal.macros.get(k, 0.0) for k in current_day_macros}
+    def _generate_sequential_week(self, catalog: MealCatalog, week: int, started: float) -> WeeklyPlan:
+        """
+        Plans the days in order, each avoiding the titles of the days before it and
+        drawing from its own stream (see _week_rng).
+        """
+        self._samplers = {}
+        self._used_title_codes = set()
+        logger.debug("Generating plan for User ID: %s with Goal: %s (%s)", self.user_id, self.user_profile.goal, self.user_profile.sex)
+        logger.debug("Daily Calorie Target: %s, Macros: P:%sg, F:%sg, C:%sg", self.daily_targets["calories"],
+                     self.daily_targets["protein"], self.daily_targets["fat"], self.daily_targets["carbs"])
 
-                side_candidates = self.rule_engine.apply_all_rules(
-                    all_meals_from_db, 
-                    requested_meal_slot_type="side",
-                    current_day_calories=temp_day_calories, 
-                    current_day_macros=temp_day_macros,
-                    slot_calorie_budget=max(0, slot_budgets['dinner'] - main_meal.calories) 
-                )
-                side_meal = self._select_and_score_meal(side_candidates, used_titles_this_week, temp_day_calories, temp_day_macros, max(0, slot_budgets['dinner'] - main_meal.calories))
-
-                combined_dinner_meal = main_meal
-                if side_meal:
-                    used_titles_this_week.add(side_meal.title)
-                    
-                    combined_dinner_meal.calories += side_meal.calories
-                    for macro_key in combined_dinner_meal.macros:
-                        combined_dinner_meal.macros[macro_key] = round(
-                            combined_dinner_meal.macros.get(macro_key, 0.0) + side_meal.macros.get(macro_key, 0.0), 2
-                        )
-                    
-                    combined_dinner_meal.title = f"{main_meal.title} with {side_meal.title}"
-                    combined_dinner_meal.ingredients.extend(side_meal.ingredients)
-                    combined_dinner_meal.recipe = f"{main_meal.recipe}\n\n[Side Dish: {side_meal.title}]\n{side_meal.recipe}"
-                    
-                    combined_dinner_meal.paired_side_meal = side_meal
-                    print(f"    Paired '{side_meal.title}' with '{main_meal.title}' for dinner.")
-                else:
-                    print(f"    No suitable side meal found for dinner on {day}. Using '{main_meal.title}' alone.")
-
-                daily_meals["dinner"] = combined_dinner_meal
-                
-                current_day_calories += combined_dinner_meal.calories - main_meal.calories 
-                for macro_key in current_day_macros:
-                    current_day_macros[macro_key] += (combined_dinner_meal.macros.get(macro_key, 0.0) - main_meal.macros.get(macro_key, 0.0)) 
-            else:
-                print(f"    No suitable main dinner meal found for {day}. Skipping dinner slot.")
-                daily_meals["dinner"] = None
+        days = {}
+        for day_index, day in enumerate(WEEK_DAYS):
+            self._day_rng = self._week_rng(week, day_index)
+            days[day] = self._plan_day(catalog, day)
+        plan = WeeklyPlan(**days)
+        self.reports.append(plan_report(plan, self.daily_targets, "greedy", (time.perf_counter() - started) * 1000))
+        return plan
 
-            print(f"  {day} Daily Totals: Calories={current_day_calories:.0f}/{daily_target_calories:.0f}, Protein={current_day_macros['protein']:.0f}g, Fat={current_day_macros['fat']:.0f}g, Carbs={current_day_macros['carbs']:.0f}g")
-            plan_dict[day] = DailyPlan(**daily_meals)
-        return WeeklyPlan(**plan_dict)
+    def generate_weekly_plan(self) -> WeeklyPlan:
+        return self.generate_weekly_plans(1)[0]
 
-def save_plan_to_db(db_session: Session, plan: WeeklyPlan, user_id: int):
-    print(f"💾 Saving new weekly plan for user_id: {user_id}")
-    
-    last_plan_date = db_session.query(func.max(MealPlanModel.plan_date)).filter(MealPlanModel.user_id == user_id).scalar()
-    
-    start_date = last_plan_date + timedelta(days=1) if last_plan_date else date.today()
-    print(f"   ...Starting new plan from date: {start_date}")
-    
-    current_date = start_date
-    for day_name in ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]:
+    def generate_weekly_plans(self, weeks: int) -> List[WeeklyPlan]:
+        """
+        Plans `weeks` consecutive weeks from one catalog snapshot and like prediction.
+        Titles do not repeat within a week while unused eligible ones remain; every week
+        starts afresh. `reports` then holds one PlanReport per week; the first week's
+        time includes loading the catalog and predicting likes.
+        """
+        if weeks < 1:
+            raise ValueError("At least one week must be planned.")
+        started = time.perf_counter()
+        with span(PLAN_STAGE_SECONDS, stage="meal_load"):
+            catalog = self.catalog if self.catalog is not None else get_catalog(self.db_session)
+        if len(catalog) == 0:
+            raise ValueError("The 'meal' table is empty. Please run the seeder first.")
+        self._like_scores = self._predict_like_scores(catalog)
+
+        generate_week = self._generate_optimized_plan if self.optimizer == "beam" else self._generate_sequential_week
+        self.reports = []
+        plans = []
+        for week in range(weeks):
+            plans.append(generate_week(catalog, week, started))
+            started = time.perf_counter()
+        return plans
+
+def plan_slot_meal_ids(plan: WeeklyPlan) -> List[int]:
+    """
+    The plan's meal ids day by day in PLANNED_SLOTS order (the side is the dinner's
+    paired side meal), with 0 for an empty slot. Always 7 * 4 = 28 entries.
+    """
+    meal_ids = []
+    for day_name in WEEK_DAYS:
         daily_plan = getattr(plan, day_name)
-        
-        for meal_slot_attr in ["breakfast", "lunch", "dinner"]:
-            meal = getattr(daily_plan, meal_slot_attr)
-            if meal:
-            
-                plan_entry = MealPlanModel(user_id=user_id, meal_id=meal.id, plan_date=current_date)
-                db_session.add(plan_entry)
-                
-        current_date += timedelta(days=1)
-        
-    db_session.commit()
-    print("   ...✅ New weekly plan saved successfully.")
+        dinner = daily_plan.dinner
+        side = dinner.paired_side_meal if dinner else None
+        for meal in (daily_plan.breakfast, daily_plan.lunch, dinner, side):
+            meal_ids.append(meal.id if meal else 0)
+    return meal_ids
+
+def pack_meal_ids(meal_ids: List[int]) -> bytes:
+    """Packs slot meal ids into the `plans.meal_ids` format (little-endian int32)."""
+    return np.asarray(meal_ids, dtype="<i4").tobytes()
+
+def unpack_meal_ids(packed: bytes) -> np.ndarray:
+    """Inverse of `pack_meal_ids`: a (days, len(PLANNED_SLOTS)) array of meal ids."""
+    return np.frombuffer(packed, dtype="<i4").reshape(-1, len(PLANNED_SLOTS))
+
+def plan_meal_rows(plan: WeeklyPlan, user_id: int, start_date: date) -> List[Dict]:
+    """Flattens a weekly plan into `meal_plans` row values, one per filled slot including sides."""
+    rows = []
+    meal_ids = plan_slot_meal_ids(plan)
+    for i, meal_id in enumerate(meal_ids):
+        if meal_id:
+            day_offset, slot_index = divmod(i, len(PLANNED_SLOTS))
+            rows.append({"user_id": user_id, "meal_id": meal_id, "slot": PLANNED_SLOTS[slot_index],
+                         "plan_date": start_date + timedelta(days=day_offset)})
+    return rows
+
+def next_plan_start_dates(db_session: Session, user_ids: List[int], storage: str) -> Dict[int, date]:
+    """
+    The day after each user's latest saved plan (today for users without one),
+    with one grouped query per storage format in use.
+    """
+    last_dates: Dict[int, date] = {}
+    queries = []
+    if storage in ("rows", "both"):
+        queries.append((MealPlanModel.user_id, func.max(MealPlanModel.plan_date)))
+    if storage in ("packed", "both"):
+        queries.append((PlanModel.user_id, func.max(PlanModel.end_date)))
+    for user_column, last_date in queries:
+        for user_id, last in db_session.query(user_column, last_date).filter(user_column.in_(user_ids)).group_by(user_column):
+            if last is not None and (user_id not in last_dates or last > last_dates[user_id]):
+                last_dates[user_id] = last
+    today = date.today()
+    return {user_id: last_dates[user_id] + timedelta(days=1) if user_id in last_dates else today for user_id in user_ids}
+
+def save_plans(db_session: Session, planned: List[Tuple[int, WeeklyPlan]], storage: Optional[str] = None) -> int:
+    """
+    Appends several users' weekly plans after their latest saved plan, with one
+    bulk insert per storage format. Does not commit, so callers decide the
+    transaction boundary.
+
+    Args:
+        db_session (Session): The session to write through.
+        planned (List[Tuple[int, WeeklyPlan]]): (user_id, plan) pairs. Several plans of one user
+            are saved as consecutive weeks, in list order.
+        storage (str, optional): 'rows' (one meal_plans row per slot), 'packed' (one plans
+            row per plan) or 'both'. Defaults to settings.PLAN_STORAGE.
+
+    Returns:
+        int: The number of rows inserted.
+    """
+    storage = storage or settings.PLAN_STORAGE
+    if storage not in PLAN_STORAGE_MODES:
+        raise ValueError(f"Unknown plan storage '{storage}'. Choose one of: {', '.join(PLAN_STORAGE_MODES)}.")
+    if not planned:
+        return 0
+
+    start_dates = next_plan_start_dates(db_session, [user_id for user_id, _ in planned], storage)
+    meal_rows, plan_rows = [], []
+    for user_id, plan in planned:
+        start_date = start_dates[user_id]
+        start_dates[user_id] = start_date + timedelta(days=len(WEEK_DAYS))
+        if storage in ("rows", "both"):
+            meal_rows.extend(plan_meal_rows(plan, user_id, start_date))
+        if storage in ("packed", "both"):
+            plan_rows.append({"user_id": user_id, "start_date": start_date,
+                              "end_date": start_date + timedelta(days=len(WEEK_DAYS) - 1),
+                              "meal_ids": pack_meal_ids(plan_slot_meal_ids(plan))})
+
+    with span(PLAN_STAGE_SECONDS, stage="db_save"):
+        if meal_rows:
+            db_session.execute(insert(MealPlanModel), meal_rows)
+        if plan_rows:
+            db_session.execute(insert(PlanModel), plan_rows)
+    db_session.info.setdefault(PLAN_USERS_DIRTY, set()).update(start_dates)
+    return len(meal_rows) + len(plan_rows)
+
+def save_plan_to_db(db_session: Session, plan: WeeklyPlan, user_id: int, commit: bool = True):
+    logger.debug("Saving new weekly plan for user_id: %s", user_id)
+    rows_written = save_plans(db_session, [(user_id, plan)])
+    if commit:
+        db_session.commit()
+    logger.debug("New weekly plan saved for user_id: %s (%s rows).", user_id, rows_written)
 
-def create_and_save_weekly_plan(db_session: Session, user_id: int, restrictions: List[str], calorie_target: int, goal_text: str, sex: str, weight_kg: float, height_cm: float, activity_level: str) -> WeeklyPlan: # Added new user profile parameters
-    print("--- Running Full Meal Planning Cycle ---")
+def create_and_save_weekly_plan(db_session: Session, user_id: int, restrictions: List[str], calorie_target: int, goal_text: str, sex: str, weight_kg: float, height_cm: float, activity_level: str, seed: Optional[int] = None, feedback_engine: Optional[FeedbackEngine] = None, write_queue: Optional[WriteQueue] = None, optimizer: Optional[str] = None, with_report: bool = False): # Added new user profile parameters
+    """
+    Trains or refreshes the user's feedback model, generates a weekly plan and saves it.
+    Returns the plan, or (plan, PlanReport) when `with_report` is set.
+    """
+    logger.debug("--- Running Full Meal Planning Cycle ---")
     
-    print("🧠 Training feedback model...")
-    feedback_engine = FeedbackEngine()
-    feedback_engine.train(db_session, user_id=user_id)
+    with span(PLAN_STAGE_SECONDS, stage="feedback_train"):
+        if feedback_engine is None:
+            logger.debug("Training feedback model...")
+            feedback_engine = FeedbackEngine()
+            feedback_engine.train(db_session, user_id=user_id)
+        else:
+            feedback_engine.ensure_trained(db_session, user_id=user_id)
     
     user_profile = UserProfile(
         age=30, 
@@ -291,12 +522,23 @@ def create_and_save_weekly_plan(db_session: Session, user_id: int, restrictions:
         feedback_engine=feedback_engine,
         user_id=user_id,
         user_profile=user_profile,
-        db_session=db_session
+        db_session=db_session,
+        seed=seed,
+        optimizer=optimizer
     )
     
-    weekly_plan = planner.generate_weekly_plan()
+    with span(PLAN_STAGE_SECONDS, stage="generate"):
+        weekly_plan = planner.generate_weekly_plan()
     
-    save_plan_to_db(db_session, weekly_plan, user_id)
+    # db_write includes waiting for the writer queue and the commit; db_save only the inserts.
+    with span(PLAN_STAGE_SECONDS, stage="db_write"):
+        if write_queue is not None:
+            # Planning only read through db_session; the save is serialized with the other writes.
+            write_queue.run(lambda session: save_plan_to_db(session, weekly_plan, user_id, commit=False))
+        else:
+            save_plan_to_db(db_session, weekly_plan, user_id)
     
-    print("--- Plan Generated and Saved Successfully ---")
+    logger.debug("--- Plan Generated and Saved Successfully ---")
+    if with_report:
+        return weekly_plan, planner.last_report
     return weekly_plan
\ No newline at end of file
@@ -1,9 +1,26 @@
-from typing import List, Set, Dict, Optional
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Set, Dict, Optional, Hashable
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
-import random
+import numpy as np
 from ..models.meal import Meal
 from ..models.feedback import Feedback as FeedbackModel
+from .catalog import MealCatalog
+from app.config import settings
+from app.core.feedback import FeedbackVersion, get_feedback_version
+
+logger = logging.getLogger(__name__)
+
+# Meal types (as stored in `meals.type`) that may fill each planner slot.
+SLOT_MEAL_TYPES: Dict[str, tuple] = {
+    "breakfast": ("breakfast",),
+    "lunch": ("lunch", "lunch/dinner"),
+    "dinner": ("dinner", "lunch/dinner"),
+    "side": ("side",),
+    "dessert": ("dessert",),
+}
 
 class UserProfile(BaseModel):
     """Defines the user's profile for meal planning, extended for goal-based planning."""
@@ -18,21 +35,88 @@ class UserProfile(BaseModel):
     height_cm: float = Field(..., gt=0) 
     activity_level: str = Field(..., description="User's activity level for TDEE calculation (e.g., 'sedentary', 'moderately_active')")
 
+KCAL_PER_GRAM: Dict[str, float] = {"protein": 4.0, "fat": 9.0, "carbs": 4.0}
+
+# Per-goal macro rules as (macro, grams-per-kcal threshold, score adjustment when exceeded).
+GOAL_MACRO_RULES: Dict[str, tuple] = {
+    "cut_muscle_gain": (("protein", 0.15, 0.5), ("fat", 0.05, -0.3), ("carbs", 0.20, -0.2)),
+}
+
+# How much a perfect match with the day's remaining macro split adds to a meal's score.
+MACRO_FIT_WEIGHT = 0.5
+MIN_CANDIDATE_SCORE = 0.001
+
+
+class EligibilityCache:
+    """
+    A small thread-safe LRU of per-user eligibility indexes. An entry is keyed by
+    user, profile filter fields, feedback version and catalog version, so it goes
+    stale (and is simply never hit again) as soon as any of those change.
+    """
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Dict[str, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Dict[str, np.ndarray]]:
+        with self._lock:
+            index = self._entries.get(key)
+            if index is not None:
+                self._entries.move_to_end(key)
+            return index
+
+    def put(self, key: Hashable, index: Dict[str, np.ndarray]) -> None:
+        with self._lock:
+            self._entries[key] = index
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+eligibility_cache = EligibilityCache(settings.ELIGIBILITY_CACHE_SIZE)
+
 
 class RuleEngine:
     """Applies a series of filtering rules to a list of meals."""
 
-    def __init__(self, user_profile: UserProfile, db_session: Session, user_id: int):
+    def __init__(self, user_profile: UserProfile, db_session: Optional[Session], user_id: int,
+                 rng: Optional[np.random.Generator] = None, disliked_meal_ids: Optional[Set[int]] = None,
+                 feedback_version: Optional[FeedbackVersion] = None):
+        """
+        `disliked_meal_ids` and `feedback_version` may be passed in when the caller has
+        already loaded the user's feedback (e.g. batch planning); otherwise they are
+        queried from `db_session` on first use.
+        """
         if user_profile.age < 13:
             raise ValueError("NutriPlan AI is only available for users aged 13 and older.")
         self.profile = user_profile
         self.db = db_session
         self.user_id = user_id
-        self.disliked_meal_ids = self._get_disliked_meal_ids()
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self._disliked_meal_ids = disliked_meal_ids
+        self._feedback_version = feedback_version
+        self._eligibility: Optional[tuple] = None
         self.daily_targets = self._calculate_daily_targets()
-        print(f"RuleEngine initialized. Daily Targets: {self.daily_targets}")
+        logger.debug("RuleEngine initialized. Daily Targets: %s", self.daily_targets)
 
 
+    @property
+    def disliked_meal_ids(self) -> Set[int]:
+        """Loaded on first use, so plans served from the eligibility cache skip the query."""
+        if self._disliked_meal_ids is None:
+            self._disliked_meal_ids = self._get_disliked_meal_ids()
+        return self._disliked_meal_ids
+
+    @property
+    def feedback_version(self) -> FeedbackVersion:
+        if self._feedback_version is None:
+            self._feedback_version = get_feedback_version(self.db, self.user_id)
+        return self._feedback_version
+
     def _get_disliked_meal_ids(self) -> Set[int]:
         """Queries the DB for all meals the user has rated poorly (e.g., <= 2)."""
         disliked_ratings = self.db.query(FeedbackModel.meal_id).filter(
@@ -76,31 +160,54 @@ class RuleEngine:
         if not requested_meal_slot_type:
             return meals
 
-        filtered_meals = []
-        for meal in meals:
-            meal_type_in_db = meal.type
-
-            if requested_meal_slot_type == "breakfast":
-                if meal_type_in_db == "breakfast":
-                    filtered_meals.append(meal)
-            
-            elif requested_meal_slot_type == "lunch":
-                if meal_type_in_db == "lunch" or meal_type_in_db == "lunch/dinner":
-                    filtered_meals.append(meal)
-            
-            elif requested_meal_slot_type == "dinner":
-                if meal_type_in_db == "dinner" or meal_type_in_db == "lunch/dinner":
-                    filtered_meals.append(meal)
-            
-            elif requested_meal_slot_type == "side":
-                if meal_type_in_db == "side":
-                    filtered_meals.append(meal)
-            
-            elif requested_meal_slot_type == "dessert":
-                if meal_type_in_db == "dessert":
-                    filtered_meals.append(meal)
-            
-        return filtered_meals
+        allowed_types = SLOT_MEAL_TYPES.get(requested_meal_slot_type, ())
+        return [meal for meal in meals if meal.type in allowed_types]
+
+    def _mask_by_meal_type(self, catalog: MealCatalog, requested_meal_slot_type: str) -> np.ndarray:
+        """Vectorized counterpart of `_filter_by_meal_type` over the catalog's type codes."""
+        if not requested_meal_slot_type:
+            return np.ones(len(catalog), dtype=bool)
+        allowed_codes = [catalog.type_index[t] for t in SLOT_MEAL_TYPES.get(requested_meal_slot_type, ())
+                         if t in catalog.type_index]
+        return np.isin(catalog.type_codes, allowed_codes)
+
+    def _mask_by_tags(self, catalog: MealCatalog) -> np.ndarray:
+        """
+        Vectorized counterpart of the allergy, disliked-category and dietary-preference
+        filters, evaluated as bitset tests against every meal's packed tags.
+        """
+        forbidden = [t for t in set(self.profile.allergies) | set(self.profile.disliked_categories)
+                     if t in catalog.tag_index]
+        mask = np.ones(len(catalog), dtype=bool)
+        if forbidden:
+            forbidden_bits = catalog.tag_mask(forbidden)
+            mask &= ~(catalog.tag_bits & forbidden_bits).any(axis=1)
+
+        if self.profile.dietary_preferences:
+            required_bits = catalog.tag_mask(self.profile.dietary_preferences)
+            if required_bits is None:
+                # A required tag that no meal carries can never be satisfied.
+                return np.zeros(len(catalog), dtype=bool)
+            mask &= ((catalog.tag_bits & required_bits) == required_bits).all(axis=1)
+        return mask
+
+    def _mask_by_feedback_ratings(self, catalog: MealCatalog) -> np.ndarray:
+        """Vectorized counterpart of `_filter_by_feedback_ratings`."""
+        if not self.disliked_meal_ids:
+            return np.ones(len(catalog), dtype=bool)
+        return ~np.isin(catalog.ids, np.fromiter(self.disliked_meal_ids, dtype=np.int64))
+
+    def filter_indices(self, catalog: MealCatalog, requested_meal_slot_type: str) -> np.ndarray:
+        """
+        Runs the meal type, allergy, feedback, disliked-category and dietary-preference
+        filters as one boolean-mask expression and returns the surviving catalog row indices.
+        """
+        mask = (
+            self._mask_by_meal_type(catalog, requested_meal_slot_type)
+            & self._mask_by_tags(catalog)
+            & self._mask_by_feedback_ratings(catalog)
+        )
+        return np.flatnonzero(mask)
 
     def _calculate_daily_targets(self) -> Dict[str, float]:
         """
@@ -114,7 +221,7 @@ class RuleEngine:
 
         if self.profile.sex == "male":
             if self.profile.goal == "maintain":
-                base_calories = random.randint(2000, 3000)
+                base_calories = int(self.rng.integers(2000, 3000, endpoint=True))
                 target_protein_g = base_calories * 0.25 / 4
                 target_fat_g = base_calories * 0.30 / 9
                 target_carbs_g = base_calories * 0.45 / 4
@@ -124,7 +231,7 @@ class RuleEngine:
                 target_fat_g = base_calories * 0.35 / 9    
                 target_carbs_g = base_calories * 0.40 / 4  
             elif self.profile.goal == "cut_muscle_gain":
-                base_calories = random.randint(2200, 2500)
+                base_calories = int(self.rng.integers(2200, 2500, endpoint=True))
                 target_protein_g = base_calories * 0.40 / 4 
                 target_fat_g = base_calories * 0.20 / 9    
                 target_carbs_g = base_calories * 0.40 / 4  
@@ -136,7 +243,7 @@ class RuleEngine:
 
         elif self.profile.sex == "female":
             if self.profile.goal == "maintain":
-                base_calories = random.randint(1500, 2000)
+                base_calories = int(self.rng.integers(1500, 2000, endpoint=True))
                 target_protein_g = base_calories * 0.25 / 4
                 target_fat_g = base_calories * 0.30 / 9
                 target_carbs_g = base_calories * 0.45 / 4
@@ -146,7 +253,7 @@ class RuleEngine:
                 target_fat_g = base_calories * 0.35 / 9
                 target_carbs_g = base_calories * 0.40 / 4
             elif self.profile.goal == "cut_muscle_gain":
-                base_calories = random.randint(1700, 2000)
+                base_calories = int(self.rng.integers(1700, 2000, endpoint=True))
                 target_protein_g = base_calories * 0.35 / 4 
                 target_fat_g = base_calories * 0.20 / 9   
                 target_carbs_g = base_calories * 0.45 / 4 
@@ -169,62 +276,122 @@ class RuleEngine:
             "carbs": round(max(0.0, target_carbs_g), 2)
         }
 
-    def _score_meal_by_macros_and_calories(self, meals: List[Meal], daily_targets: Dict[str, float], current_day_calories: float, current_day_macros: Dict[str, float], slot_calorie_budget: float) -> List[Meal]:
+    def score_candidates(self, catalog: MealCatalog, candidate_indices: np.ndarray, current_day_calories: float,
+                         current_day_macros: Dict[str, float], slot_calorie_budget: float) -> np.ndarray:
         """
-        Scores meals based on how well their individual macros and calories align
-        with the user's daily goal and the current remaining budget.
-        Adds a 'macro_suitability_score' attribute to each Meal object.
+        Scores candidate catalog rows on how well their macros and calories align with
+        the user's goal and the current remaining budget, in one batch.
+
+        The score starts at 1.0 and combines:
+          * the goal's fixed macro-ratio rules (grams per kcal), see GOAL_MACRO_RULES;
+          * how closely the meal's energy split matches the macros still missing for the day;
+          * how well the meal's calories fit the slot budget.
+
+        Returns a float vector aligned with `candidate_indices`. Catalog rows are never mutated,
+        so the same catalog can be scored for concurrent requests.
         """
-        if not meals:
-            return []
+        if len(candidate_indices) == 0:
+            return np.zeros(0, dtype=np.float64)
+
+        calories = catalog.calories[candidate_indices]
+        protein = catalog.protein[candidate_indices]
+        fat = catalog.fat[candidate_indices]
+        carbs = catalog.carbs[candidate_indices]
+
+        safe_calories = np.where(calories > 0, calories, 1.0)
+        has_calories = calories > 0
+        protein_ratio = np.where(has_calories, protein / safe_calories, 0.0)
+        fat_ratio = np.where(has_calories, fat / safe_calories, 0.0)
+        carbs_ratio = np.where(has_calories, carbs / safe_calories, 0.0)
+
+        scores = np.ones(len(candidate_indices), dtype=np.float64)
+        ratios = {"protein": protein_ratio, "fat": fat_ratio, "carbs": carbs_ratio}
+        for macro, threshold, adjustment in GOAL_MACRO_RULES.get(self.profile.goal, ()):
+            scores += np.where(ratios[macro] > threshold, adjustment, 0.0)
 
-        for meal in meals:
-            meal.macro_suitability_score = 1.0
+        # Energy share of each macro in the meal vs. in what the day still needs.
+        remaining = {
+            macro: max(0.0, self.daily_targets[macro] - current_day_macros.get(macro, 0.0))
+            for macro in ("protein", "fat", "carbs")
+        }
+        if not any(remaining.values()):
+            remaining = {macro: self.daily_targets[macro] for macro in ("protein", "fat", "carbs")}
+        remaining_energy = sum(grams * KCAL_PER_GRAM[macro] for macro, grams in remaining.items())
+        if remaining_energy > 0:
+            distance = np.zeros(len(candidate_indices), dtype=np.float64)
+            for macro, grams in ratios.items():
+                meal_share = grams * KCAL_PER_GRAM[macro]
+                target_share = remaining[macro] * KCAL_PER_GRAM[macro] / remaining_energy
+                distance += np.abs(meal_share - target_share)
+            # L1 distance between two energy splits lies in [0, 2].
+            scores += MACRO_FIT_WEIGHT * (1.0 - np.clip(distance / 2.0, 0.0, 1.0))
+
+        if slot_calorie_budget > 0:
+            scores *= 1.0 / (1.0 + np.abs(calories - slot_calorie_budget) / slot_calorie_budget)
+
+        return np.maximum(scores, MIN_CANDIDATE_SCORE)
 
-            if self.profile.goal == "cut_muscle_gain":
-                protein_ratio = (meal.protein or 0) / meal.calories if meal.calories else 0
-                fat_ratio = (meal.fat or 0) / meal.calories if meal.calories else 0
-                carbs_ratio = (meal.carbs or 0) / meal.calories if meal.calories else 0
+    def _profile_key(self) -> tuple:
+        """The profile fields that influence eligibility, in a hashable, order-insensitive form."""
+        return (
+            tuple(sorted(set(self.profile.allergies))),
+            tuple(sorted(set(self.profile.disliked_categories))),
+            tuple(sorted(set(self.profile.dietary_preferences))),
+        )
 
-                if protein_ratio > 0.15:
-                    meal.macro_suitability_score += 0.5
-                if fat_ratio > 0.05: 
-                    meal.macro_suitability_score -= 0.3
-                if carbs_ratio > 0.20: 
-                    meal.macro_suitability_score -= 0.2
+    def eligibility_index(self, catalog: MealCatalog) -> Dict[str, np.ndarray]:
+        """
+        Returns, for every planner slot, the catalog rows this user may ever be served.
+        None of these filters depend on the day or running totals, so the index is built
+        once per (user, profile) and reused from the LRU across plans until the user's
+        feedback or the catalog changes.
+        """
+        if self._eligibility is not None and self._eligibility[0] == catalog.version:
+            return self._eligibility[1]
 
+        key = (self.user_id, self._profile_key(), self.feedback_version, catalog.version)
+        index = eligibility_cache.get(key)
+        if index is not None:
+            self._eligibility = (catalog.version, index)
+            return index
 
-        return meals
+        base_mask = self._mask_by_tags(catalog) & self._mask_by_feedback_ratings(catalog)
+        index = {}
+        for slot in SLOT_MEAL_TYPES:
+            slot_indices = np.flatnonzero(base_mask & self._mask_by_meal_type(catalog, slot))
+            slot_indices.setflags(write=False)
+            index[slot] = slot_indices
+        eligibility_cache.put(key, index)
+        self._eligibility = (catalog.version, index)
+        return index
 
-    def apply_all_rules(self, all_meals: List[Meal], requested_meal_slot_type: str, 
-                        current_day_calories: float = 0.0, current_day_macros: Dict[str, float] = None, slot_calorie_budget: float = 0.0) -> List[Meal]:
+    def apply_all_rules_vectorized(self, catalog: MealCatalog, requested_meal_slot_type: str) -> np.ndarray:
         """
-        Applies the full sequence of filtering rules, including meal type filtering
-        and scoring based on user goals and current daily totals.
+        Vectorized mode of `apply_all_rules`. Filters the shared catalog and returns
+        the row indices of the valid meal pool instead of a list of Meal objects.
+        Score the result with `score_candidates`.
         """
-        if current_day_macros is None:
-            current_day_macros = {"protein": 0.0, "fat": 0.0, "carbs": 0.0}
+        candidate_indices = self.eligibility_index(catalog).get(requested_meal_slot_type)
+        if candidate_indices is None:
+            candidate_indices = self.filter_indices(catalog, requested_meal_slot_type)
+        logger.debug("Final valid meal pool for '%s': %s of %s meals.", requested_meal_slot_type, len(candidate_indices), len(catalog))
+        return candidate_indices
 
-        print(f"Starting with {len(all_meals)} meals for '{requested_meal_slot_type}' slot...")
+    def apply_all_rules(self, all_meals: List[Meal], requested_meal_slot_type: str) -> List[Meal]:
+        """
+        Applies the full sequence of filtering rules, including meal type filtering.
+        Scoring is done separately by `score_candidates` and never written onto the meals.
+        """
+        logger.debug("Starting with %s meals for '%s' slot...", len(all_meals), requested_meal_slot_type)
         
         type_filtered_meals = self._filter_by_meal_type(all_meals, requested_meal_slot_type)
-        print(f"Meals after '{requested_meal_slot_type}' type filter: {len(type_filtered_meals)}")
+        logger.debug("Meals after '%s' type filter: %s", requested_meal_slot_type, len(type_filtered_meals))
 
         safe_meals = self._filter_by_allergies(type_filtered_meals)
         without_rated_dislikes = self._filter_by_feedback_ratings(safe_meals)
         without_disliked_categories = self._filter_by_disliked_categories(without_rated_dislikes)
         preferred_meals = self._filter_by_dietary_preferences(without_disliked_categories)
-        print(f"Meals after general filters: {len(preferred_meals)}")
-
-        scored_meals = self._score_meal_by_macros_and_calories(
-            preferred_meals, 
-            self.daily_targets, 
-            current_day_calories, 
-            current_day_macros, 
-            slot_calorie_budget
-        )
+        logger.debug("Meals after general filters: %s", len(preferred_meals))
+        logger.debug("Final valid meal pool for '%s': %s meals.", requested_meal_slot_type, len(preferred_meals))
 
-        
-        print(f"Final valid meal pool for '{requested_meal_slot_type}': {len(scored_meals)} meals.")
-        
-        return scored_meals
\ No newline at end of file
+        return preferred_meals
\ No newline at end of file
@@ -0,0 +1,84 @@
+# backend/app/db/core/sampling.py
+
+from typing import Optional
+
+import numpy as np
+
+
+class WeightedSampler:
+    """
+    Weighted random sampling over a fixed set of candidates, backed by a Fenwick
+    (binary indexed) tree of the weights.
+
+    Building is O(n) and vectorized; drawing a candidate and removing every candidate
+    that shares a key (e.g. a meal title) are O(log n) each, so a pool can be drawn
+    from repeatedly while the week fills up without rebuilding it.
+    """
+    def __init__(self, items: np.ndarray, weights: np.ndarray, keys: Optional[np.ndarray] = None):
+        """
+        Args:
+            items (np.ndarray): The values returned by `draw` (e.g. catalog row indices).
+            weights (np.ndarray): Non-negative sampling weight per item.
+            keys (np.ndarray, optional): Integer removal key per item. Defaults to `items`.
+        """
+        self.items = np.asarray(items)
+        self.weights = np.asarray(weights, dtype=np.float64).copy()
+        self.weights[~(self.weights > 0)] = 0.0
+        self.size = len(self.items)
+
+        # tree[i] holds the sum of weights[i - lowbit(i), i) (1-indexed).
+        prefix = np.concatenate(([0.0], np.cumsum(self.weights)))
+        positions = np.arange(1, self.size + 1)
+        self._tree = np.zeros(self.size + 1, dtype=np.float64)
+        self._tree[1:] = prefix[positions] - prefix[positions - (positions & -positions)]
+        self.total = float(prefix[-1])
+        self._top_bit = 1 << (self.size.bit_length() - 1) if self.size else 0
+
+        keys = self.items if keys is None else np.asarray(keys)
+        self._key_order = np.argsort(keys, kind="stable")
+        self._sorted_keys = keys[self._key_order]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _update(self, position: int, delta: float) -> None:
+        i = position + 1
+        while i <= self.size:
+            self._tree[i] += delta
+            i += i & -i
+
+    def remove_position(self, position: int) -> None:
+        """Sets a single candidate's weight to zero."""
+        weight = self.weights[position]
+        if weight > 0:
+            self.weights[position] = 0.0
+            self._update(position, -weight)
+            self.total -= weight
+
+    def remove_key(self, key: int) -> None:
+        """Removes every candidate sharing the given key from future draws."""
+        lo = np.searchsorted(self._sorted_keys, key, side="left")
+        hi = np.searchsorted(self._sorted_keys, key, side="right")
+        for position in self._key_order[lo:hi]:
+            self.remove_position(int(position))
+
+    def draw(self, rng: np.random.Generator) -> Optional[int]:
+        """Draws one item with probability proportional to its weight, or None if nothing is left."""
+        if self.total <= 1e-12:
+            return None
+        target = rng.random() * self.total
+        position = 0
+        bit = self._top_bit
+        while bit:
+            nxt = position + bit
+            if nxt <= self.size and self._tree[nxt] <= target:
+                position = nxt
+                target -= self._tree[nxt]
+            bit >>= 1
+        if position >= self.size or self.weights[position] <= 0:
+            # Floating point drift after many removals; fall back to the nearest live candidate.
+            live = np.flatnonzero(self.weights > 0)
+            if len(live) == 0:
+                return None
+            position = int(live[min(np.searchsorted(live, position), len(live) - 1)])
+        return self.items[position]
@@ -1,22 +1,206 @@
+import queue
 import sys
+import threading
+from concurrent.futures import Future
 from pathlib import Path
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from typing import Any, Callable, List, Optional, Tuple
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
 from app.config import settings
 
-if getattr(sys, "frozen", False):                     
-    BASE_DIR = Path(sys.executable).parent            
-else:                                                
-    BASE_DIR = Path(__file__).resolve().parent.parent  
+if getattr(sys, "frozen", False):
+    BASE_DIR = Path(sys.executable).parent
+else:
+    BASE_DIR = Path(__file__).resolve().parent.parent
+
+DATABASE_URL = make_url(settings.DATABASE_URL)
+IS_SQLITE = DATABASE_URL.get_backend_name() == "sqlite"
+# Drivers of the async engine, by backend; other backends keep the configured driver.
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+# In-memory databases have no WAL and cannot be shared by a connection pool.
+_SQLITE_FILE = IS_SQLITE and DATABASE_URL.database not in (None, "", ":memory:") \
+    and "mode=memory" not in str(DATABASE_URL)
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Runs on every new SQLite connection of both pools."""
+    cursor = dbapi_connection.cursor()
+    if _SQLITE_FILE:
+        # WAL lets readers proceed while the single writer commits; NORMAL only fsyncs at checkpoints.
+        cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+    # A negative cache_size is in KiB rather than pages.
+    cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_MB * 1024}")
+    cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE_MB * 1024 * 1024}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def _take_over_sqlite_transactions(dbapi_connection, connection_record):
+    # pysqlite opens transactions lazily and breaks SAVEPOINT; let SQLAlchemy emit BEGIN itself.
+    dbapi_connection.isolation_level = None
+
+
+def _begin_immediate(conn):
+    # Take the write lock up front, so a transaction never fails upgrading from a read lock.
+    conn.exec_driver_sql("BEGIN IMMEDIATE")
 
 
+def _make_engine(pool_size: int, max_overflow: int, writer: bool = False) -> Engine:
+    """
+    Builds one of the two pools. On SQLite every connection gets the pragmas above
+    and the write pool begins its transactions with BEGIN IMMEDIATE; other
+    databases get a plain pre-pinged pool.
+    """
+    if not IS_SQLITE:
+        return create_engine(DATABASE_URL, pool_size=pool_size, max_overflow=max_overflow, pool_pre_ping=True)
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False},      
-)
+    # One shared connection for in-memory databases, so every thread sees the same data.
+    pool_args = {"pool_size": pool_size, "max_overflow": max_overflow} if _SQLITE_FILE else {"poolclass": StaticPool}
+    new_engine = create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False, "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000},
+        **pool_args
+    )
+    event.listen(new_engine, "connect", _apply_sqlite_pragmas)
+    if writer:
+        event.listen(new_engine, "connect", _take_over_sqlite_transactions)
+        event.listen(new_engine, "begin", _begin_immediate)
+    return new_engine
+
+
+# Read pool: request handlers, the catalog and scripts. Sessions from it can still
+# write (seeding, batch runs), relying on the busy timeout when the writer is busy.
+engine = _make_engine(settings.DB_READ_POOL_SIZE, settings.DB_READ_POOL_OVERFLOW)
+read_engine = engine
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Write pool: the one connection of the `write_queue` thread; SQLite has a single writer anyway.
+# An in-memory SQLite database exists once per connection, so there both sides share one engine.
+write_engine = _make_engine(1, 0, writer=True) if _SQLITE_FILE or not IS_SQLITE else engine
+# Objects returned by write jobs are read after the queue has committed and closed the session.
+WriteSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=write_engine)
+
+
+def _make_async_engine(pool_size: int, max_overflow: int) -> AsyncEngine:
+    """The read pool again, driven by aiosqlite/asyncpg for the async endpoints."""
+    url = DATABASE_URL.set(drivername=ASYNC_DRIVERS.get(DATABASE_URL.get_backend_name(), DATABASE_URL.drivername))
+    if not IS_SQLITE:
+        return create_async_engine(url, pool_size=pool_size, max_overflow=max_overflow, pool_pre_ping=True)
+
+    # An in-memory database is private to its engine; the async side gets its own, empty one.
+    pool_args = {"pool_size": pool_size, "max_overflow": max_overflow} if _SQLITE_FILE else {"poolclass": StaticPool}
+    new_engine = create_async_engine(url, connect_args={"timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000}, **pool_args)
+    event.listen(new_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    return new_engine
+
+
+async_engine = _make_async_engine(settings.DB_READ_POOL_SIZE, settings.DB_READ_POOL_OVERFLOW)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+class WriteQueue:
+    """
+    Serializes writes through one background thread. Jobs are callables taking a
+    Session; whatever is queued while a transaction runs is committed together in
+    the next one, each job inside its own SAVEPOINT so a failing job only rolls
+    back itself. Jobs must not commit.
+    """
+    _STOP = object()
+
+    def __init__(self, session_factory: Callable[[], Session], max_batch: int = 64):
+        self._session_factory = session_factory
+        self._max_batch = max_batch
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Commits everything already queued, then stops the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put(self._STOP)
+            thread.join(timeout)
+
+    def submit(self, job: Callable[[Session], Any]) -> Future:
+        """Queues a write; the Future resolves to the job's return value once committed."""
+        self.start()
+        future: Future = Future()
+        self._queue.put((job, future))
+        return future
+
+    def run(self, job: Callable[[Session], Any]) -> Any:
+        """Queues a write and blocks until it is committed."""
+        return self.submit(job).result()
+
+    def _loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                return
+            batch = [item]
+            stopping = False
+            while len(batch) < self._max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit_batch(batch)
+            if stopping:
+                return
+
+    def _commit_batch(self, batch: List[Tuple[Callable[[Session], Any], Future]]) -> None:
+        outcomes = []
+        session = self._session_factory()
+        try:
+            for job, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                savepoint = session.begin_nested()
+                try:
+                    result = job(session)
+                    session.flush()
+                    savepoint.commit()
+                    outcomes.append((future, result, None))
+                except Exception as e:
+                    savepoint.rollback()
+                    outcomes.append((future, None, e))
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            session.close()
+
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+write_queue = WriteQueue(WriteSessionLocal, max_batch=settings.WRITE_QUEUE_MAX_BATCH)
+
+
 def get_db():
     """FastAPI dependency that yields a scoped session."""
     db = SessionLocal()
@@ -24,3 +208,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """FastAPI dependency that yields an async session for the non-blocking endpoints."""
+    async with AsyncSessionLocal() as db:
+        yield db
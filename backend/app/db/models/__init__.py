@@ -9,6 +9,8 @@ from .meal import Meal
 from .meal_plan import MealPlan
 from .plan import Plan
 from .feedback import Feedback
+from .feedback_revision import FeedbackRevision
+from .catalog_state import CatalogState
 
 # This __all__ list defines which names are exported when a script does `from .models import *`
 __all__ = [
@@ -17,5 +19,7 @@ __all__ = [
     "Meal",
     "Plan",
     "MealPlan",
-    "Feedback"
+    "Feedback",
+    "FeedbackRevision",
+    "CatalogState"
 ]
@@ -0,0 +1,16 @@
+# backend/app/db/models/catalog_state.py
+
+from sqlalchemy import Column, Integer, DateTime
+from .base import Base
+
+class CatalogState(Base):
+    """
+    A single-row table holding the meal catalog's version. Every seed or sync that
+    changes meals bumps it, so processes holding an in-memory catalog can tell
+    when to reload.
+    """
+    __tablename__ = 'catalog_state'
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=True)
@@ -1,10 +1,12 @@
 # C:\Users\jrochau\projects\NutriPlan AI\backend\app\db\models\feedback.py
 
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index
 from .base import Base
 
 class Feedback(Base):
     __tablename__ = 'feedback'
+    # Serves per-user lookups: disliked meals (rating <= 2), liked meals and the feedback version.
+    __table_args__ = (Index('ix_feedback_user_id_rating', 'user_id', 'rating'),)
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     meal_id = Column(Integer, ForeignKey('meals.id'), nullable=False)
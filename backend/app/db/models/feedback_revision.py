@@ -0,0 +1,15 @@
+# backend/app/db/models/feedback_revision.py
+
+from sqlalchemy import Column, Integer, ForeignKey
+from .base import Base
+
+class FeedbackRevision(Base):
+    """
+    A per-user counter bumped in every transaction that changes the user's feedback.
+    Unlike the feedback rows' count and highest id, it never repeats after a delete
+    and re-insert, so it safely keys persisted models and eligibility indexes.
+    """
+    __tablename__ = 'feedback_revisions'
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    revision = Column(Integer, nullable=False, default=0)
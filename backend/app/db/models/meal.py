@@ -6,7 +6,7 @@ class Meal(Base):
     __tablename__ = 'meals'
 
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, index=True, nullable=False)
+    name = Column(String, index=True, unique=True, nullable=False)
     calories = Column(Float, nullable=True)
     protein = Column(Float, nullable=True)
     fat = Column(Float, nullable=True)
@@ -14,4 +14,6 @@ class Meal(Base):
     ingredients = Column(JSON, nullable=True)
     recipe = Column(String, nullable=True) 
     tags = Column(JSON, nullable=True)
-    type = Column(String, nullable=True) 
\ No newline at end of file
+    type = Column(String, nullable=True, index=True)
+    # SHA-256 of the normalized recipe record; lets catalog syncs skip unchanged meals.
+    content_hash = Column(String(64), nullable=True)
@@ -1,18 +1,23 @@
 # backend/app/db/models/meal_plan.py
 
 from datetime import date
-from sqlalchemy import Date, ForeignKey
+from typing import Optional
+from sqlalchemy import Date, ForeignKey, Index, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .base import Base
 
 class MealPlan(Base):
     __tablename__ = 'meal_plans'
+    # Serves max(plan_date) per user when a new plan is appended, and per-user date ranges.
+    __table_args__ = (Index('ix_meal_plans_user_id_plan_date', 'user_id', 'plan_date'),)
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey('users.id'))
     meal_id: Mapped[int] = mapped_column(ForeignKey('meals.id'))
 
     plan_date: Mapped[date] = mapped_column(Date)
+    # breakfast, lunch, dinner or side; NULL on rows saved before slots were recorded.
+    slot: Mapped[Optional[str]] = mapped_column(String(16), nullable=True)
 
     user: Mapped["User"] = relationship(back_populates="meal_plans")
     meal: Mapped["Meal"] = relationship() 
\ No newline at end of file
@@ -1,13 +1,17 @@
 # backend/app/db/models/plan.py
 
-from sqlalchemy import Column, Integer, String, ForeignKey, Date
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, Index, LargeBinary
 from .base import Base
 
 class Plan(Base):
     __tablename__ = 'plans'
+    # A user's plan history in date order, and the end of their latest plan.
+    __table_args__ = (Index('ix_plans_user_id_start_date', 'user_id', 'start_date'),)
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     start_date = Column(Date, nullable=False)
     end_date = Column(Date, nullable=False)
-    name = Column(String, nullable=True, default="Weekly Plan")
\ No newline at end of file
+    name = Column(String, nullable=True, default="Weekly Plan")
+    # Compact plan storage: little-endian int32 meal ids, day by day in PLANNED_SLOTS order, 0 for an empty slot.
+    meal_ids = Column(LargeBinary, nullable=True)
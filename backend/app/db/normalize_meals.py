@@ -0,0 +1,443 @@
+# backend/app/db/normalize_meals.py
+"""
+Normalizes a local mirror of raw recipe pages into the JSON Lines files seed_meals loads.
+
+    python -m app.db.normalize_meals RAW_DIR [--output-dir data/normalized] [--workers N]
+
+Raw inputs are HTML pages carrying schema.org Recipe JSON-LD, or JSON files holding
+either JSON-LD or already-scraped records. Parsing, macro normalization and tag/type
+inference run in a process pool; the parent only deduplicates titles and writes the
+output in chunks of `--records-per-file` lines.
+"""
+import argparse
+import html
+import json
+import multiprocessing
+import os
+import re
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from app.core.resources import peak_rss_mb
+
+RAW_SUFFIXES = (".html", ".htm", ".json")
+MEAL_TYPES = ("breakfast", "lunch", "dinner", "lunch/dinner", "side", "dessert")
+
+_NUMBER = re.compile(r"(-?\d+(?:[.,]\d+)*)\s*([a-zA-Z]*)")
+_WHITESPACE = re.compile(r"\s+")
+_JSON_LD_SCRIPT = re.compile(
+    r"<script[^>]*type\s*=\s*[\"']?application/ld\+json[\"']?[^>]*>(.*?)</script\s*>", re.IGNORECASE | re.DOTALL)
+
+# Ingredient keywords that rule a meal out of a diet (tags use the user preference keys).
+# Keywords match whole words and their plurals, so "minced garlic" is not meat.
+_MINCED_MEAT = ("beef mince", "pork mince", "lamb mince", "minced beef", "minced pork", "minced lamb",
+                "minced meat")
+_MEAT = ("chicken", "beef", "pork", "bacon", "ham", "lamb", "turkey", "sausage", "veal", "duck",
+         "prosciutto", "salami", "pepperoni", "chorizo", "steak", "venison", "goat") + _MINCED_MEAT
+_RED_MEAT = ("beef", "pork", "bacon", "ham", "lamb", "veal", "sausage", "steak", "prosciutto",
+             "salami", "pepperoni", "chorizo", "venison", "goat") + _MINCED_MEAT
+# Goat dairy, removed before looking for meat.
+_GOAT_DAIRY = ("goat cheese", "goat's cheese", "goats cheese", "goat milk", "goat's milk", "goats milk",
+               "goat yogurt", "goat's yogurt", "goat butter")
+_SEAFOOD = ("fish", "salmon", "tuna", "cod", "shrimp", "prawn", "crab", "lobster", "anchovy", "anchovies",
+            "sardine", "tilapia", "halibut", "scallop", "mussel", "clam", "oyster", "squid", "trout", "mackerel")
+_SHELLFISH = ("shrimp", "prawn", "crab", "lobster", "scallop", "mussel", "clam", "oyster")
+_DAIRY = ("milk", "buttermilk", "cheese", "butter", "cream", "yogurt", "yoghurt", "ghee", "whey", "parmesan",
+          "mozzarella", "cheddar", "ricotta", "feta", "mascarpone")
+_DAIRY_FREE_ALTERNATIVES = ("almond milk", "oat milk", "soy milk", "rice milk", "coconut milk", "coconut cream",
+                            "peanut butter", "almond butter", "cashew butter", "cocoa butter", "butternut",
+                            "cream of tartar", "dairy-free", "vegan")
+_EGG = ("egg", "egg yolk", "egg white", "mayonnaise", "mayo")
+_GLUTEN = ("flour", "bread", "pasta", "spaghetti", "noodle", "wheat", "barley", "rye", "couscous",
+           "breadcrumb", "tortilla", "bulgur", "semolina", "cracker", "soy sauce", "seitan")
+_GLUTEN_FREE_ALTERNATIVES = ("gluten-free", "gluten free", "rice flour", "almond flour", "coconut flour",
+                             "rice noodle", "corn tortilla", "tamari")
+_NUTS = ("almond", "walnut", "pecan", "cashew", "hazelnut", "pistachio", "peanut", "macadamia", "pine nut")
+_OTHER_ANIMAL = ("honey", "gelatin", "gelatine", "anchovy", "anchovies")
+_FISH = tuple(k for k in _SEAFOOD if k not in _SHELLFISH)
+
+_TYPE_KEYWORDS = (
+    ("breakfast", ("breakfast", "brunch", "pancake", "waffle", "omelet", "omelette", "oatmeal", "porridge",
+                   "granola", "smoothie", "french toast", "frittata", "muffin", "scrambled")),
+    ("dessert", ("dessert", "cake", "cookie", "brownie", "pie", "tart", "pudding", "ice cream", "cupcake",
+                 "cheesecake", "fudge", "mousse", "sorbet", "candy", "candies")),
+    ("side", ("side dish", "side", "salad", "slaw", "roasted vegetables", "mashed", "fries", "rice pilaf")),
+)
+# A title that also names one of these is a savoury dish ("Chicken Pot Pie"), never a dessert.
+_SAVOURY = _MEAT + _SEAFOOD + ("pot pie", "shepherd", "cottage pie", "quiche", "savory", "savoury", "cheese",
+                               "onion", "leek", "mushroom", "spinach", "vegetable")
+
+
+def _clean_text(value) -> str:
+    return _WHITESPACE.sub(" ", html.unescape(str(value))).strip() if value is not None else ""
+
+
+def parse_quantity(value, unit: str = "g") -> float:
+    """
+    Parses nutrition values such as 20, "20 g", "1,200 mg" or "1465 kJ" into grams
+    (or kcal when `unit` is 'kcal'). Unparseable values become 0.0.
+    """
+    if value is None or isinstance(value, bool):
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _NUMBER.search(str(value))
+    if not match:
+        return 0.0
+    digits = match.group(1)
+    if "," in digits and "." in digits:
+        digits = digits.replace(",", "")
+    elif "," in digits:
+        # "1,200" is a thousands separator, "12,5" a decimal comma.
+        digits = digits.replace(",", "") if re.fullmatch(r"-?\d{1,3}(,\d{3})+", digits) else digits.replace(",", ".")
+    number = float(digits)
+    suffix = match.group(2).lower()
+    if unit == "kcal":
+        return number / 4.184 if suffix in ("kj", "kilojoules") else number
+    if suffix in ("mg", "milligram", "milligrams"):
+        return number / 1000.0
+    return number
+
+
+def normalize_macros(macros: Optional[dict]) -> Dict[str, float]:
+    """Maps the macro spellings seen in raw and normalized records onto protein/fat/carbs in grams."""
+    macros = macros or {}
+    return {
+        "protein": parse_quantity(macros.get("protein", macros.get("proteinContent"))),
+        "fat": parse_quantity(macros.get("fat", macros.get("fatContent"))),
+        "carbs": parse_quantity(macros.get("carbs") or macros.get("carb") or macros.get("carbohydrateContent")),
+    }
+
+
+def _instructions(value) -> List[str]:
+    """Flattens schema.org recipeInstructions (text, HowToStep or HowToSection lists) into steps."""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [step for step in (_clean_text(s) for s in re.split(r"\n+", value)) if step]
+    if isinstance(value, dict):
+        if "itemListElement" in value:
+            return _instructions(value["itemListElement"])
+        return _instructions(value.get("text") or value.get("name"))
+    steps = []
+    for item in value:
+        steps.extend(_instructions(item))
+    return steps
+
+
+def _as_list(value) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [part.strip() for part in value.split(",") if part.strip()]
+    return [_clean_text(v) for v in value if v]
+
+
+_keyword_patterns: Dict[Tuple[str, ...], "re.Pattern"] = {}
+
+
+def _contains(text: str, keywords: Tuple[str, ...]) -> bool:
+    """Whether any keyword or its plural is a whole word in `text` ("ham" matches "hams", not "graham")."""
+    pattern = _keyword_patterns.get(keywords)
+    if pattern is None:
+        pattern = re.compile(r"\b(?:" + "|".join(re.escape(k) for k in keywords) + r")(?:e?s)?\b")
+        _keyword_patterns[keywords] = pattern
+    return pattern.search(text) is not None
+
+
+def infer_tags(ingredients: Sequence[str], hints: Sequence[str] = ()) -> List[str]:
+    """
+    Infers diet tags (the user preference keys: vegetarian, vegan, gluten_free,
+    dairy_free, no_red_meat) and allergen tags (nuts, dairy, gluten, eggs, shellfish,
+    fish) from ingredient lines, honouring explicit diet hints from the source.
+
+    >>> infer_tags(["2 cloves garlic, minced", "1 cup rice", "1 onion"])
+    ['dairy_free', 'gluten_free', 'no_red_meat', 'vegan', 'vegetarian']
+    >>> infer_tags(["100 g goat cheese", "1 eggplant"])
+    ['dairy', 'gluten_free', 'no_red_meat', 'vegetarian']
+    >>> infer_tags(["500 g minced beef", "1 onion"])
+    ['dairy_free', 'gluten_free']
+    """
+    text = " ".join(ingredients).lower()
+    hint_text = " ".join(hints).lower()
+    plain = text
+    for alternative in _DAIRY_FREE_ALTERNATIVES + _GLUTEN_FREE_ALTERNATIVES:
+        plain = plain.replace(alternative, " ")
+
+    meat_text = text
+    for goat_dairy in _GOAT_DAIRY:
+        meat_text = meat_text.replace(goat_dairy, " ")
+
+    compact_hints = hint_text.replace(" ", "").replace("-", "")
+    has_meat = _contains(meat_text, _MEAT)
+    has_seafood = _contains(text, _SEAFOOD)
+    has_dairy = _contains(plain, _DAIRY) and "dairyfree" not in compact_hints
+    has_egg = _contains(text, _EGG)
+    has_gluten = _contains(plain, _GLUTEN) and "glutenfree" not in compact_hints
+
+    tags = []
+    if not has_meat and not has_seafood or "vegetarian" in hint_text:
+        tags.append("vegetarian")
+        if (not has_dairy and not has_egg and not _contains(text, _OTHER_ANIMAL)) or "vegan" in hint_text:
+            tags.append("vegan")
+    if not has_gluten:
+        tags.append("gluten_free")
+    if not has_dairy:
+        tags.append("dairy_free")
+    if not _contains(meat_text, _RED_MEAT):
+        tags.append("no_red_meat")
+
+    if _contains(text, _NUTS):
+        tags.append("nuts")
+    if has_dairy:
+        tags.append("dairy")
+    if has_gluten:
+        tags.append("gluten")
+    if has_egg:
+        tags.append("eggs")
+    if _contains(text, _SHELLFISH):
+        tags.append("shellfish")
+    if _contains(text, _FISH):
+        tags.append("fish")
+    return sorted(set(tags))
+
+
+def infer_type(title: str, hints: Sequence[str] = (), declared: Optional[str] = None) -> str:
+    """
+    Picks a planner meal type from a declared type, the source's categories or the title.
+
+    >>> infer_type("Chicken Pot Pie"), infer_type("Shepherd's Pie"), infer_type("Apple Pie")
+    ('lunch/dinner', 'lunch/dinner', 'dessert')
+    """
+    if declared and declared.lower() in MEAL_TYPES:
+        return declared.lower()
+    for text in (" ".join(hints).lower(), title.lower()):
+        if not text:
+            continue
+        for meal_type, keywords in _TYPE_KEYWORDS:
+            if meal_type == "dessert" and _contains(text, _SAVOURY):
+                continue
+            if _contains(text, keywords):
+                return meal_type
+    return "lunch/dinner"
+
+
+def normalize_record(raw: dict) -> Optional[dict]:
+    """
+    Turns one raw recipe (schema.org Recipe JSON-LD or a scraped record) into the
+    normalized shape seed_meals expects: title, calories, macros, ingredients,
+    directions, tags and type. Returns None for records without a title.
+    """
+    title = _clean_text(raw.get("title") or raw.get("name"))
+    if not title:
+        return None
+
+    nutrition = raw.get("nutrition") or {}
+    macros = normalize_macros(raw.get("macros") or nutrition)
+    calories = parse_quantity(raw.get("calories", nutrition.get("calories")), unit="kcal")
+
+    ingredients = _as_list(raw.get("ingredients") or raw.get("recipeIngredient"))
+    directions = raw.get("directions")
+    directions = _as_list(directions) if isinstance(directions, list) else _instructions(
+        directions or raw.get("recipeInstructions"))
+
+    hints = (_as_list(raw.get("keywords")) + _as_list(raw.get("recipeCategory"))
+             + _as_list(raw.get("suitableForDiet")) + _as_list(raw.get("tags")))
+    return {
+        "title": title,
+        "calories": round(calories, 2),
+        "macros": {key: round(value, 2) for key, value in macros.items()},
+        "ingredients": ingredients,
+        "directions": directions,
+        "tags": infer_tags(ingredients, hints),
+        "type": infer_type(title, hints, raw.get("type")),
+    }
+
+
+def _recipe_nodes(node) -> Iterator[dict]:
+    """Finds schema.org Recipe objects anywhere in a JSON-LD document (lists, @graph, nesting)."""
+    if isinstance(node, list):
+        for item in node:
+            yield from _recipe_nodes(item)
+    elif isinstance(node, dict):
+        node_type = node.get("@type")
+        types = node_type if isinstance(node_type, list) else [node_type]
+        if "Recipe" in types:
+            yield node
+        elif "@graph" in node:
+            yield from _recipe_nodes(node["@graph"])
+
+
+def extract_raw_recipes(path: Path) -> List[dict]:
+    """Reads the raw recipe objects from one HTML page or JSON file."""
+    text = path.read_text(encoding="utf-8", errors="replace")
+    if path.suffix == ".json":
+        document = json.loads(text)
+        recipes = list(_recipe_nodes(document))
+        if recipes:
+            return recipes
+        return document if isinstance(document, list) else [document]
+
+    # Fast path: pull the JSON-LD blocks out with a regex instead of tokenizing the whole page.
+    blocks = _JSON_LD_SCRIPT.findall(text)
+    if not blocks and "ld+json" in text.lower():
+        from bs4 import BeautifulSoup, SoupStrainer
+
+        # Unusual markup; let BeautifulSoup find the script tags, parsing nothing else.
+        scripts = BeautifulSoup(text, "html.parser", parse_only=SoupStrainer("script", type="application/ld+json"))
+        blocks = [script.string or "" for script in scripts.find_all("script")]
+
+    recipes = []
+    for block in blocks:
+        try:
+            recipes.extend(_recipe_nodes(json.loads(block)))
+        except json.JSONDecodeError:
+            continue
+    return recipes
+
+
+def _normalize_files(paths: List[str]) -> Tuple[int, List[dict], List[Tuple[str, str]]]:
+    """Worker task: normalizes a batch of raw files, returning (file count, records, [(path, error)])."""
+    records, errors = [], []
+    for path in paths:
+        try:
+            for raw in extract_raw_recipes(Path(path)):
+                record = normalize_record(raw) if isinstance(raw, dict) else None
+                if record:
+                    records.append(record)
+        except Exception as e:
+            errors.append((path, str(e)))
+    return len(paths), records, errors
+
+
+def iter_raw_files(raw_dir: Path) -> Iterator[str]:
+    """Walks a raw mirror lazily, in a stable order, yielding recipe file paths."""
+    for root, dirs, files in os.walk(raw_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(RAW_SUFFIXES):
+                yield os.path.join(root, name)
+
+
+def _batches(paths: Iterable[str], size: int) -> Iterator[List[str]]:
+    batch = []
+    for path in paths:
+        batch.append(path)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class _ChunkedJsonlWriter:
+    """Writes records to numbered JSON Lines files of at most `records_per_file` lines each."""
+    def __init__(self, output_dir: Path, records_per_file: int, prefix: str = "normalized_meals"):
+        self.output_dir = output_dir
+        self.records_per_file = records_per_file
+        self.prefix = prefix
+        self.files: List[Path] = []
+        self._handle = None
+        self._in_file = 0
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+    def write(self, record: dict) -> None:
+        if self._handle is None or self._in_file >= self.records_per_file:
+            self.close()
+            path = self.output_dir / f"{self.prefix}-{len(self.files):05d}.jsonl"
+            self.files.append(path)
+            self._handle = path.open("w", encoding="utf-8")
+            self._in_file = 0
+        self._handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._in_file += 1
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+def normalize_directory(raw_dir: Path, output_dir: Path, workers: Optional[int] = None,
+                        files_per_task: int = 64, records_per_file: int = 50000) -> dict:
+    """
+    Normalizes every raw recipe under `raw_dir` into chunked JSON Lines in `output_dir`.
+
+    Files are handed to a process pool in batches of `files_per_task`; results come back
+    in input order, so the first occurrence of a title wins exactly as in seeding.
+
+    Returns:
+        dict: Files read, records written, duplicates and failures, output files,
+        elapsed seconds and throughput.
+    """
+    started = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    writer = _ChunkedJsonlWriter(output_dir, records_per_file)
+    seen_titles = set()
+    files_read = written = duplicates = 0
+    failures: List[Tuple[str, str]] = []
+
+    def consume(results):
+        nonlocal files_read, written, duplicates
+        for batch_size, records, errors in results:
+            files_read += batch_size
+            failures.extend(errors)
+            for record in records:
+                if record["title"] in seen_titles:
+                    duplicates += 1
+                    continue
+                seen_titles.add(record["title"])
+                writer.write(record)
+                written += 1
+            elapsed = time.perf_counter() - started
+            print(f"\r  -> {files_read} files, {written} recipes ({files_read / elapsed:,.0f} files/sec)",
+                  end="", flush=True)
+
+    batches = _batches(iter_raw_files(raw_dir), files_per_task)
+    try:
+        if workers <= 1:
+            consume(_normalize_files(batch) for batch in batches)
+        else:
+            with multiprocessing.Pool(workers) as pool:
+                consume(pool.imap(_normalize_files, batches))
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        "files": files_read,
+        "records": written,
+        "duplicates": duplicates,
+        "failed": len(failures),
+        "output_files": [str(path) for path in writer.files],
+        "elapsed_seconds": round(elapsed, 3),
+        "files_per_second": round(files_read / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+    print(f"\n  -> ✅ Normalized {written} recipes from {files_read} files in {elapsed:.2f}s "
+          f"({summary['files_per_second']} files/sec, {duplicates} duplicate titles, {len(failures)} failures, "
+          f"peak RSS {peak_rss_mb():.0f} MiB).")
+    for path, error in failures[:10]:
+        print(f"  -> ❗ {path}: {error}")
+    return summary
+
+
+def main() -> None:
+    data_dir = Path(__file__).resolve().parent.parent.parent.parent / "data"
+    parser = argparse.ArgumentParser(description="Normalize raw recipe pages into JSON Lines for seeding.")
+    parser.add_argument("raw_dir", type=Path, help="Directory of raw recipe HTML/JSON files (searched recursively).")
+    parser.add_argument("--output-dir", type=Path, default=data_dir / "normalized",
+                        help="Where the normalized_meals-NNNNN.jsonl chunks are written.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+    parser.add_argument("--files-per-task", type=int, default=64, help="Raw files handed to a worker at a time.")
+    parser.add_argument("--records-per-file", type=int, default=50000, help="Recipes per output chunk.")
+    args = parser.parse_args()
+
+    print(f"--- Normalizing recipes from {args.raw_dir} ---")
+    summary = normalize_directory(args.raw_dir, args.output_dir, workers=args.workers,
+                                  files_per_task=args.files_per_task, records_per_file=args.records_per_file)
+    print(f"Seed with: python -m app.db.seed_meals --file {args.output_dir}"
+          if summary["output_files"] else "No recipes found.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+# backend/app/db/plan_batch.py
+import argparse
+import multiprocessing
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db.db import SessionLocal, write_queue
+from app.db.models.user import User
+from app.db.models.feedback import Feedback
+from app.db.models.feedback_revision import FeedbackRevision
+from app.db.core.catalog import MealCatalog, get_catalog
+from app.db.core.planner import MealPlanner, WeeklyPlan, save_plans
+from app.db.core.rules import UserProfile
+from app.core.feedback import FeedbackEngine
+
+# SQLite caps the number of bound parameters per statement, so IN lists are chunked.
+IN_CLAUSE_CHUNK = 500
+
+# Only set in spawned pool workers (see _init_worker); planning in this process passes its own.
+_worker_catalog: Optional[MealCatalog] = None
+_worker_feedback_engine: Optional[FeedbackEngine] = None
+
+
+def _init_worker(catalog: MealCatalog) -> None:
+    """
+    Process pool initializer: every worker receives the catalog once, not per task,
+    and a feedback engine that reuses persisted per-user models when they are current.
+    """
+    global _worker_catalog, _worker_feedback_engine
+    _worker_catalog = catalog
+    _worker_feedback_engine = FeedbackEngine(model_dir=settings.FEEDBACK_MODEL_DIR,
+                                             max_models_in_memory=settings.FEEDBACK_MODELS_IN_MEMORY)
+
+
+def _plan_job(job: Dict, catalog: MealCatalog, feedback_engine: FeedbackEngine) -> List[WeeklyPlan]:
+    """Plans one user's weeks entirely from preloaded data; no database access."""
+    feedback_engine.ensure_trained_from_records(job["user_id"], job["feedback"], job["feedback_version"])
+
+    planner = MealPlanner(
+        feedback_engine=feedback_engine,
+        user_id=job["user_id"],
+        user_profile=UserProfile(**job["profile"]),
+        db_session=None,
+        seed=job["seed"],
+        catalog=catalog,
+        disliked_meal_ids=job["disliked_meal_ids"],
+        feedback_version=job["feedback_version"]
+    )
+    return planner.generate_weekly_plans(job["weeks"])
+
+
+def _plan_chunk(jobs: List[Dict], catalog: Optional[MealCatalog] = None,
+                feedback_engine: Optional[FeedbackEngine] = None) -> List[Tuple[int, Optional[List[WeeklyPlan]], Optional[str]]]:
+    """
+    Plans a chunk of users, returning (user_id, plans, error) per user. Without a
+    catalog it runs in a pool worker and uses that worker's catalog and feedback engine.
+    """
+    if catalog is None:
+        catalog, feedback_engine = _worker_catalog, _worker_feedback_engine
+    results = []
+    for job in jobs:
+        try:
+            results.append((job["user_id"], _plan_job(job, catalog, feedback_engine), None))
+        except Exception as e:
+            results.append((job["user_id"], None, str(e)))
+    return results
+
+
+def _chunks(items: Sequence, size: int) -> List[Sequence]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _load_jobs(db: Session, catalog: MealCatalog, user_ids: Sequence[int], seed: Optional[int],
+               weeks: int = 1) -> Tuple[List[Dict], List[int]]:
+    """
+    Loads every requested user and all of their feedback up front and turns them
+    into self-contained planning jobs. Users with incomplete profiles are skipped.
+    """
+    users: List[User] = []
+    feedback_by_user: Dict[int, List[tuple]] = defaultdict(list)
+    revisions: Dict[int, int] = {}
+    for id_chunk in _chunks(list(user_ids), IN_CLAUSE_CHUNK):
+        users.extend(db.query(User).filter(User.id.in_(id_chunk)).all())
+        revisions.update(db.query(FeedbackRevision.user_id, FeedbackRevision.revision)
+                         .filter(FeedbackRevision.user_id.in_(id_chunk)).all())
+        feedback_rows = db.query(
+            Feedback.user_id, Feedback.id, Feedback.meal_id, Feedback.rating
+        ).filter(Feedback.user_id.in_(id_chunk)).all()
+        for row in feedback_rows:
+            feedback_by_user[row.user_id].append(row)
+
+    jobs, skipped = [], []
+    found_ids = set()
+    for user in users:
+        found_ids.add(user.id)
+        if not user.sex or not user.weight_kg or not user.height_cm or not user.activity_level:
+            skipped.append(user.id)
+            continue
+
+        feedback_rows = feedback_by_user.get(user.id, [])
+        training_records, disliked_meal_ids = [], set()
+        for row in feedback_rows:
+            if row.rating <= 2:
+                disliked_meal_ids.add(row.meal_id)
+            catalog_row = catalog.row_by_id.get(row.meal_id)
+            if catalog_row is not None:
+                training_records.append((row.rating, catalog.names[catalog_row], catalog.tags[catalog_row]))
+
+        jobs.append({
+            "user_id": user.id,
+            "profile": {
+                "age": user.age,
+                "dietary_preferences": [k for k, v in (user.preferences or {}).items() if v],
+                "sex": user.sex,
+                "goal": user.goal_text or "",
+                "weight_kg": user.weight_kg,
+                "height_cm": user.height_cm,
+                "activity_level": user.activity_level,
+            },
+            "feedback": training_records,
+            "disliked_meal_ids": disliked_meal_ids,
+            "feedback_version": (len(feedback_rows), max((r.id for r in feedback_rows), default=0),
+                                 revisions.get(user.id, 0)),
+            "seed": None if seed is None else seed + user.id,
+            "weeks": weeks,
+        })
+
+    skipped.extend(uid for uid in user_ids if uid not in found_ids)
+    return jobs, skipped
+
+
+def _save_chunk(planned: List[Tuple[int, WeeklyPlan]]) -> int:
+    """
+    Writes every plan of a chunk in one transaction with one bulk insert per storage
+    format, through the write queue so the batch never competes with other writers.
+    """
+    return write_queue.run(lambda session: save_plans(session, planned))
+
+
+def generate_plans_batch(db: Session, user_ids: Sequence[int], workers: Optional[int] = None,
+                         chunk_size: int = 200, seed: Optional[int] = None, weeks: int = 1) -> Dict:
+    """
+    Generates and saves weekly plans for many users at once.
+
+    The meal catalog and all feedback are loaded once, planning is spread over a
+    process pool of at most PLAN_BATCH_WORKERS processes in chunks of `chunk_size`
+    users, and each finished chunk is written with a single bulk insert. With
+    `weeks` > 1 every user gets that many consecutive weekly plans.
+
+    Returns:
+        dict: Counts of planned, skipped and failed users, weekly plans and rows
+        written, elapsed seconds and throughput in plans per second.
+    """
+    started = time.perf_counter()
+    # Never more processes than PLAN_BATCH_WORKERS, whatever the caller asks for.
+    workers = max(1, min(workers or settings.PLAN_BATCH_WORKERS, settings.PLAN_BATCH_WORKERS))
+    if not 1 <= weeks <= settings.PLAN_MAX_WEEKS:
+        raise ValueError(f"weeks must be between 1 and {settings.PLAN_MAX_WEEKS}.")
+    user_ids = list(dict.fromkeys(user_ids))
+
+    catalog = get_catalog(db)
+    if len(catalog) == 0:
+        raise ValueError("The 'meal' table is empty. Please run the seeder first.")
+    jobs, skipped = _load_jobs(db, catalog, user_ids, seed, weeks)
+    job_chunks = _chunks(jobs, max(1, chunk_size))
+    workers = min(workers, max(1, len(job_chunks)))
+    print(f"-> Batch planning {weeks} week(s) for {len(jobs)} users with {workers} worker(s) ({len(skipped)} skipped).")
+
+    failed: List[int] = []
+    planned_count = plans_written = rows_written = 0
+
+    def handle(results):
+        nonlocal planned_count, plans_written, rows_written
+        planned = []
+        for user_id, plans, error in results:
+            if plans is None:
+                print(f"  -> ❗ Planning failed for user {user_id}: {error}")
+                failed.append(user_id)
+            else:
+                planned.extend((user_id, plan) for plan in plans)
+                planned_count += 1
+        rows_written += _save_chunk(planned)
+        plans_written += len(planned)
+
+    if workers <= 1 or len(job_chunks) <= 1:
+        # Local to this call, so concurrent in-process batches never share it.
+        feedback_engine = FeedbackEngine(model_dir=settings.FEEDBACK_MODEL_DIR,
+                                         max_models_in_memory=settings.FEEDBACK_MODELS_IN_MEMORY)
+        for chunk in job_chunks:
+            handle(_plan_chunk(chunk, catalog, feedback_engine))
+    else:
+        # Spawned (not forked) workers, since the API calls this from a threaded server.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker, initargs=(catalog,)) as pool:
+            for results in pool.map(_plan_chunk, job_chunks):
+                handle(results)
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        "requested": len(user_ids),
+        "planned": planned_count,
+        "skipped": skipped,
+        "failed": failed,
+        "plans": plans_written,
+        "rows_written": rows_written,
+        "elapsed_seconds": round(elapsed, 3),
+        "plans_per_second": round(plans_written / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+    print(f"-> ✅ Planned {plans_written} plans for {planned_count} users in {elapsed:.2f}s "
+          f"({summary['plans_per_second']} plans/sec).")
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate weekly meal plans for many users at once.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--user-ids", type=int, nargs="+", help="IDs of the users to plan for.")
+    target.add_argument("--all", action="store_true", help="Plan for every user.")
+    parser.add_argument("--workers", type=int, default=None, help="Planner processes (default and maximum: PLAN_BATCH_WORKERS).")
+    parser.add_argument("--chunk-size", type=int, default=200, help="Users per worker task and per bulk insert.")
+    parser.add_argument("--seed", type=int, default=None, help="Base seed for reproducible plans.")
+    parser.add_argument("--weeks", type=int, default=1, help="Consecutive weekly plans per user.")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        user_ids = args.user_ids or [user_id for (user_id,) in db.query(User.id).order_by(User.id).all()]
+        summary = generate_plans_batch(db, user_ids, workers=args.workers, chunk_size=args.chunk_size, seed=args.seed,
+                                       weeks=args.weeks)
+        print("\n" + "="*50)
+        print(f"Requested: {summary['requested']}  Planned: {summary['planned']} ({summary['plans']} plans)  "
+              f"Skipped: {len(summary['skipped'])}  Failed: {len(summary['failed'])}")
+        print(f"Rows written: {summary['rows_written']}  Elapsed: {summary['elapsed_seconds']}s  "
+              f"Throughput: {summary['plans_per_second']} plans/sec")
+        print("="*50 + "\n")
+    finally:
+        db.close()
+        write_queue.stop()
+
+
+if __name__ == "__main__":
+    main()
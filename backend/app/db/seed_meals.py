@@ -1,7 +1,15 @@
 # C:\Users\jrochau\projects\NutriPlan AI\backend\app\db\seed_meals.py
+import argparse
+import hashlib
 import json
+import re
+import time
 from pathlib import Path
+from typing import Iterator, TextIO
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session
+from app.config import settings
+from app.core.resources import peak_rss_mb
 from app.db.db import SessionLocal, engine
 from app.db.models.base import Base
 from app.db.models.user import User
@@ -9,9 +17,19 @@ from app.db.models.meal import Meal
 from app.db.models.meal_plan import MealPlan
 from app.db.models.plan import Plan
 from app.db.models.feedback import Feedback
+from app.db.models.catalog_state import CatalogState
+from app.db.core.catalog import bump_catalog_version, invalidate_catalog
+from app.db.normalize_meals import normalize_macros
 
 DATA_DIR = Path(__file__).resolve().parent.parent.parent.parent / "data"
 
+_ARRAY_SEPARATORS = re.compile(r"[\s,]*")
+
+# Columns a sync overwrites when a meal's content changed; `name` is the conflict key.
+SYNC_COLUMNS = ("calories", "protein", "fat", "carbs", "recipe", "tags", "ingredients", "type", "content_hash")
+# SQLite caps the number of bound parameters per statement, so IN lists are chunked.
+IN_CLAUSE_CHUNK = 500
+
 def create_demo_user(db: Session):
     """Creates a demo user if one does not already exist."""
     print("-> Checking for demo user...")
@@ -35,73 +53,309 @@ def create_demo_user(db: Session):
     else:
         print(" -> Demo user already exists.")
 
-def seed_meals_data(db: Session, data_file: Path) -> int: 
-    """Seeds the database with meals from a specific normalized JSON file."""
-    print(f"  -> Seeding from file: {data_file.name}")
-    try:
-        with data_file.open(encoding="utf-8") as f:
-            data = json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        print(f"  -> ERROR: Could not read or parse {data_file.name}")
-        return 0
+def _iter_json_array(f: TextIO, chunk_size: int) -> Iterator[dict]:
+    """
+    Yields the elements of a top-level JSON array one at a time, reading the file in
+    `chunk_size` character blocks so only the current element is held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer = f.read(chunk_size).lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("JSON data is not a list of recipes.")
+    pos = 1
+    eof = False
 
-    if not isinstance(data, list):
-        print(f"  -> ERROR: JSON data is not a list of recipes.")
-        return 0
+    while True:
+        pos = _ARRAY_SEPARATORS.match(buffer, pos).end()
+        if pos >= len(buffer):
+            if eof:
+                raise ValueError("Unexpected end of file inside the recipe array.")
+            more = f.read(chunk_size)
+            eof = not more
+            buffer, pos = buffer[pos:] + more, 0
+            continue
+        if buffer[pos] == "]":
+            return
 
-    meal_count = 0
-    titles_in_session = set()
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            item, end = None, None
+        # A decode error or a value touching the end of the buffer may just be a cut-off
+        # element (e.g. a number split across chunks); read more before trusting it.
+        if end is None or (end == len(buffer) and not eof):
+            if eof:
+                raise json.JSONDecodeError("Malformed recipe array", buffer, pos)
+            more = f.read(chunk_size)
+            eof = not more
+            buffer, pos = buffer[pos:] + more, 0
+            continue
+
+        yield item
+        pos = end
+        if pos >= chunk_size:
+            buffer, pos = buffer[pos:], 0
+
+
+def _iter_json_lines(f: TextIO) -> Iterator[dict]:
+    for line_number, line in enumerate(f, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise json.JSONDecodeError(f"Line {line_number}: {e.msg}", e.doc, e.pos)
 
-    for item in data:
+
+def iter_recipes(data_file: Path, chunk_size: int = 1 << 20) -> Iterator[dict]:
+    """
+    Streams recipe records from either a JSON array file or a JSON Lines file
+    (one object per line), detected from the extension or the first character.
+    A directory (e.g. the chunked output of normalize_meals) is read file by file
+    in name order.
+    """
+    if data_file.is_dir():
+        for chunk in sorted(p for p in data_file.iterdir() if p.suffix in (".json", ".jsonl", ".ndjson")):
+            yield from iter_recipes(chunk, chunk_size)
+        return
+    with data_file.open(encoding="utf-8") as f:
+        if data_file.suffix in (".jsonl", ".ndjson"):
+            yield from _iter_json_lines(f)
+            return
+        head = f.read(1)
+        while head and head.isspace():
+            head = f.read(1)
+        f.seek(0)
+        if head == "[":
+            yield from _iter_json_array(f, chunk_size)
+        else:
+            yield from _iter_json_lines(f)
+
+
+def _meal_row(item: dict) -> dict:
+    """Maps one normalized recipe record onto `meals` table columns, including its content hash."""
+    macros = normalize_macros(item.get("macros"))
+    row = {
+        "name": item.get("title"),
+        "calories": item.get("calories", 0),
+        "protein": macros["protein"],
+        "fat": macros["fat"],
+        "carbs": macros["carbs"],
+        "recipe": ' '.join(item.get('directions', [])),
+        "tags": item.get('tags', []),
+        "ingredients": item.get('ingredients', []),
+        "type": item.get('type'),
+    }
+    canonical = json.dumps(row, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    row["content_hash"] = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+    return row
+
+
+def _iter_meal_rows(data_file: Path) -> Iterator[dict]:
+    """Streams `meals` rows from a recipe file, skipping untitled and repeated titles."""
+    titles_in_session = set()
+    for item in iter_recipes(data_file):
+        if not isinstance(item, dict):
+            continue
         meal_title = item.get("title")
         if not meal_title or meal_title in titles_in_session:
             continue
         titles_in_session.add(meal_title)
-        
-        macros = item.get("macros", {})
-        
-        meal = Meal(
-            name=meal_title,
-            calories=item.get("calories", 0),
-            protein=macros.get("protein", 0.0),
-            fat=macros.get("fat", 0.0),
-            carbs=macros.get('carbs') or macros.get('carb', 0.0),
-            recipe=' '.join(item.get('directions', [])),
-            tags=item.get('tags', []),
-            ingredients=item.get('ingredients', []),
-            type=item.get('type') 
-        )
-        
-        db.add(meal)
-        meal_count += 1
+        yield _meal_row(item)
 
-    try:
+
+def seed_meals_data(db: Session, data_file: Path, batch_size: int = settings.SEED_BATCH_SIZE) -> int:
+    """
+    Seeds the database with meals from a normalized JSON or JSON Lines file.
+
+    Records are streamed from disk and written with one executemany INSERT and one
+    commit per `batch_size` rows, so memory stays flat regardless of the file size.
+    Reports throughput in rows/sec and the process's peak memory.
+    """
+    print(f"  -> Seeding from file: {data_file.name}")
+    if not data_file.exists():
+        print(f"  -> ERROR: Could not read or parse {data_file.name}")
+        return 0
+
+    started = time.perf_counter()
+    meal_count = 0
+    batch = []
+
+    def flush():
+        nonlocal meal_count
+        db.execute(insert(Meal), batch)
         db.commit()
-        print(f"\n  -> ✅ Committed {meal_count} new meals.")
+        meal_count += len(batch)
+        batch.clear()
+        elapsed = time.perf_counter() - started
+        print(f"\r  -> {meal_count} meals ({meal_count / elapsed:,.0f} rows/sec, peak RSS {peak_rss_mb():.0f} MiB)",
+              end="", flush=True)
+
+    try:
+        for row in _iter_meal_rows(data_file):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    except (json.JSONDecodeError, ValueError) as e:
+        db.rollback()
+        print(f"\n  -> ERROR: Could not read or parse {data_file.name}: {e}")
     except Exception as e:
         db.rollback()
         print(f"\n  -> ❗ An error occurred during commit: {e}")
+    finally:
+        # Core inserts bypass the ORM flush hooks, so the catalog is invalidated explicitly.
+        if meal_count:
+            bump_catalog_version(db)
+            db.commit()
+            invalidate_catalog()
+
+    elapsed = time.perf_counter() - started
+    rate = meal_count / elapsed if elapsed > 0 else 0.0
+    print(f"\n  -> ✅ Committed {meal_count} new meals in {elapsed:.2f}s "
+          f"({rate:,.0f} rows/sec, peak RSS {peak_rss_mb():.0f} MiB).")
 
     return meal_count
 
 
+def _upsert_statement(db: Session):
+    """
+    INSERT ... ON CONFLICT (name) DO UPDATE for the current dialect. The update only
+    fires when the content hash differs, so replaying a sync is a no-op.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        raise ValueError(f"Catalog sync needs INSERT ... ON CONFLICT, which the '{dialect}' dialect does not support.")
+
+    stmt = dialect_insert(Meal)
+    return stmt.on_conflict_do_update(
+        index_elements=[Meal.name],
+        set_={column: stmt.excluded[column] for column in SYNC_COLUMNS},
+        where=Meal.content_hash.is_distinct_from(stmt.excluded.content_hash),
+    )
+
+
+def sync_meals_data(db: Session, data_file: Path, batch_size: int = settings.SEED_BATCH_SIZE) -> dict:
+    """
+    Incrementally syncs the catalog with a recipe file without touching users,
+    feedback or plans.
+
+    Each streamed batch looks up the stored content hashes of its titles and upserts
+    only new or changed meals, keyed on the unique meal name. If anything changed,
+    the catalog version is bumped so running servers reload their catalog.
+    Meals missing from the file are left in place, since feedback and plans may
+    still reference them.
+
+    Returns:
+        dict: Counts of inserted, updated and unchanged meals and the elapsed seconds.
+    """
+    print(f"  -> Syncing from file: {data_file.name}")
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    if not data_file.exists():
+        print(f"  -> ERROR: Could not read or parse {data_file.name}")
+        return {**counts, "elapsed_seconds": 0.0}
+
+    started = time.perf_counter()
+    upsert = _upsert_statement(db)
+    batch = []
+
+    def flush():
+        stored = {}
+        names = [row["name"] for row in batch]
+        for i in range(0, len(names), IN_CLAUSE_CHUNK):
+            stored.update(db.execute(
+                select(Meal.name, Meal.content_hash).where(Meal.name.in_(names[i:i + IN_CLAUSE_CHUNK]))
+            ).all())
+
+        changed = []
+        for row in batch:
+            if row["name"] not in stored:
+                counts["inserted"] += 1
+                changed.append(row)
+            elif stored[row["name"]] != row["content_hash"]:
+                counts["updated"] += 1
+                changed.append(row)
+            else:
+                counts["unchanged"] += 1
+        if changed:
+            db.execute(upsert, changed)
+            db.commit()
+        batch.clear()
+
+    try:
+        for row in _iter_meal_rows(data_file):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    except (json.JSONDecodeError, ValueError) as e:
+        db.rollback()
+        print(f"  -> ERROR: Could not read or parse {data_file.name}: {e}")
+    except Exception as e:
+        db.rollback()
+        print(f"  -> ❗ An error occurred during sync: {e}")
+    finally:
+        if counts["inserted"] or counts["updated"]:
+            version = bump_catalog_version(db)
+            db.commit()
+            invalidate_catalog()
+            print(f"  -> Catalog version is now {version}.")
+
+    elapsed = time.perf_counter() - started
+    print(f"  -> ✅ {counts['inserted']} inserted, {counts['updated']} updated, "
+          f"{counts['unchanged']} unchanged in {elapsed:.2f}s (peak RSS {peak_rss_mb():.0f} MiB).")
+    return {**counts, "elapsed_seconds": round(elapsed, 3)}
+
+
 def main() -> None:
     """Initializes the database by creating tables and then runs the seeding process."""
+    parser = argparse.ArgumentParser(description="Seed (or incrementally sync) the database with normalized meals.")
+    parser.add_argument("--file", type=Path, default=None,
+                        help="Recipe file (JSON array or JSON Lines) or a directory of them, "
+                             "e.g. the output of app.db.normalize_meals. Defaults to data/normalized_meals.json[l].")
+    parser.add_argument("--batch-size", type=int, default=settings.SEED_BATCH_SIZE, help="Rows per INSERT and commit.")
+    parser.add_argument("--sync", action="store_true",
+                        help="Upsert new and changed meals only, keeping users, feedback and plans.")
+    args = parser.parse_args()
+
+    normalized_files = [args.file] if args.file else sorted(DATA_DIR.glob("normalized_meals.json*"))
+    if args.sync:
+        print("--- Starting incremental catalog sync ---")
+        if not normalized_files:
+            print(f"❌ No 'normalized_meals.json' or 'normalized_meals.jsonl' files found in '{DATA_DIR}'.")
+            return
+        Base.metadata.create_all(bind=engine)
+        with SessionLocal() as db:
+            sync_meals_data(db, normalized_files[0], batch_size=args.batch_size)
+        return
+
     print("--- Starting database seeding process ---")
 
     db = SessionLocal()
     try:
         print("Wiping all existing data and re-creating tables...")
-        Base.metadata.drop_all(bind=engine)
+        # catalog_state survives the wipe so its version only ever increases; a running
+        # server would otherwise keep its old catalog when the version restarts at 1.
+        Base.metadata.drop_all(bind=engine, tables=[table for table in Base.metadata.sorted_tables
+                                                    if table is not CatalogState.__table__])
         Base.metadata.create_all(bind=engine)
+        bump_catalog_version(db)
+        db.commit()
+        invalidate_catalog()
         print("Tables created successfully.")
 
-        normalized_files = sorted(DATA_DIR.glob("normalized_meals.json"))
         if not normalized_files:
-            print(f"❌ No 'normalized_meals.json' files found in '{DATA_DIR}'.")
+            print(f"❌ No 'normalized_meals.json' or 'normalized_meals.jsonl' files found in '{DATA_DIR}'.")
             return
 
-        total_seeded = seed_meals_data(db, normalized_files[0])
+        total_seeded = seed_meals_data(db, normalized_files[0], batch_size=args.batch_size)
         print("\n" + "="*50)
         print(f"✅ Seeding process finished. Total meals added: {total_seeded}")
         print("="*50 + "\n")
@@ -1,19 +1,33 @@
 # app/main.py
+import logging
 import os
 import sys
+import time
 from pathlib import Path
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, contextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse
+from fastapi.responses import PlainTextResponse, RedirectResponse
 
 from app.api.endpoints import router as api_router
-from app.core.classifier import GoalClassifier
-from app.db.db import engine
+from app.core.classifier import BACKEND_ARTIFACTS, GoalClassifier, model_fingerprint
+from app.core.model_loader import BackgroundLoader
+from app.core.feedback import FeedbackEngine
+from app.core.batching import MicroBatcher
+from app.core.classification_cache import ClassificationCache
+from app.core.executors import create_classify_executor, create_plan_executor
+from app.core.metrics import registry as metrics_registry
+from app.config import settings
+from app.db.db import engine, async_engine, SessionLocal, write_queue
+from app.db.core.catalog import load_catalog
 from app.db.models import Base  
 
+logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+# LOG_LEVEL applies to the application's loggers only; libraries stay at WARNING.
+logging.getLogger("app").setLevel(settings.LOG_LEVEL)
+
 
 def resource_path(relative_path: str) -> str:
     """
@@ -27,18 +41,80 @@ def resource_path(relative_path: str) -> str:
     return os.path.join(base, relative_path)
 
 
+@contextmanager
+def startup_phase(name: str):
+    """Times one phase of application startup."""
+    started = time.perf_counter()
+    yield
+    print(f"[startup] {name}: {time.perf_counter() - started:.2f}s")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    Base.metadata.create_all(bind=engine)
-
-    model_path = resource_path(os.path.join("models", "goal_classifier_model"))
-    tokenizer_path = resource_path(os.path.join("models", "tokenizer"))
-    app.state.classifier = GoalClassifier(model_path=model_path, tokenizer_path=tokenizer_path)
+    startup_started = time.perf_counter()
+
+    with startup_phase("database schema"):
+        Base.metadata.create_all(bind=engine)
+
+    with startup_phase("meal catalog"):
+        with SessionLocal() as db:
+            load_catalog(db)
+
+    with startup_phase("feedback engine"):
+        app.state.feedback_engine = FeedbackEngine(
+            model_dir=settings.FEEDBACK_MODEL_DIR,
+            max_models_in_memory=settings.FEEDBACK_MODELS_IN_MEMORY
+        )
+
+    with startup_phase("executors"):
+        app.state.plan_executor = create_plan_executor()
+        app.state.classify_executor = create_classify_executor()
+
+    with startup_phase("goal classifier (scheduled)"):
+        # TensorFlow and the model load on a background thread; endpoints that
+        # don't classify are served immediately.
+        backend = settings.CLASSIFIER_BACKEND
+        model_path = settings.CLASSIFIER_MODEL_PATH or resource_path(
+            os.path.join("models", BACKEND_ARTIFACTS.get(backend, BACKEND_ARTIFACTS["tensorflow"]))
+        )
+        tokenizer_path = resource_path(os.path.join("models", "tokenizer"))
+        app.state.classifier_loader = BackgroundLoader(
+            "goal classifier",
+            lambda: GoalClassifier(model_path=model_path, tokenizer_path=tokenizer_path, backend=backend)
+        ).start()
+        app.state.classify_cache = ClassificationCache(
+            max_entries=settings.CLASSIFY_CACHE_SIZE,
+            ttl_seconds=settings.CLASSIFY_CACHE_TTL_SECONDS,
+            disk_path=settings.CLASSIFY_CACHE_PATH,
+            namespace=model_fingerprint(model_path)
+        )
+        app.state.classify_batcher = MicroBatcher(
+            lambda texts: app.state.classifier_loader.get().classify_batch(texts),
+            max_batch_size=settings.CLASSIFY_MAX_BATCH_SIZE,
+            max_wait_ms=settings.CLASSIFY_MAX_WAIT_MS,
+            executor=app.state.classify_executor,
+            cache=app.state.classify_cache,
+            # Only cache misses wait for a still-loading model.
+            ready=lambda: app.state.classifier_loader.wait_async(settings.CLASSIFIER_READY_TIMEOUT_SECONDS)
+        )
+        await app.state.classify_batcher.start()
+
+    print(f"[startup] ready to serve in {time.perf_counter() - startup_started:.2f}s")
 
     try:
         yield
     finally:
-        app.state.classifier = None
+        await app.state.classify_batcher.stop()
+        app.state.classify_batcher = None
+        app.state.classify_cache.close()
+        app.state.classify_cache = None
+        app.state.classifier_loader = None
+        app.state.classify_executor.shutdown(wait=False)
+        app.state.plan_executor.shutdown(wait=True)
+        app.state.feedback_engine = None
+        # Commits whatever writes are still queued before the process exits.
+        write_queue.stop()
+        await async_engine.dispose()
 
 
 app = FastAPI(title="NutriPlan AI", lifespan=lifespan)
@@ -58,6 +134,12 @@ app.add_middleware(
 
 app.include_router(api_router, prefix="/api")
 
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Stage latency histograms in the Prometheus text format. Registered before the SPA mount, which would shadow it."""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 bundle_dist = resource_path("dist")
 
 backend_dir = Path(__file__).resolve().parents[1]
@@ -0,0 +1,73 @@
+# backend/benchmarks/compare.py
+"""
+Compares two benchmark result files and fails on regressions.
+
+    python -m benchmarks.compare baseline.json current.json [--threshold 10] [--metric median_ms]
+
+A benchmark regresses when its metric grew by more than its threshold (in percent)
+and by more than --min-delta-ms, so sub-millisecond jitter never fails a run.
+The exit code is 1 when anything regressed, so the comparison can gate CI.
+"""
+import argparse
+import json
+import sys
+from typing import Dict, Optional, Tuple
+
+DEFAULT_THRESHOLD_PERCENT = 10.0
+# Benchmarks dominated by disk or allocator noise get more slack.
+THRESHOLD_OVERRIDES_PERCENT: Dict[str, float] = {
+    "MealCatalog.from_db": 20.0,
+    "FeedbackEngine.train": 20.0,
+    "save_plan_to_db": 25.0,
+}
+
+
+def load_results(path: str) -> Tuple[Dict, Dict[Tuple[str, Optional[int]], Dict]]:
+    with open(path) as f:
+        report = json.load(f)
+    return report, {(r["name"], r["catalog_size"]): r for r in report["results"]}
+
+
+def threshold_for(name: str, default: float) -> float:
+    return THRESHOLD_OVERRIDES_PERCENT.get(name, default)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare planner benchmark results between two commits.")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--metric", default="median_ms", choices=["min_ms", "median_ms", "p95_ms", "mean_ms"])
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD_PERCENT,
+                        help="Allowed slowdown in percent for benchmarks without an override.")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5,
+                        help="Slowdowns smaller than this are never regressions.")
+    args = parser.parse_args()
+
+    baseline_report, baseline = load_results(args.baseline)
+    current_report, current = load_results(args.current)
+    if baseline_report.get("machine") != current_report.get("machine"):
+        print("-> ⚠️ The results come from different machines or library versions; compare with care.")
+
+    regressions = 0
+    print(f"{'benchmark':<48}{'baseline':>12}{'current':>12}{'change':>10}{'limit':>8}")
+    for key in sorted(baseline.keys() | current.keys(), key=lambda k: (k[0], k[1] or 0)):
+        name, size = key
+        label = name + (f"@{size}" if size is not None else "")
+        if key not in baseline or key not in current:
+            print(f"{label:<48}{'only in ' + ('current' if key in current else 'baseline'):>34}")
+            continue
+        before, after = baseline[key][args.metric], current[key][args.metric]
+        change = (after - before) / before * 100 if before else 0.0
+        limit = threshold_for(name, args.threshold)
+        regressed = change > limit and after - before > args.min_delta_ms
+        regressions += regressed
+        print(f"{label:<48}{before:>12.3f}{after:>12.3f}{change:>+9.1f}%{limit:>7.0f}%"
+              + ("  ❗ REGRESSION" if regressed else ""))
+
+    print(f"\n-> {regressions} regression(s) in {args.metric} "
+          f"({(baseline_report.get('commit') or '?')[:12]} -> {(current_report.get('commit') or '?')[:12]}).")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
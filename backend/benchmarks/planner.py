@@ -0,0 +1,273 @@
+# backend/benchmarks/planner.py
+"""
+Times the planner's building blocks in isolation on synthetic catalogs and users,
+and writes the results as JSON that can be compared between commits.
+
+    python -m benchmarks.planner [--sizes 1000 10000 100000 1000000] [--repeats 7] [--output results.json]
+    python -m benchmarks.compare baseline.json results.json
+
+Run from the backend directory. For every catalog size a throwaway SQLite database
+is seeded with a synthetic catalog (see benchmarks/synthetic.py), users and their
+feedback, then each benchmark is warmed up once and timed `--repeats` times:
+
+    MealCatalog.from_db            loading the catalog snapshot
+    apply_all_rules                the list-based rule filters over every meal, per slot
+    apply_all_rules_vectorized     the same filters as catalog masks (eligibility cache cleared)
+    FeedbackEngine.train           one user's model, feedback read from the database
+    FeedbackEngine.predict_score   1,000 meals, per user
+    predict_catalog_scores         every catalog meal, per user
+    generate_weekly_plan           cold (eligibility cache cleared) and warm, no database access
+    generate_weekly_plan[beam]     warm, with the beam-search optimizer
+    generate_weekly_plans[4w]      four weeks from one catalog snapshot and like prediction
+    save_plan_to_db                one plan per commit
+
+GoalClassifier.classify does not depend on the catalog and is timed once. It uses
+the linear backend, trained from goal_data.csv into the temporary directory when
+models/goal_classifier_linear.joblib does not exist. Planner and rule prints are
+discarded while timing, so terminal I/O is not part of the numbers.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.config import settings  # noqa: E402
+from app.core.classifier import BACKEND_ARTIFACTS, GoalClassifier  # noqa: E402
+from app.core.feedback import FeedbackEngine  # noqa: E402
+from app.db.core.catalog import MealCatalog  # noqa: E402
+from app.db.core.planner import MealPlanner, PLANNED_SLOTS, save_plan_to_db  # noqa: E402
+from app.db.core.rules import RuleEngine, UserProfile, eligibility_cache  # noqa: E402
+from app.db.models import Base, Feedback, Meal, User  # noqa: E402
+from benchmarks import synthetic  # noqa: E402
+
+RESULTS_FORMAT = 1
+PREDICT_SAMPLE_MEALS = 1000
+GOAL_TEXTS = (
+    "I want to lose some weight before summer",
+    "Help me build muscle and get stronger",
+    "Just keep my current weight and eat healthier",
+    "I need to gain weight, I am underweight",
+)
+
+
+def user_profile(user: Dict) -> UserProfile:
+    """The planner profile of a synthetic user; every third one also has an allergy."""
+    allergies = [synthetic.ALLERGIES[user["id"] % len(synthetic.ALLERGIES)]] if user["id"] % 3 == 0 else []
+    return UserProfile(
+        age=user["age"], dietary_preferences=[k for k, v in user["preferences"].items() if v],
+        allergies=allergies, disliked_categories=[], sex=user["sex"], goal=user["goal_text"],
+        weight_kg=user["weight_kg"], height_cm=user["height_cm"], activity_level=user["activity_level"],
+    )
+
+
+def measure(name: str, catalog_size: Optional[int], fn: Callable[[int], object], repeats: int) -> Dict:
+    """
+    Calls `fn(i)` once to warm up and then `repeats` times, with prints discarded.
+
+    Returns:
+        Dict: The benchmark's result entry, timings in milliseconds.
+    """
+    samples = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn(0)
+        for i in range(1, repeats + 1):
+            started = time.perf_counter()
+            fn(i)
+            samples.append((time.perf_counter() - started) * 1000)
+    result = {
+        "name": name,
+        "catalog_size": catalog_size,
+        "repeats": repeats,
+        "min_ms": min(samples),
+        "median_ms": statistics.median(samples),
+        "p95_ms": float(np.percentile(samples, 95)),
+        "mean_ms": statistics.mean(samples),
+    }
+    size = f"@{catalog_size}" if catalog_size is not None else ""
+    print(f"{name + size:<48}median {result['median_ms']:>10.3f} ms   p95 {result['p95_ms']:>10.3f} ms")
+    return result
+
+
+def seed_database(session_factory, meals: List[Dict], users: List[Dict], feedback: List[Dict]) -> None:
+    with session_factory() as db:
+        for i in range(0, len(meals), 50000):
+            db.execute(insert(Meal), meals[i:i + 50000])
+        db.execute(insert(User), users)
+        db.execute(insert(Feedback), feedback)
+        db.commit()
+
+
+def bench_catalog(size: int, args, tmp: str) -> List[Dict]:
+    print(f"\n=== {size} meals ===")
+    started = time.perf_counter()
+    meals = synthetic.generate_meals(size, seed=args.seed)
+    users = synthetic.generate_users(args.users, seed=args.seed)
+    feedback = synthetic.generate_feedback(meals, users, args.feedback_per_user, seed=args.seed)
+
+    engine = create_engine(f"sqlite:///{os.path.join(tmp, f'planner_{size}.db')}")
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False)
+    seed_database(SessionLocal, meals, users, feedback)
+    print(f"-> Seeded {size} meals, {len(users)} users and {len(feedback)} ratings "
+          f"in {time.perf_counter() - started:.1f}s.")
+
+    meal_by_id = {m["id"]: m for m in meals}
+    records = {u["id"]: [] for u in users}
+    disliked = {u["id"]: set() for u in users}
+    for row in feedback:
+        meal = meal_by_id[row["meal_id"]]
+        records[row["user_id"]].append((row["rating"], meal["name"], meal["tags"]))
+        if row["rating"] <= 2:
+            disliked[row["user_id"]].add(row["meal_id"])
+    profiles = {u["id"]: user_profile(u) for u in users}
+    user_ids = [u["id"] for u in users]
+
+    def user_at(i: int) -> int:
+        return user_ids[i % len(user_ids)]
+
+    def rule_engine(i: int) -> RuleEngine:
+        uid = user_at(i)
+        return RuleEngine(profiles[uid], None, uid, disliked_meal_ids=disliked[uid],
+                          feedback_version=(len(records[uid]), 0, 0))
+
+    results = []
+    db = SessionLocal()
+    results.append(measure("MealCatalog.from_db", size, lambda i: MealCatalog.from_db(db), args.repeats))
+    catalog = MealCatalog(synthetic.catalog_rows(meals), version=size)
+
+    def apply_all_rules(i: int) -> None:
+        rules = rule_engine(i)
+        for slot in PLANNED_SLOTS:
+            rules.apply_all_rules(catalog.meals, slot)
+
+    def apply_all_rules_vectorized(i: int) -> None:
+        eligibility_cache.clear()
+        rules = rule_engine(i)
+        for slot in PLANNED_SLOTS:
+            rules.apply_all_rules_vectorized(catalog, slot)
+
+    results.append(measure("apply_all_rules", size, apply_all_rules, args.repeats))
+    results.append(measure("apply_all_rules_vectorized", size, apply_all_rules_vectorized, args.repeats))
+
+    feedback_engine = FeedbackEngine()
+    results.append(measure("FeedbackEngine.train", size,
+                           lambda i: feedback_engine.train(db, user_at(i)), args.repeats))
+    with contextlib.redirect_stdout(io.StringIO()):
+        for uid in user_ids:
+            feedback_engine.train_from_records(uid, records[uid], version=(len(records[uid]), 0, 0))
+
+    sample = [catalog.meals[row] for row in
+              np.random.default_rng(args.seed).choice(len(catalog), min(PREDICT_SAMPLE_MEALS, len(catalog)), replace=False)]
+    all_rows = np.arange(len(catalog))
+    results.append(measure("FeedbackEngine.predict_score", size,
+                           lambda i: feedback_engine.predict_score(sample, user_at(i)), args.repeats))
+    results.append(measure("predict_catalog_scores", size,
+                           lambda i: feedback_engine.predict_catalog_scores(catalog, user_at(i), all_rows), args.repeats))
+
+    def planner_for(i: int, **options) -> MealPlanner:
+        uid = user_at(i)
+        return MealPlanner(feedback_engine, uid, profiles[uid], None, seed=args.seed + i, catalog=catalog,
+                           disliked_meal_ids=disliked[uid], feedback_version=(len(records[uid]), 0, 0), **options)
+
+    def generate_weekly_plan(i: int, cold: bool, optimizer: str = "greedy"):
+        if cold:
+            eligibility_cache.clear()
+        return planner_for(i, optimizer=optimizer).generate_weekly_plan()
+
+    results.append(measure("generate_weekly_plan[cold]", size, lambda i: generate_weekly_plan(i, True), args.repeats))
+    results.append(measure("generate_weekly_plan[warm]", size, lambda i: generate_weekly_plan(i, False), args.repeats))
+    results.append(measure("generate_weekly_plan[beam]", size,
+                           lambda i: generate_weekly_plan(i, False, "beam"), args.repeats))
+    results.append(measure("generate_weekly_plans[4w]", size,
+                           lambda i: planner_for(i).generate_weekly_plans(4), args.repeats))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        plans = [generate_weekly_plan(i, False) for i in range(len(user_ids))]
+    results.append(measure("save_plan_to_db", size,
+                           lambda i: save_plan_to_db(db, plans[i % len(plans)], user_at(i)), args.repeats))
+
+    db.close()
+    engine.dispose()
+    return results
+
+
+def linear_classifier_path(tmp: str) -> str:
+    path = os.path.join("models", BACKEND_ARTIFACTS["linear"])
+    if os.path.exists(path):
+        return path
+    from app.core.classifier_tools import train_linear
+
+    path = os.path.join(tmp, BACKEND_ARTIFACTS["linear"])
+    with contextlib.redirect_stdout(io.StringIO()):
+        train_linear(argparse.Namespace(data=str(settings.GOAL_DATA_PATH), distill=False, c=10.0,
+                                        output=path, models_dir=tmp))
+    return path
+
+
+def bench_classifier(args, tmp: str) -> List[Dict]:
+    print("\n=== GoalClassifier ===")
+    with contextlib.redirect_stdout(io.StringIO()):
+        classifier = GoalClassifier(linear_classifier_path(tmp), backend="linear")
+    return [measure("GoalClassifier.classify[linear]", None,
+                    lambda i: classifier.classify(GOAL_TEXTS[i % len(GOAL_TEXTS)]), args.repeats * 10)]
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the planner on synthetic catalogs.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Catalog sizes to run; 1000000 takes a few minutes to seed.")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--feedback-per-user", type=int, default=40)
+    parser.add_argument("--repeats", type=int, default=7, help="Timed runs per benchmark, after one warm-up.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-classifier", action="store_true")
+    parser.add_argument("--output", default=None, help="Where to write the JSON results (default: benchmarks/results/planner-<commit>.json).")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            results.extend(bench_catalog(size, args, tmp))
+        if not args.skip_classifier:
+            results.extend(bench_classifier(args, tmp))
+
+    report = {
+        "format": RESULTS_FORMAT,
+        "commit": commit,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "machine": {"python": platform.python_version(), "numpy": np.__version__,
+                    "platform": platform.platform(), "cpu_count": os.cpu_count()},
+        "args": vars(args),
+        "results": results,
+    }
+    output = args.output or os.path.join(os.path.dirname(__file__), "results", f"planner-{(commit or 'unknown')[:12]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n-> Results written to {output}.")
+
+
+if __name__ == "__main__":
+    main()
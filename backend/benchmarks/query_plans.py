@@ -0,0 +1,153 @@
+# backend/benchmarks/query_plans.py
+"""
+Shows the query plans and timings of the per-user hot-path queries with and without
+the feedback/meal_plans/meals indexes.
+
+    python -m benchmarks.query_plans [--users 2000] [--feedback-per-user 40] [--plan-days 90]
+
+Run from the backend directory. A throwaway SQLite database is seeded with synthetic
+meals, users, feedback and plan rows; every query is explained and timed first
+without the hot-path indexes, then again after creating them.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+from sqlalchemy import create_engine, func, insert, select, text
+from sqlalchemy.engine import Engine
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.db.models import Base, Feedback, Meal, MealPlan, User  # noqa: E402
+
+HOT_PATH_INDEXES = ("ix_feedback_user_id_rating", "ix_meal_plans_user_id_plan_date", "ix_meals_type")
+MEAL_TYPES = ("breakfast", "lunch", "dinner", "lunch/dinner", "side", "dessert")
+
+# name -> statement factory for one user id; mirrors the queries the app runs per plan or request.
+QUERIES: Dict[str, Callable[[int], object]] = {
+    "disliked meals (RuleEngine)": lambda uid: select(Feedback.meal_id).where(
+        Feedback.user_id == uid, Feedback.rating <= 2),
+    "feedback version": lambda uid: select(func.count(Feedback.id), func.max(Feedback.id)).where(
+        Feedback.user_id == uid),
+    "liked meals (API)": lambda uid: select(Meal.id, Meal.name, Feedback.rating)
+        .join(Feedback, Meal.id == Feedback.meal_id)
+        .where(Feedback.user_id == uid, Feedback.rating >= 4)
+        .order_by(Feedback.rating.desc(), Feedback.id.desc()).limit(20),
+    "last plan date (save plan)": lambda uid: select(func.max(MealPlan.plan_date)).where(
+        MealPlan.user_id == uid),
+    "meals by type": lambda uid: select(Meal.id).where(Meal.type == MEAL_TYPES[uid % len(MEAL_TYPES)]),
+}
+
+
+def seed(engine: Engine, meals: int, users: int, feedback_per_user: int, plan_days: int, seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    with engine.begin() as conn:
+        conn.execute(insert(Meal), [
+            {"id": i + 1, "name": f"Meal {i}", "calories": float(rng.uniform(150, 900)),
+             "protein": 20.0, "fat": 10.0, "carbs": 30.0, "tags": [], "ingredients": [], "recipe": "",
+             "type": MEAL_TYPES[i % len(MEAL_TYPES)]}
+            for i in range(meals)
+        ])
+        conn.execute(insert(User), [
+            {"id": u + 1, "username": f"user{u}", "name": f"User {u}", "age": 30}
+            for u in range(users)
+        ])
+        feedback_rows = [
+            {"user_id": u + 1, "meal_id": int(m), "rating": float(r)}
+            for u in range(users)
+            for m, r in zip(rng.integers(1, meals + 1, feedback_per_user), rng.integers(1, 6, feedback_per_user))
+        ]
+        rng.shuffle(feedback_rows)  # interleave users, as real traffic does
+        conn.execute(insert(Feedback), feedback_rows)
+
+        start = date(2025, 1, 1)
+        plan_rows = [
+            {"user_id": u + 1, "meal_id": int(rng.integers(1, meals + 1)), "plan_date": start + timedelta(days=d)}
+            for d in range(plan_days) for u in range(users) for _ in range(3)
+        ]
+        for i in range(0, len(plan_rows), 50000):
+            conn.execute(insert(MealPlan), plan_rows[i:i + 50000])
+    print(f"-> Seeded {meals} meals, {users} users, {users * feedback_per_user} feedback rows, "
+          f"{users * plan_days * 3} meal plan rows.")
+
+
+def explain(engine: Engine, statement) -> List[str]:
+    sql = str(statement.compile(engine, compile_kwargs={"literal_binds": True}))
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    with engine.connect() as conn:
+        rows = conn.execute(text(prefix + sql)).all()
+    return [row[-1] for row in rows]
+
+
+def time_query(engine: Engine, factory: Callable[[int], object], user_ids: np.ndarray) -> Tuple[float, float]:
+    """Mean and p95 latency in milliseconds over the given users."""
+    samples = []
+    with engine.connect() as conn:
+        for uid in user_ids:
+            started = time.perf_counter()
+            conn.execute(factory(int(uid))).all()
+            samples.append((time.perf_counter() - started) * 1000)
+    return statistics.mean(samples), float(np.percentile(samples, 95))
+
+
+def run_phase(engine: Engine, label: str, user_ids: np.ndarray) -> Dict[str, Tuple[float, float]]:
+    print(f"\n=== {label} ===")
+    timings = {}
+    for name, factory in QUERIES.items():
+        plan = explain(engine, factory(int(user_ids[0])))
+        timings[name] = time_query(engine, factory, user_ids)
+        print(f"{name}: mean {timings[name][0]:.3f} ms, p95 {timings[name][1]:.3f} ms")
+        for line in plan:
+            print(f"    {line}")
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="EXPLAIN and time the hot-path queries with and without indexes.")
+    parser.add_argument("--meals", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--feedback-per-user", type=int, default=40)
+    parser.add_argument("--plan-days", type=int, default=90)
+    parser.add_argument("--repeats", type=int, default=200, help="Users sampled per timed query.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            for name in HOT_PATH_INDEXES:
+                conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        seed(engine, args.meals, args.users, args.feedback_per_user, args.plan_days, args.seed)
+
+        user_ids = np.random.default_rng(args.seed + 1).integers(1, args.users + 1, args.repeats)
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+        before = run_phase(engine, "Without hot-path indexes", user_ids)
+
+        started = time.perf_counter()
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                if index.name in HOT_PATH_INDEXES:
+                    index.create(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+        print(f"\n-> Created {len(HOT_PATH_INDEXES)} indexes in {time.perf_counter() - started:.2f}s.")
+        after = run_phase(engine, "With hot-path indexes", user_ids)
+        engine.dispose()
+
+    print("\n" + "="*72)
+    print(f"{'query':<30}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for name in QUERIES:
+        b, a = before[name][0], after[name][0]
+        print(f"{name:<30}{b:>12.3f}{a:>12.3f}{b / a if a else float('inf'):>9.1f}x")
+    print("="*72 + "\n")
+
+
+if __name__ == "__main__":
+    main()
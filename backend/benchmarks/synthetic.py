@@ -0,0 +1,140 @@
+# backend/benchmarks/synthetic.py
+"""
+Synthetic meal catalogs, users and feedback histories for the benchmarks.
+
+The distributions mimic what `app.db.normalize_meals` produces from real recipe
+pages: the same meal types and tag vocabulary, mains far more common than sides
+and desserts, diet tags that are consistent with allergen tags (a vegan meal is
+never tagged dairy) and calories that depend on the meal type.
+"""
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# (meal type, share of the catalog, median calories)
+MEAL_TYPE_MIX = (
+    ("breakfast", 0.18, 420.0),
+    ("lunch", 0.12, 560.0),
+    ("dinner", 0.15, 680.0),
+    ("lunch/dinner", 0.35, 620.0),
+    ("side", 0.12, 220.0),
+    ("dessert", 0.08, 380.0),
+)
+INGREDIENT_POOL = (
+    "chicken", "beef", "salmon", "shrimp", "tofu", "lentils", "rice", "pasta", "bread", "oats",
+    "milk", "cheese", "yogurt", "egg", "almonds", "peanut butter", "spinach", "broccoli", "tomato",
+    "onion", "garlic", "potato", "quinoa", "beans", "avocado", "olive oil", "butter", "flour", "honey",
+)
+GOALS = ("maintain", "bulk", "cut_muscle_gain")
+ACTIVITY_LEVELS = ("sedentary", "lightly_active", "moderately_active", "very_active")
+DIET_PREFERENCES = ("vegetarian", "gluten_free", "dairy_free", "no_red_meat")
+ALLERGIES = ("nuts", "shellfish", "fish", "eggs")
+
+
+def _tags(rng: np.random.Generator, n: int) -> List[List[str]]:
+    """Diet and allergen tags with the usual correlations between them."""
+    vegetarian = rng.random(n) < 0.30
+    vegan = vegetarian & (rng.random(n) < 0.35)
+    dairy = ~vegan & (rng.random(n) < 0.40)
+    gluten = rng.random(n) < 0.45
+    eggs = ~vegan & (rng.random(n) < 0.25)
+    nuts = rng.random(n) < 0.12
+    fish = ~vegetarian & (rng.random(n) < 0.14)
+    shellfish = ~vegetarian & ~fish & (rng.random(n) < 0.06)
+    red_meat = ~vegetarian & ~fish & ~shellfish & (rng.random(n) < 0.40)
+
+    columns = {
+        "vegetarian": vegetarian, "vegan": vegan, "gluten_free": ~gluten, "dairy_free": ~dairy,
+        "no_red_meat": ~red_meat, "nuts": nuts, "dairy": dairy, "gluten": gluten, "eggs": eggs,
+        "shellfish": shellfish, "fish": fish,
+    }
+    names = sorted(columns)
+    matrix = np.column_stack([columns[name] for name in names])
+    return [[names[j] for j in np.flatnonzero(row)] for row in matrix]
+
+
+def generate_meals(n: int, seed: int = 0) -> List[Dict]:
+    """
+    `n` meal rows with the columns of the `meals` table (ids 1..n).
+
+    Args:
+        n (int): Catalog size.
+        seed (int): Seeds every random draw, so a size and seed always give the same catalog.
+
+    Returns:
+        List[Dict]: Row dictionaries ready for `insert(Meal)`.
+    """
+    rng = np.random.default_rng(seed)
+    type_names = [t for t, _, _ in MEAL_TYPE_MIX]
+    shares = np.array([share for _, share, _ in MEAL_TYPE_MIX])
+    type_idx = rng.choice(len(MEAL_TYPE_MIX), size=n, p=shares / shares.sum())
+    median_calories = np.array([median for _, _, median in MEAL_TYPE_MIX])[type_idx]
+    calories = np.clip(rng.lognormal(np.log(median_calories), 0.35), 40, 2000)
+    # Shares of calories from protein, fat and carbs.
+    split = rng.dirichlet((3.0, 3.0, 5.0), size=n)
+    protein, fat, carbs = (calories * split[:, 0] / 4.0, calories * split[:, 1] / 9.0, calories * split[:, 2] / 4.0)
+    ingredient_counts = rng.integers(3, 10, size=n)
+    ingredient_picks = rng.integers(0, len(INGREDIENT_POOL), size=(n, 9))
+    tags = _tags(rng, n)
+
+    return [
+        {
+            "id": i + 1,
+            "name": f"Synthetic meal {i + 1}",
+            "calories": round(float(calories[i]), 1),
+            "protein": round(float(protein[i]), 1),
+            "fat": round(float(fat[i]), 1),
+            "carbs": round(float(carbs[i]), 1),
+            "tags": tags[i],
+            "type": type_names[type_idx[i]],
+            "ingredients": list(dict.fromkeys(INGREDIENT_POOL[j] for j in ingredient_picks[i, :ingredient_counts[i]])),
+            "recipe": "Combine the ingredients and cook until done.",
+        }
+        for i in range(n)
+    ]
+
+
+def catalog_rows(meals: List[Dict]) -> List[Tuple]:
+    """The column tuples `MealCatalog` is built from, as `MealCatalog.from_db` selects them."""
+    return [(m["id"], m["name"], m["calories"], m["protein"], m["fat"], m["carbs"],
+             m["tags"], m["type"], m["ingredients"], m["recipe"]) for m in meals]
+
+
+def generate_users(n: int, seed: int = 0) -> List[Dict]:
+    """`n` complete user profiles (ids 1..n) with a spread of goals, activity levels and diets."""
+    rng = np.random.default_rng(seed + 1)
+    users = []
+    for i in range(n):
+        sex = "male" if rng.random() < 0.5 else "female"
+        preferences = {p: True for p in DIET_PREFERENCES if rng.random() < 0.12}
+        users.append({
+            "id": i + 1,
+            "username": f"bench_user_{i + 1}",
+            "name": f"Bench User {i + 1}",
+            "age": int(rng.integers(18, 70)),
+            "sex": sex,
+            "weight_kg": round(float(rng.normal(82 if sex == "male" else 68, 10)), 1),
+            "height_cm": round(float(rng.normal(178 if sex == "male" else 165, 7)), 1),
+            "activity_level": str(rng.choice(ACTIVITY_LEVELS)),
+            "goal_text": str(rng.choice(GOALS)),
+            "preferences": preferences,
+        })
+    return users
+
+
+def generate_feedback(meals: List[Dict], users: List[Dict], per_user: int, seed: int = 0) -> List[Dict]:
+    """
+    `per_user` ratings for every user. Each user has a hidden taste for a few tags,
+    so ratings carry a learnable signal rather than noise.
+    """
+    rng = np.random.default_rng(seed + 2)
+    tag_names = sorted({t for m in meals[:1000] for t in m["tags"]})
+    rows = []
+    for user in users:
+        taste = dict(zip(tag_names, rng.normal(0.0, 1.0, len(tag_names))))
+        for meal_idx in rng.integers(0, len(meals), per_user):
+            meal = meals[meal_idx]
+            affinity = sum(taste.get(t, 0.0) for t in meal["tags"])
+            rating = float(np.clip(np.round(3.0 + affinity + rng.normal(0.0, 0.8)), 1, 5))
+            rows.append({"user_id": user["id"], "meal_id": meal["id"], "rating": rating})
+    return rows